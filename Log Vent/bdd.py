@@ -0,0 +1,330 @@
+"""Символьный анализ схемы на упорядоченных диаграммах решений (ROBDD).
+
+Таблица истинности перебирает 2^n строк, диаграмма хранит функцию выхода
+целиком и отвечает на вопросы без перебора: сколько строк дают 1, при
+каких входах выход равен 1, совпадают ли две схемы. Для сумматоров,
+компараторов и подобных блоков диаграмма растет линейно с числом входов,
+если переменные упорядочены удачно (см. variable_order()).
+
+Узел - целое число: 0 и 1 - константы, остальные - (переменная, low, high)
+в массивах BDD. Одинаковые узлы создаются один раз (таблица unique),
+поэтому две функции равны тогда и только тогда, когда равны их номера.
+"""
+import logging
+from array import array
+
+from logic_gates import OP_AND, OP_OR, OP_NOT, OP_NAND, OP_NOR, OP_XOR, OP_INPUT, OP_OUTPUT, SOURCE_OPCODES
+
+FALSE = 0
+TRUE = 1
+
+# Сколько узлов можно создать, прежде чем анализ будет прерван
+DEFAULT_MAX_NODES = 2_000_000
+
+# Операции рекурсивны с глубиной не больше числа переменных
+MAX_VARIABLES = 400
+
+
+class BddTooLarge(Exception):
+    """Диаграмма превысила max_nodes - для схемы нужен другой порядок
+    переменных или перебор"""
+
+
+class BDD:
+    """Менеджер диаграмм над num_vars переменными (0 - верхняя)"""
+
+    def __init__(self, num_vars, max_nodes=DEFAULT_MAX_NODES):
+        if num_vars > MAX_VARIABLES:
+            raise ValueError(f"Слишком много переменных для BDD: {num_vars} (не больше {MAX_VARIABLES})")
+        self.num_vars = num_vars
+        self.max_nodes = max_nodes
+        # Константы стоят ниже всех переменных - на уровне num_vars
+        self.var = array("i", [num_vars, num_vars])
+        self.low = array("i", [FALSE, TRUE])
+        self.high = array("i", [FALSE, TRUE])
+        self.unique = {}
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.var)
+
+    def make(self, var, low, high):
+        """Узел (var, low, high) - существующий, если такой уже есть"""
+        if low == high:
+            return low
+        key = (var, low, high)
+        node = self.unique.get(key)
+        if node is None:
+            node = len(self.var)
+            if node >= self.max_nodes:
+                raise BddTooLarge(f"BDD больше {self.max_nodes} узлов")
+            self.var.append(var)
+            self.low.append(low)
+            self.high.append(high)
+            self.unique[key] = node
+        return node
+
+    def variable(self, index):
+        return self.make(index, FALSE, TRUE)
+
+    def ite(self, f, g, h):
+        """if f then g else h - через нее выражаются все операции"""
+        if f == TRUE:
+            return g
+        if f == FALSE:
+            return h
+        if g == h:
+            return g
+        if g == TRUE and h == FALSE:
+            return f
+
+        key = (f, g, h)
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+
+        var = self.var
+        top = min(var[f], var[g], var[h])
+        f0, f1 = (self.low[f], self.high[f]) if var[f] == top else (f, f)
+        g0, g1 = (self.low[g], self.high[g]) if var[g] == top else (g, g)
+        h0, h1 = (self.low[h], self.high[h]) if var[h] == top else (h, h)
+        result = self.make(top, self.ite(f0, g0, h0), self.ite(f1, g1, h1))
+        self.cache[key] = result
+        return result
+
+    def not_(self, f):
+        return self.ite(f, FALSE, TRUE)
+
+    def and_(self, f, g):
+        return self.ite(f, g, FALSE)
+
+    def or_(self, f, g):
+        return self.ite(f, TRUE, g)
+
+    def xor(self, f, g):
+        return self.ite(f, self.not_(g), g)
+
+    def count(self, f):
+        """Число наборов всех num_vars переменных, на которых f = 1"""
+        memo = {FALSE: 0, TRUE: 1}
+        var, low, high = self.var, self.low, self.high
+
+        def below(node):
+            # Наборы переменных от var[node] и ниже
+            result = memo.get(node)
+            if result is None:
+                lo, hi = low[node], high[node]
+                result = (below(lo) << (var[lo] - var[node] - 1)) + (below(hi) << (var[hi] - var[node] - 1))
+                memo[node] = result
+            return result
+
+        return below(f) << var[f]
+
+    def satisfy_one(self, f):
+        """Набор, на котором f = 1: список значений переменных (None - любое),
+        или None, если f тождественно 0"""
+        if f == FALSE:
+            return None
+        assignment = [None] * self.num_vars
+        while f != TRUE:
+            if self.low[f] != FALSE:
+                assignment[self.var[f]] = 0
+                f = self.low[f]
+            else:
+                assignment[self.var[f]] = 1
+                f = self.high[f]
+        return assignment
+
+    def cubes(self, f):
+        """Все пути к 1: непересекающиеся наборы (None - любое значение),
+        вместе покрывающие f. Генератор - их может быть очень много"""
+        if f == FALSE:
+            return
+        assignment = [None] * self.num_vars
+        stack = [(f, None, None)]
+        while stack:
+            node, var, value = stack.pop()
+            if var is not None:
+                # Переменные ниже var на этом пути еще не выбраны
+                for k in range(var, self.num_vars):
+                    assignment[k] = None
+                assignment[var] = value
+            if node == TRUE:
+                yield list(assignment)
+                continue
+            node_var = self.var[node]
+            if self.high[node] != FALSE:
+                stack.append((self.high[node], node_var, 1))
+            if self.low[node] != FALSE:
+                stack.append((self.low[node], node_var, 0))
+
+    def evaluate(self, f, values):
+        """Значение f на наборе values (по значению на переменную)"""
+        while f > TRUE:
+            f = self.high[f] if values[self.var[f]] else self.low[f]
+        return f
+
+
+def variable_order(netlist, input_ids, roots):
+    """Порядок переменных: Input в порядке первого обращения при обходе
+    в глубину от выходов по пинам.
+
+    У сумматора это чередует биты слагаемых (a0, b0, a1, b1, ...) - так
+    диаграммы линейны, а при порядке a0..a31, b0..b31 - экспоненциальны.
+    Input, до которых обход не дошел, идут в конце.
+    """
+    wanted = set(input_ids)
+    order = []
+    seen = set()
+    for root in roots:
+        stack = [root]
+        while stack:
+            gid = stack.pop()
+            if gid in seen:
+                continue
+            seen.add(gid)
+            if gid in wanted:
+                order.append(gid)
+            # Пин 0 обходится первым
+            stack.extend(reversed(netlist.sources(gid)))
+    order.extend(gid for gid in input_ids if gid not in seen)
+    return order
+
+
+class SymbolicCircuit:
+    """Функции вентилей netlist в виде BDD.
+
+    input_ids - Input в порядке пользователя (по умолчанию netlist.input_ids):
+    наборы значений возвращаются в этом порядке. Триггеры и Clock берутся с
+    текущими значениями, как в таблице истинности. Функции строятся только
+    для запрошенных вентилей и того, от чего они зависят.
+    """
+
+    def __init__(self, netlist, input_ids=None, roots=None, max_nodes=DEFAULT_MAX_NODES, bdd=None, order=None):
+        self.netlist = netlist
+        self.input_ids = list(netlist.input_ids if input_ids is None else input_ids)
+        roots = list(netlist.output_ids if roots is None else roots)
+        if order is None:
+            order = variable_order(netlist, self.input_ids, roots)
+        # Переменная BDD для каждого Input и номер Input (в порядке input_ids) для переменной
+        self.variables = {gid: var for var, gid in enumerate(order)}
+        position = {gid: k for k, gid in enumerate(self.input_ids)}
+        self.input_position = [position[gid] for gid in order]
+        self.bdd = bdd if bdd is not None else BDD(len(order), max_nodes)
+        self.functions = {}
+
+    def function(self, gid):
+        """Узел BDD для вентиля gid"""
+        node = self.functions.get(gid)
+        if node is None:
+            self._build(gid)
+            node = self.functions[gid]
+        return node
+
+    def _build(self, root):
+        """Строит функции вентилей, от которых зависит root, в порядке вычислений"""
+        netlist = self.netlist
+        functions = self.functions
+        cone = set()
+        stack = [root]
+        while stack:
+            gid = stack.pop()
+            if gid in cone or gid in functions:
+                continue
+            cone.add(gid)
+            if netlist.ops[gid] not in SOURCE_OPCODES:
+                stack.extend(netlist.sources(gid))
+        if any(netlist.levels[gid] < 0 for gid in cone):
+            raise ValueError("BDD строится только для схем без обратных связей")
+
+        bdd = self.bdd
+        for gid in netlist.order:
+            if gid not in cone:
+                continue
+            op = netlist.ops[gid]
+            if op in SOURCE_OPCODES:
+                # Входы триггера в конус не входят - он берется с текущим значением
+                if op == OP_INPUT:
+                    functions[gid] = bdd.variable(self.variables[gid])
+                else:
+                    functions[gid] = TRUE if netlist.input_value(gid) == 1 else FALSE
+                continue
+            inputs = [functions[src] for src in netlist.sources(gid)]
+            if op == OP_NOT:
+                node = bdd.not_(inputs[0]) if inputs else TRUE
+            elif op == OP_OUTPUT:
+                node = inputs[0] if inputs else FALSE
+            elif op in (OP_AND, OP_NAND):
+                node = FALSE
+                if len(inputs) >= 2:
+                    node = inputs[0]
+                    for other in inputs[1:]:
+                        node = bdd.and_(node, other)
+                if op == OP_NAND:
+                    node = bdd.not_(node)
+            elif op in (OP_OR, OP_NOR):
+                node = FALSE
+                for other in inputs:
+                    node = bdd.or_(node, other)
+                if op == OP_NOR:
+                    node = bdd.not_(node)
+            elif op == OP_XOR:
+                node = FALSE
+                if len(inputs) >= 2:
+                    for other in inputs:
+                        node = bdd.xor(node, other)
+            else:
+                raise ValueError(f"Нет BDD для вентиля {netlist.kind(gid)}")
+            functions[gid] = node
+        logging.debug(f"BDD: {len(cone)} вентилей, {len(bdd)} узлов")
+
+    def count_ones(self, gid):
+        """Сколько строк таблицы истинности дают на вентиле 1"""
+        return self.bdd.count(self.function(gid))
+
+    def _inputs(self, assignment):
+        """Набор по переменным BDD -> значения Input в порядке input_ids"""
+        values = [None] * len(self.input_ids)
+        for var, value in enumerate(assignment):
+            values[self.input_position[var]] = value
+        return values
+
+    def satisfy(self, gid, value=1):
+        """Значения Input (None - любое), при которых вентиль равен value,
+        или None, если таких нет"""
+        node = self.function(gid)
+        if value == 0:
+            node = self.bdd.not_(node)
+        assignment = self.bdd.satisfy_one(node)
+        return None if assignment is None else self._inputs(assignment)
+
+    def cubes(self, gid):
+        """Все наборы Input (None - любое), при которых вентиль равен 1"""
+        for assignment in self.bdd.cubes(self.function(gid)):
+            yield self._inputs(assignment)
+
+
+def check_equivalence(first, second, first_inputs=None, second_inputs=None,
+                      first_outputs=None, second_outputs=None, max_nodes=DEFAULT_MAX_NODES):
+    """Сравнивает две схемы: Input и Output сопоставляются по порядку
+    (по умолчанию - по ID). Возвращает None, если схемы эквивалентны, иначе
+    (номер выхода, значения Input первой схемы), на которых они расходятся.
+    """
+    first_inputs = list(first.input_ids if first_inputs is None else first_inputs)
+    second_inputs = list(second.input_ids if second_inputs is None else second_inputs)
+    first_outputs = list(first.output_ids if first_outputs is None else first_outputs)
+    second_outputs = list(second.output_ids if second_outputs is None else second_outputs)
+    if len(first_inputs) != len(second_inputs) or len(first_outputs) != len(second_outputs):
+        raise ValueError(f"Разное число входов или выходов: {len(first_inputs)}/{len(first_outputs)} "
+                         f"и {len(second_inputs)}/{len(second_outputs)}")
+
+    # Общий менеджер и общий порядок переменных - равные функции дают равные узлы
+    a = SymbolicCircuit(first, first_inputs, first_outputs, max_nodes)
+    order = [second_inputs[first_inputs.index(gid)] for gid in variable_order(first, first_inputs, first_outputs)]
+    b = SymbolicCircuit(second, second_inputs, second_outputs, bdd=a.bdd, order=order)
+
+    for k, (x, y) in enumerate(zip(first_outputs, second_outputs)):
+        difference = a.bdd.xor(a.function(x), b.function(y))
+        if difference != FALSE:
+            return k, a._inputs(a.bdd.satisfy_one(difference))
+    return None
@@ -0,0 +1,96 @@
+"""Замер скорости вычисления вентилей через get_output()/compute_output().
+
+Примеры:
+    python bench_logic.py
+    python bench_logic.py --gates 100000 --repeats 5
+    python bench_logic.py --chain 10000
+"""
+import argparse
+import random
+import time
+
+from logic_gates import GATE_CLASSES, InputGate, NotGate
+
+GATE_TYPES = ["AND", "OR", "NOT", "NAND", "NOR", "XOR"]
+
+
+def build_layered(gate_count, width, seed=0):
+    """Слоистая схема: вентиль берет входы из предыдущего слоя (глубина gate_count / width)"""
+    rng = random.Random(seed)
+    layer = [InputGate(rng.randint(0, 1)) for _ in range(width)]
+    gates = list(layer)
+    while len(gates) < gate_count:
+        next_layer = []
+        for _ in range(width):
+            gate = GATE_CLASSES[rng.choice(GATE_TYPES)]()
+            pins = 1 if gate.name == "NOT" else 2
+            gate.inputs = [rng.choice(layer) for _ in range(pins)]
+            next_layer.append(gate)
+        gates.extend(next_layer)
+        layer = next_layer
+    return gates
+
+
+def build_chain(depth, seed=0):
+    """Цепочка из depth инверторов от одного Input - глубина пути равна depth"""
+    gates = [InputGate(random.Random(seed).randint(0, 1))]
+    for _ in range(depth):
+        gate = NotGate()
+        gate.inputs = [gates[-1]]
+        gates.append(gate)
+    return gates
+
+
+def evaluate_last(gates, repeats):
+    """Сбрасывает схему и запрашивает только последний вентиль - весь путь
+    считается одним вызовом get_output(). Возвращает лучшее время"""
+    best = None
+    for _ in range(repeats):
+        for gate in gates[1:]:
+            gate.reset_computation()
+        started = time.perf_counter()
+        gates[-1].get_output()
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def evaluate_all(gates, repeats):
+    """Сбрасывает и заново считает все вентили repeats раз, возвращает лучшее время прохода"""
+    best = None
+    for _ in range(repeats):
+        for gate in gates:
+            if gate.name != "INPUT":
+                gate.reset_computation()
+        started = time.perf_counter()
+        for gate in gates:
+            gate.get_output()
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Скорость вычисления вентилей")
+    parser.add_argument("--gates", type=int, default=50000)
+    parser.add_argument("--width", type=int, default=256, help="вентилей в слое")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--chain", type=int, help="вместо слоистой схемы - цепочка инверторов такой глубины")
+    args = parser.parse_args(argv)
+
+    if args.chain:
+        gates = build_chain(args.chain)
+        elapsed = evaluate_last(gates, args.repeats)
+        label = f"Цепочка глубиной {args.chain}"
+    else:
+        gates = build_layered(args.gates, args.width)
+        elapsed = evaluate_all(gates, args.repeats)
+        label = f"{len(gates)} вентилей"
+    print(f"{label}: {elapsed * 1000:.1f} мс на проход, "
+          f"{elapsed / len(gates) * 1e9:.0f} нс на вентиль")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import json
+import logging
+import struct
+import sys
+from array import array
+
+from logic_gates import GATE_CLASSES, OPCODES, OPCODE_NAMES, SOURCE_OPCODES, INPUT_PIN_COUNTS
+from netlist import Netlist
+
+
+FORMAT_NAME = "logic-gate-simulator"
+FORMAT_VERSION = 1
+
+# Двоичный формат: заголовок, затем массивы подряд - коды типов (по байту,
+# OPCODES из logic_gates), значения Input/триггеров (по байту), координаты
+# (float32 x, y) и провода (int32 src, dst, pin)
+BINARY_MAGIC = b"LGSC"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<4sHII")
+
+
+class CircuitData:
+    """Схема без графики: типы вентилей, позиции, значения Input/триггеров и провода.
+
+    Провод - тройка (src, dst, pin_index): номер вентиля-источника,
+    номер вентиля-приемника и номер его входного пина.
+    """
+
+    def __init__(self, types=None, positions=None, values=None, connections=None):
+        self.types = types or []
+        self.positions = positions or []
+        self.values = values or []  # значение Input, DFF и Clock, для остальных вентилей 0
+        self.connections = connections or []
+
+    def __len__(self):
+        return len(self.types)
+
+    def add_gate(self, gate_type, x=0.0, y=0.0, value=0):
+        if gate_type not in GATE_CLASSES:
+            raise ValueError(f"Неизвестный тип вентиля: {gate_type}")
+        self.types.append(gate_type)
+        self.positions.append((x, y))
+        self.values.append(value)
+        return len(self.types) - 1
+
+    def connect(self, src, dst, pin_index=0):
+        self.connections.append((src, dst, pin_index))
+
+    def create_gates(self):
+        """Создает объекты LogicGate для всех вентилей схемы"""
+        gates = []
+        for gate_type, value in zip(self.types, self.values):
+            gate = GATE_CLASSES[gate_type]()
+            if gate.opcode in SOURCE_OPCODES:
+                gate.set_value(value)
+            gates.append(gate)
+        return gates
+
+    def build_netlist(self):
+        """Скомпилированная схема для симуляции без Qt (без объектов LogicGate)"""
+        ops = bytearray(OPCODES[gate_type] for gate_type in self.types)
+        return Netlist.from_ops(ops, self.connections, self.values)
+
+
+def circuit_to_dict(circuit):
+    gates = []
+    for gate_type, (x, y), value in zip(circuit.types, circuit.positions, circuit.values):
+        gate = {"type": gate_type, "x": x, "y": y}
+        if OPCODES[gate_type] in SOURCE_OPCODES:
+            gate["value"] = value
+        gates.append(gate)
+
+    return {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "gates": gates,
+        "wires": [list(connection) for connection in circuit.connections],
+    }
+
+
+def circuit_from_dict(data):
+    if data.get("format") != FORMAT_NAME:
+        raise ValueError("Файл не является схемой Logic Gate Simulator")
+    if data.get("version", 0) > FORMAT_VERSION:
+        raise ValueError(f"Неподдерживаемая версия формата: {data.get('version')}")
+
+    circuit = CircuitData()
+    for gate in data["gates"]:
+        circuit.add_gate(gate["type"], gate.get("x", 0.0), gate.get("y", 0.0), gate.get("value", 0))
+
+    count = len(circuit)
+    for src, dst, pin_index in data["wires"]:
+        if not (0 <= src < count and 0 <= dst < count):
+            raise ValueError(f"Провод ссылается на несуществующий вентиль: {src} -> {dst}")
+        if not 0 <= pin_index < INPUT_PIN_COUNTS[OPCODES[circuit.types[dst]]]:
+            raise ValueError(f"Провод ведет на несуществующий пин: {circuit.types[dst]}[{pin_index}]")
+        circuit.connect(src, dst, pin_index)
+
+    return circuit
+
+
+def save_json(circuit, path):
+    """Сохраняет схему в JSON"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(circuit_to_dict(circuit), f, ensure_ascii=False)
+    logging.info(f"Схема сохранена: {path} ({len(circuit)} вентилей)")
+
+
+def load_json(path):
+    """Загружает схему из JSON"""
+    with open(path, "r", encoding="utf-8") as f:
+        circuit = circuit_from_dict(json.load(f))
+    logging.info(f"Схема загружена: {path} ({len(circuit)} вентилей)")
+    return circuit
+
+
+def _to_little_endian(values):
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def save_binary(circuit, path):
+    """Сохраняет схему в компактном двоичном виде"""
+    types = bytes(OPCODES[gate_type] for gate_type in circuit.types)
+    values = bytes(circuit.values)
+    positions = array("f", [coordinate for position in circuit.positions for coordinate in position])
+    wires = array("i", [number for connection in circuit.connections for number in connection])
+
+    with open(path, "wb") as f:
+        f.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(circuit), len(circuit.connections)))
+        f.write(types)
+        f.write(values)
+        f.write(_to_little_endian(positions).tobytes())
+        f.write(_to_little_endian(wires).tobytes())
+    logging.info(f"Схема сохранена: {path} ({len(circuit)} вентилей)")
+
+
+def load_binary(path):
+    """Загружает схему из двоичного файла"""
+    with open(path, "rb") as f:
+        data = f.read()
+
+    if len(data) < BINARY_HEADER.size:
+        raise ValueError("Файл схемы поврежден")
+    magic, version, gate_count, wire_count = BINARY_HEADER.unpack_from(data)
+    if magic != BINARY_MAGIC:
+        raise ValueError("Файл не является схемой Logic Gate Simulator")
+    if version > BINARY_VERSION:
+        raise ValueError(f"Неподдерживаемая версия формата: {version}")
+
+    offset = BINARY_HEADER.size
+    types = data[offset:offset + gate_count]
+    offset += gate_count
+    values = data[offset:offset + gate_count]
+    offset += gate_count
+
+    positions = array("f")
+    positions.frombytes(data[offset:offset + gate_count * 2 * positions.itemsize])
+    offset += gate_count * 2 * positions.itemsize
+    wires = array("i")
+    wires.frombytes(data[offset:offset + wire_count * 3 * wires.itemsize])
+    _to_little_endian(positions)
+    _to_little_endian(wires)
+
+    if len(types) != gate_count or len(wires) != wire_count * 3:
+        raise ValueError("Файл схемы поврежден")
+    if any(code >= len(OPCODE_NAMES) for code in types):
+        raise ValueError("Неизвестный тип вентиля в файле")
+    if wire_count and not (0 <= min(wires[0::3] + wires[1::3]) and
+                           max(wires[0::3] + wires[1::3]) < gate_count):
+        raise ValueError("Провод ссылается на несуществующий вентиль")
+    if any(not 0 <= pin < INPUT_PIN_COUNTS[types[dst]] for dst, pin in zip(wires[1::3], wires[2::3])):
+        raise ValueError("Провод ведет на несуществующий пин")
+
+    circuit = CircuitData(
+        types=[OPCODE_NAMES[code] for code in types],
+        positions=list(zip(positions[0::2], positions[1::2])),
+        values=list(values),
+        connections=list(zip(wires[0::3], wires[1::3], wires[2::3])),
+    )
+    logging.info(f"Схема загружена: {path} ({len(circuit)} вентилей)")
+    return circuit
+
+
+def save_circuit(circuit, path):
+    """Сохраняет схему: .json - в JSON, иначе - в двоичном виде"""
+    if str(path).lower().endswith(".json"):
+        save_json(circuit, path)
+    else:
+        save_binary(circuit, path)
+
+
+def load_circuit(path):
+    """Загружает схему любого из двух форматов (определяется по содержимому)"""
+    with open(path, "rb") as f:
+        magic = f.read(len(BINARY_MAGIC))
+    if magic == BINARY_MAGIC:
+        return load_binary(path)
+    return load_json(path)
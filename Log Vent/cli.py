@@ -0,0 +1,282 @@
+"""Симулятор без графического интерфейса (PyQt6 не импортируется).
+
+Примеры:
+    python -m cli simulate схема.json --inputs 101
+    python -m cli table схема1.json схема2.json --output-dir results --format bin
+    python -m cli run счетчик.lgs --cycles 1000000
+    python -m cli run счетчик.lgs --cycles 1000 --vcd-dir traces
+    python -m cli table большая.lgs --optimize --format bin
+    python -m cli analyze сумматор64.lgs --cubes 5
+    python -m cli equiv схема.lgs упрощенная.lgs
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+from bdd import SymbolicCircuit, BddTooLarge, check_equivalence, DEFAULT_MAX_NODES
+from circuit_io import load_circuit
+from logic_gates import OP_OUTPUT
+from optimize import optimize
+from signal_trace import SignalTrace, DEFAULT_DEPTH
+from truth_engine import compute_truth_table, column_layout, column_headers, write_csv, write_binary
+
+
+def output_path(output_dir, circuit_path, extension):
+    stem = os.path.splitext(os.path.basename(circuit_path))[0]
+    return os.path.join(output_dir, stem + extension)
+
+
+def parse_bits(text, count):
+    """Строка вида '0110' -> [0, 1, 1, 0]"""
+    if len(text) != count or any(char not in "01" for char in text):
+        raise ValueError(f"Ожидалось {count} значений входов из 0 и 1, получено '{text}'")
+    return [int(char) for char in text]
+
+
+def compile_circuit(path, args):
+    """Схема из файла: (netlist, input_ids, column_ids, headers).
+
+    С --optimize схема упрощается, в колонках остаются только Input и Output
+    (промежуточные вентили могли слиться или исчезнуть).
+    """
+    circuit = load_circuit(path)
+    netlist = circuit.build_netlist()
+    input_ids, column_ids = column_layout(netlist.ops, [x for x, y in circuit.positions])
+    if args.optimize:
+        column_ids = input_ids + [gid for gid in column_ids if netlist.ops[gid] == OP_OUTPUT]
+    headers = column_headers([netlist.kind(gid) for gid in column_ids])
+
+    if args.optimize:
+        optimized = optimize(netlist)
+        print(f"{path}: {optimized.report}", file=sys.stderr)
+        netlist = optimized.netlist
+        input_ids = optimized.map_ids(input_ids)
+        column_ids = optimized.map_ids(column_ids)
+    return netlist, input_ids, column_ids, headers
+
+
+def format_bits(values):
+    """[0, 1, None] -> '01x' (x - любое значение)"""
+    return "".join("x" if value is None else str(value) for value in values)
+
+
+def output_columns(netlist, column_ids, headers):
+    """Колонки Output: пары (ID, заголовок)"""
+    return [(gid, header) for gid, header in zip(column_ids, headers) if netlist.ops[gid] == OP_OUTPUT]
+
+
+def run_simulate(path, args):
+    """Один проход симуляции: значения всех вентилей в порядке колонок таблицы"""
+    started = time.perf_counter()
+    netlist, input_ids, column_ids, headers = compile_circuit(path, args)
+    compiled = time.perf_counter()
+
+    input_values = None
+    if args.inputs is not None:
+        # В командной строке входы идут слева направо, netlist ждет их в порядке ID
+        bits = dict(zip(input_ids, parse_bits(args.inputs, len(input_ids))))
+        input_values = [bits[gid] for gid in netlist.input_ids]
+    values = netlist.simulate(input_values)
+    finished = time.perf_counter()
+
+    lines = [",".join(headers), ",".join(str(values[gid]) for gid in column_ids)]
+    if args.output_dir:
+        with open(output_path(args.output_dir, path, ".csv"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+    else:
+        print("\n".join(lines))
+
+    print(f"{path}: {len(netlist)} вентилей, загрузка {(compiled - started) * 1000:.1f} мс, "
+          f"симуляция {(finished - compiled) * 1000:.2f} мс", file=sys.stderr)
+
+
+def run_cycles(path, args):
+    """Тактовая симуляция: args.cycles тактов, значения всех вентилей после последнего"""
+    started = time.perf_counter()
+    netlist, input_ids, column_ids, headers = compile_circuit(path, args)
+    compiled = time.perf_counter()
+
+    if args.inputs is not None:
+        for gid, bit in zip(input_ids, parse_bits(args.inputs, len(input_ids))):
+            netlist.values[gid] = bit
+
+    trace = None
+    if args.vcd_dir:
+        # Пишутся все вентили: начальное состояние и по шагу на такт
+        trace = SignalTrace(column_ids, headers, depth=args.trace_depth)
+        trace.record(netlist.simulate())
+    values = netlist.run(args.cycles, trace)
+    finished = time.perf_counter()
+
+    if trace is not None:
+        trace.save_vcd(output_path(args.vcd_dir, path, ".vcd"))
+    lines = [",".join(headers), ",".join(str(values[gid]) for gid in column_ids)]
+    if args.output_dir:
+        with open(output_path(args.output_dir, path, ".csv"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+    else:
+        print("\n".join(lines))
+
+    elapsed = finished - compiled
+    print(f"{path}: {len(netlist)} вентилей, {args.cycles} тактов, загрузка {(compiled - started) * 1000:.1f} мс, "
+          f"симуляция {elapsed * 1000:.1f} мс ({args.cycles / elapsed:.0f} тактов/с)", file=sys.stderr)
+
+
+def run_table(path, args):
+    """Полная таблица истинности в CSV или двоичном виде"""
+    started = time.perf_counter()
+    netlist, input_ids, column_ids, headers = compile_circuit(path, args)
+    compiled = time.perf_counter()
+
+    result = compute_truth_table(netlist, input_ids, backend=args.backend, workers=args.workers)
+    computed = time.perf_counter()
+
+    if args.format == "bin":
+        if args.output_dir:
+            with open(output_path(args.output_dir, path, ".bin"), "wb") as f:
+                write_binary(result, column_ids, headers, f)
+        else:
+            write_binary(result, column_ids, headers, sys.stdout.buffer)
+    else:
+        if args.output_dir:
+            with open(output_path(args.output_dir, path, ".csv"), "w", encoding="utf-8", newline="") as f:
+                write_csv(result, column_ids, headers, f)
+        else:
+            write_csv(result, column_ids, headers, sys.stdout)
+    written = time.perf_counter()
+
+    print(f"{path}: {len(netlist)} вентилей, {result.row_count} строк, "
+          f"загрузка {(compiled - started) * 1000:.1f} мс, расчет {(computed - compiled) * 1000:.1f} мс, "
+          f"запись {(written - computed) * 1000:.1f} мс", file=sys.stderr)
+
+
+def run_analyze(path, args):
+    """Символьный анализ выходов на BDD - без перебора строк таблицы"""
+    started = time.perf_counter()
+    netlist, input_ids, column_ids, headers = compile_circuit(path, args)
+    outputs = output_columns(netlist, column_ids, headers)
+    symbolic = SymbolicCircuit(netlist, input_ids, [gid for gid, header in outputs], args.max_nodes)
+
+    rows = 1 << len(input_ids)
+    input_headers = ",".join(headers[:len(input_ids)])
+    print(f"{path}: {len(input_ids)} входов ({input_headers}), {rows} строк")
+    for gid, header in outputs:
+        ones = symbolic.count_ones(gid)
+        example = symbolic.satisfy(gid)
+        line = f"{header}: 1 в {ones} строках ({ones / rows:.4%})"
+        if example is not None:
+            line += f", например {format_bits(example)}"
+        print(line)
+        if args.cubes:
+            for k, cube in enumerate(symbolic.cubes(gid)):
+                if k == args.cubes:
+                    print("    ...")
+                    break
+                print(f"    {format_bits(cube)}")
+
+    print(f"{path}: {len(symbolic.bdd)} узлов BDD, {(time.perf_counter() - started) * 1000:.1f} мс",
+          file=sys.stderr)
+
+
+def run_equiv(args):
+    """Эквивалентность двух схем: Input и Output сопоставляются слева направо"""
+    first = compile_circuit(args.first, args)
+    second = compile_circuit(args.second, args)
+    first_outputs = output_columns(first[0], first[2], first[3])
+    second_outputs = output_columns(second[0], second[2], second[3])
+
+    difference = check_equivalence(first[0], second[0], first[1], second[1],
+                                   [gid for gid, header in first_outputs],
+                                   [gid for gid, header in second_outputs], args.max_nodes)
+    if difference is None:
+        print(f"{args.first} и {args.second} эквивалентны")
+        return 0
+    k, inputs = difference
+    print(f"{args.first} и {args.second} различаются на выходе {first_outputs[k][1]} "
+          f"при входах {format_bits(inputs)}")
+    return 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m cli",
+                                     description="Logic Gate Simulator без графического интерфейса")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    simulate = commands.add_parser("simulate", help="один проход симуляции")
+    simulate.add_argument("circuits", nargs="+", help="файлы схем")
+    simulate.add_argument("--inputs", help="значения Input слева направо, например 0110 "
+                                           "(по умолчанию - сохраненные в файле)")
+    simulate.add_argument("--output-dir", help="куда писать результаты (по умолчанию - stdout)")
+
+    cycles = commands.add_parser("run", help="тактовая симуляция (триггеры и Clock)")
+    cycles.add_argument("circuits", nargs="+", help="файлы схем")
+    cycles.add_argument("--cycles", type=int, default=1, help="число тактов")
+    cycles.add_argument("--inputs", help="значения Input слева направо на все такты "
+                                         "(по умолчанию - сохраненные в файле)")
+    cycles.add_argument("--output-dir", help="куда писать результаты (по умолчанию - stdout)")
+    cycles.add_argument("--vcd-dir", help="куда писать запись сигналов по тактам (.vcd)")
+    cycles.add_argument("--trace-depth", type=int, default=DEFAULT_DEPTH,
+                        help="сколько последних тактов хранить в записи")
+
+    table = commands.add_parser("table", help="полная таблица истинности")
+    table.add_argument("circuits", nargs="+", help="файлы схем")
+    table.add_argument("--format", choices=("csv", "bin"), default="csv")
+    table.add_argument("--output-dir", help="куда писать результаты (по умолчанию - stdout)")
+    table.add_argument("--backend", choices=("auto", "int", "numpy"), default="auto")
+    table.add_argument("--workers", type=int, default=1, help="число процессов для расчета")
+
+    analyze = commands.add_parser("analyze", help="символьный анализ выходов (BDD, без перебора)")
+    analyze.add_argument("circuits", nargs="+", help="файлы схем")
+    analyze.add_argument("--cubes", type=int, default=0,
+                         help="показать до N наборов входов, при которых выход равен 1")
+
+    equiv = commands.add_parser("equiv", help="проверка эквивалентности двух схем (BDD)")
+    equiv.add_argument("first", help="первая схема")
+    equiv.add_argument("second", help="вторая схема")
+
+    for command in (simulate, cycles, table, analyze, equiv):
+        command.add_argument("--optimize", action="store_true",
+                             help="упростить схему перед расчетом (в колонках - только Input и Output)")
+    for command in (analyze, equiv):
+        command.add_argument("--max-nodes", type=int, default=DEFAULT_MAX_NODES,
+                             help="предел размера BDD")
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s - %(message)s')
+
+    if args.command == "equiv":
+        try:
+            return run_equiv(args)
+        except (OSError, ValueError, KeyError, BddTooLarge) as e:
+            print(f"ошибка - {e}", file=sys.stderr)
+            return 2
+
+    if getattr(args, "output_dir", None):
+        os.makedirs(args.output_dir, exist_ok=True)
+    if getattr(args, "vcd_dir", None):
+        os.makedirs(args.vcd_dir, exist_ok=True)
+
+    run = {"simulate": run_simulate, "run": run_cycles, "table": run_table, "analyze": run_analyze}[args.command]
+    started = time.perf_counter()
+    failed = 0
+    for path in args.circuits:
+        try:
+            run(path, args)
+        except (OSError, ValueError, KeyError, BddTooLarge) as e:
+            failed += 1
+            print(f"{path}: ошибка - {e}", file=sys.stderr)
+
+    if len(args.circuits) > 1:
+        print(f"Всего: {len(args.circuits)} схем, ошибок {failed}, "
+              f"{time.perf_counter() - started:.2f} с", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
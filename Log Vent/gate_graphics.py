@@ -1,12 +1,39 @@
 from PyQt6.QtWidgets import QGraphicsItem
-from PyQt6.QtCore import QRectF, Qt, QPoint
-from PyQt6.QtGui import QPen, QBrush, QColor, QPainterPath
+from PyQt6.QtCore import QRectF, Qt, QPointF
+from PyQt6.QtGui import QPen, QBrush, QColor, QPainterPath, QPolygonF, QFont
 
 from pin_graphics import PinGraphicsItem
 from logic_gates import AndGate, OrGate, NotGate,\
-    InputGate, OutputGate, NandGate, NorGate, XorGate  # ← Добавил InputGate и OutputGate
+    InputGate, OutputGate, NandGate, NorGate, XorGate, DFlipFlop, ClockGate  # ← Добавил InputGate и OutputGate
 
 import logging
+
+# Уровень детализации (option.levelOfDetailFromTransform - масштаб отрисовки):
+# мельче LOD_SHAPE вентиль - закрашенный прямоугольник, мельче LOD_TEXT - контур без подписей
+LOD_SHAPE = 0.3
+LOD_TEXT = 0.6
+
+ONE_BRUSH = QBrush(QColor(100, 255, 100))  # Зеленый для 1
+ZERO_BRUSH = QBrush(QColor(255, 100, 100))  # Красный для 0
+BLACK_BRUSH = QBrush(Qt.GlobalColor.black)
+
+# Контуры по (класс, ширина, высота) и жирные шрифты по размеру - общие для всех вентилей
+_outlines = {}
+_fonts = {}
+
+
+def bold_font(painter, size=None):
+    """Жирный вариант шрифта painter (size - размер в пунктах), создается один раз"""
+    font = _fonts.get(size)
+    if font is None:
+        font = QFont(painter.font())
+        font.setBold(True)
+        if size is not None:
+            font.setPointSize(size)
+        _fonts[size] = font
+    return font
+
+
 class GateGraphicsItem(QGraphicsItem):
     def __init__(self, gate, width=80, height=60):
         super().__init__()
@@ -42,28 +69,43 @@ class GateGraphicsItem(QGraphicsItem):
         return None
 
     def itemChange(self, change, value):
-        if change == QGraphicsItem.GraphicsItemChange.ItemPositionHasChanged:
-            try:
-                # Логируем ТОЛЬКО если вентиль действительно переместился значительно
-                current_pos = self.pos()
-                if not hasattr(self, '_last_logged_pos'):
-                    self._last_logged_pos = current_pos
-
-                # Логируем только если переместились больше чем на 10 пикселей
-                distance = (current_pos - self._last_logged_pos).manhattanLength()
-                if distance > 10:
-                    logging.debug(f"Вентиль {self.gate.name} перемещен в {current_pos.x():.0f}, {current_pos.y():.0f}")
-                    self._last_logged_pos = current_pos
-
-                # Обновляем провода БЕЗ логирования
-                for pin in self.input_pins + self.output_pins:
-                    for wire in pin.connected_wires:
-                        wire.update_position()
-
-                # УБРАЛ ВЫЗОВ СИМУЛЯЦИИ - он вызывает рекурсию
-
-            except Exception as e:
-                logging.error(f"Ошибка при перемещении вентиля {self.gate.name}: {e}")
+        if change == QGraphicsItem.GraphicsItemChange.ItemSceneChange:
+            # Уходим со сцены - освобождаем место в индексе расстановки
+            occupancy = getattr(self.scene(), 'occupancy', None)
+            if occupancy is not None:
+                occupancy.remove(self)
+        elif change == QGraphicsItem.GraphicsItemChange.ItemSceneHasChanged:
+            occupancy = getattr(self.scene(), 'occupancy', None)
+            if occupancy is not None:
+                occupancy.add(self, self.x(), self.y(), self.width, self.height)
+        elif change == QGraphicsItem.GraphicsItemChange.ItemPositionHasChanged:
+            scene = self.scene()
+            occupancy = getattr(scene, 'occupancy', None)
+            if occupancy is not None:
+                occupancy.move(self, self.x(), self.y())
+                scene.include(self.sceneBoundingRect())  # поле растет вслед за вентилем
+
+            # Логируем ТОЛЬКО если вентиль действительно переместился значительно
+            current_pos = self.pos()
+            if not hasattr(self, '_last_logged_pos'):
+                self._last_logged_pos = current_pos
+
+            # Логируем только если переместились больше чем на 10 пикселей
+            distance = (current_pos - self._last_logged_pos).manhattanLength()
+            if distance > 10:
+                logging.debug(f"Вентиль {self.gate.name} перемещен в {current_pos.x():.0f}, {current_pos.y():.0f}")
+                self._last_logged_pos = current_pos
+
+            # Провода: сцена схемы перестраивает их одним проходом после всех
+            # перемещений (общий провод двух вентилей - один раз), иначе сразу
+            wires = [wire for pin in self.input_pins + self.output_pins for wire in pin.connected_wires]
+            if occupancy is not None:
+                scene.schedule_wires(wires)
+            else:
+                for wire in wires:
+                    wire.update_position()
+
+            # УБРАЛ ВЫЗОВ СИМУЛЯЦИИ - он вызывает рекурсию
 
         return super().itemChange(change, value)
     def create_pins(self):
@@ -89,15 +131,41 @@ class GateGraphicsItem(QGraphicsItem):
     def boundingRect(self):
         return QRectF(0, 0, self.width, self.height)
 
+    def outlines(self):
+        """Контуры вентиля - общие для всех вентилей класса и размера, строятся один раз"""
+        key = (type(self), self.width, self.height)
+        paths = _outlines.get(key)
+        if paths is None:
+            paths = _outlines[key] = self.build_outlines()
+        return paths
+
+    def build_outlines(self):
+        path = QPainterPath()
+        path.addRect(0, 0, self.width, self.height)
+        return (path,)
+
+    def current_brush(self):
+        return self.brush
+
     def paint(self, painter, option, widget):
-        painter.setPen(self.pen)
-        painter.setBrush(self.brush)
-        painter.drawRect(0, 0, self.width, self.height)
+        # Мелко - только цветной прямоугольник, средне - контур без подписей
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        if lod < LOD_SHAPE:
+            painter.fillRect(self.boundingRect(), self.current_brush())
+            return
 
-        # Отображаем название и текущее значение
-        value = self.gate.get_output()
+        painter.setPen(self.pen)
+        painter.setBrush(self.current_brush())
+        for path in self.outlines():
+            painter.drawPath(path)
+        if lod >= LOD_TEXT:
+            self.paint_details(painter)
+
+    def paint_details(self, painter):
+        """Подписи и значки поверх контура. Значение берется из output -
+        его записывает симуляция, в paint() ничего не вычисляется"""
         painter.drawText(self.boundingRect(), Qt.AlignmentFlag.AlignCenter,
-                         f"{self.gate.name}\n{value}")
+                         f"{self.gate.name}\n{self.gate.output}")
 
 
 class AndGateGraphicsItem(GateGraphicsItem):
@@ -105,10 +173,7 @@ class AndGateGraphicsItem(GateGraphicsItem):
         gate = AndGate()
         super().__init__(gate)
 
-    def paint(self, painter, option, widget):
-        painter.setPen(self.pen)
-        painter.setBrush(self.brush)
-
+    def build_outlines(self):
         # AND gate - прямоугольник со скруглением только справа (увеличили радиус)
         path = QPainterPath()
         path.moveTo(0, 0)  # Левый верхний
@@ -117,13 +182,10 @@ class AndGateGraphicsItem(GateGraphicsItem):
         path.arcTo(self.width - 50, self.height - 50, 50, 50, 0, -90)  # Нижнее правое скругление (радиус 20)
         path.lineTo(0, self.height)  # Влево до низа
         path.closeSubpath()  # Замыкаем путь
+        return (path,)
 
-        painter.drawPath(path)
-
-        # Текст
-        font = painter.font()
-        font.setBold(True)
-        painter.setFont(font)
+    def paint_details(self, painter):
+        painter.setFont(bold_font(painter))
         painter.drawText(self.boundingRect(), Qt.AlignmentFlag.AlignCenter, "AND")
 
 class OrGateGraphicsItem(GateGraphicsItem):
@@ -131,10 +193,7 @@ class OrGateGraphicsItem(GateGraphicsItem):
         gate = OrGate()
         super().__init__(gate)
 
-    def paint(self, painter, option, widget):
-        painter.setPen(self.pen)
-        painter.setBrush(self.brush)
-
+    def build_outlines(self):
         # OR gate - правильная форма с вогнутой левой стороной и острием справа
         path = QPainterPath()
 
@@ -149,13 +208,10 @@ class OrGateGraphicsItem(GateGraphicsItem):
 
         # Левая вогнутая сторона - закрываем фигуру
         path.quadTo(self.width / 4, self.height / 2, 0, 0)
+        return (path,)
 
-        painter.drawPath(path)
-
-        # Символ OR
-        font = painter.font()
-        font.setBold(True)
-        painter.setFont(font)
+    def paint_details(self, painter):
+        painter.setFont(bold_font(painter))
         painter.drawText(self.boundingRect(), Qt.AlignmentFlag.AlignCenter, "OR")
 
 
@@ -168,34 +224,29 @@ class NotGateGraphicsItem(GateGraphicsItem):
         self.create_input_pins(1)
         self.create_output_pins(1)
 
-    def paint(self, painter, option, widget):
-        painter.setPen(self.pen)
-        painter.setBrush(self.brush)
-
+    def build_outlines(self):
         # NOT gate - большой треугольник
-        triangle = [
-            QPoint(5, self.height // 2),  # Левая точка почти у края
-            QPoint(self.width - 10, 5),  # Правая верхняя почти у края
-            QPoint(self.width - 10, self.height - 5)  # Правая нижняя почти у края
-        ]
-        painter.drawPolygon(triangle)
+        triangle = QPainterPath()
+        triangle.addPolygon(QPolygonF([
+            QPointF(5, self.height // 2),  # Левая точка почти у края
+            QPointF(self.width - 10, 5),  # Правая верхняя почти у края
+            QPointF(self.width - 10, self.height - 5),  # Правая нижняя почти у края
+        ]))
+        triangle.closeSubpath()
 
         # Кружок инверсии на выходе (за треугольником)
-        painter.drawEllipse(self.width - 5, self.height // 2 - 4, 8, 8)
-
-        # Текст "NOT" - сдвинули вправо для центрирования
-        font = painter.font()
-        font.setBold(True)
-        font.setPointSize(9)
-        painter.setFont(font)
+        circle = QPainterPath()
+        circle.addEllipse(self.width - 5, self.height // 2 - 4, 8, 8)
+        return triangle, circle
 
+    def paint_details(self, painter):
         # Черный кружок инверсии на выходе
-        painter.setBrush(QBrush(Qt.GlobalColor.black))
+        painter.setBrush(BLACK_BRUSH)
         painter.drawEllipse(self.width - 20, self.height // 2 - 5, 10, 10)
 
-        # Сдвигаем текст вправо для центрирования в треугольнике
-        text_rect = QRectF(30, 20, 30, 20)  # Было (20, 20, 40, 20)
-        painter.drawText(text_rect, Qt.AlignmentFlag.AlignCenter, "NOT")
+        # Текст "NOT" сдвинут вправо для центрирования в треугольнике
+        painter.setFont(bold_font(painter, 9))
+        painter.drawText(QRectF(30, 20, 30, 20), Qt.AlignmentFlag.AlignCenter, "NOT")
 
 
 class NandGateGraphicsItem(GateGraphicsItem):
@@ -203,10 +254,7 @@ class NandGateGraphicsItem(GateGraphicsItem):
         gate = NandGate()
         super().__init__(gate)
 
-    def paint(self, painter, option, widget):
-        painter.setPen(self.pen)
-        painter.setBrush(self.brush)
-
+    def build_outlines(self):
         # NAND = AND с кружком инверсии
         path = QPainterPath()
         path.moveTo(0, 0)
@@ -215,16 +263,14 @@ class NandGateGraphicsItem(GateGraphicsItem):
         path.arcTo(self.width - 40, self.height - 40, 40, 40, 0, -90)
         path.lineTo(0, self.height)
         path.closeSubpath()
-        painter.drawPath(path)
+        return (path,)
 
+    def paint_details(self, painter):
         # Черный кружок инверсии (как у NOT)
-        painter.setBrush(QBrush(Qt.GlobalColor.black))
+        painter.setBrush(BLACK_BRUSH)
         painter.drawEllipse(self.width - 15, self.height // 2 - 5, 10, 10)
 
-        # Текст
-        font = painter.font()
-        font.setBold(True)
-        painter.setFont(font)
+        painter.setFont(bold_font(painter))
         painter.drawText(QRectF(10, 0, self.width - 30, self.height), Qt.AlignmentFlag.AlignCenter, "NAND")
 
 
@@ -233,26 +279,21 @@ class NorGateGraphicsItem(GateGraphicsItem):
         gate = NorGate()
         super().__init__(gate)
 
-    def paint(self, painter, option, widget):
-        painter.setPen(self.pen)
-        painter.setBrush(self.brush)
-
+    def build_outlines(self):
         # NOR = OR с кружком инверсии (правильная форма OR)
         path = QPainterPath()
         path.moveTo(0, 0)
         path.quadTo(self.width / 2, 0, self.width, self.height / 2)
         path.quadTo(self.width / 2, self.height, 0, self.height)
         path.quadTo(self.width / 4, self.height / 2, 0, 0)
-        painter.drawPath(path)
+        return (path,)
 
+    def paint_details(self, painter):
         # Черный кружок инверсии на выходе
-        painter.setBrush(QBrush(Qt.GlobalColor.black))
+        painter.setBrush(BLACK_BRUSH)
         painter.drawEllipse(self.width - 20, self.height // 2 - 5, 10, 10)
 
-        # Текст
-        font = painter.font()
-        font.setBold(True)
-        painter.setFont(font)
+        painter.setFont(bold_font(painter))
         painter.drawText(self.boundingRect(), Qt.AlignmentFlag.AlignCenter, "NOR")
 
 
@@ -261,10 +302,7 @@ class XorGateGraphicsItem(GateGraphicsItem):
         gate = XorGate()
         super().__init__(gate)
 
-    def paint(self, painter, option, widget):
-        painter.setPen(self.pen)
-        painter.setBrush(self.brush)
-
+    def build_outlines(self):
         # XOR = OR с дополнительной вогнутой кривой слева
         # Основная форма (как у OR)
         path = QPainterPath()
@@ -285,14 +323,10 @@ class XorGateGraphicsItem(GateGraphicsItem):
         path2.quadTo(self.width / 2 - 10, 0, self.width - 5, self.height / 2)
         path2.quadTo(self.width / 2 - 10, self.height, 5, self.height)
         path2.quadTo(self.width / 4 - 5, self.height / 2, 5, 0)
+        return path, path2
 
-        painter.drawPath(path)
-        painter.drawPath(path2)
-
-        # Текст
-        font = painter.font()
-        font.setBold(True)
-        painter.setFont(font)
+    def paint_details(self, painter):
+        painter.setFont(bold_font(painter))
         painter.drawText(self.boundingRect(), Qt.AlignmentFlag.AlignCenter, "XOR")
 
 
@@ -304,18 +338,17 @@ class InputGateGraphicsItem(GateGraphicsItem):
     def create_pins(self):
         self.create_output_pins(1)
 
-    def paint(self, painter, option, widget):
-        painter.setPen(self.pen)
+    def build_outlines(self):
+        # Input - прямоугольник со скругленными углами
+        path = QPainterPath()
+        path.addRoundedRect(0, 0, self.width, self.height, 5, 5)
+        return (path,)
 
+    def current_brush(self):
         # Цвет зависит от значения
-        if self.gate.get_output() == 1:
-            self.brush = QBrush(QColor(100, 255, 100))  # Зеленый для 1
-        else:
-            self.brush = QBrush(QColor(255, 100, 100))  # Красный для 0
+        return ONE_BRUSH if self.gate.value == 1 else ZERO_BRUSH
 
-        painter.setBrush(self.brush)
-        # Input - прямоугольник со скругленными углами
-        painter.drawRoundedRect(0, 0, self.width, self.height, 5, 5)
+    def paint_details(self, painter):
         painter.drawText(self.boundingRect(), Qt.AlignmentFlag.AlignCenter, "IN")
 
 class OutputGateGraphicsItem(GateGraphicsItem):
@@ -326,16 +359,65 @@ class OutputGateGraphicsItem(GateGraphicsItem):
     def create_pins(self):
         self.create_input_pins(1)
 
-    def paint(self, painter, option, widget):
-        painter.setPen(self.pen)
+    def build_outlines(self):
+        # Output - прямоугольник со скругленными углами
+        path = QPainterPath()
+        path.addRoundedRect(0, 0, self.width, self.height, 5, 5)
+        return (path,)
 
-        # Цвет зависит от значения
-        if self.gate.get_output() == 1:
-            self.brush = QBrush(QColor(100, 255, 100))  # Зеленый для 1
-        else:
-            self.brush = QBrush(QColor(255, 100, 100))  # Красный для 0
+    def current_brush(self):
+        # Цвет зависит от значения, посчитанного симуляцией
+        return ONE_BRUSH if self.gate.output == 1 else ZERO_BRUSH
 
-        painter.setBrush(self.brush)
-        # Output - прямоугольник со скругленными углами
-        painter.drawRoundedRect(0, 0, self.width, self.height, 5, 5)
-        painter.drawText(self.boundingRect(), Qt.AlignmentFlag.AlignCenter, "OUT")
\ No newline at end of file
+    def paint_details(self, painter):
+        painter.drawText(self.boundingRect(), Qt.AlignmentFlag.AlignCenter, "OUT")
+
+
+class DFlipFlopGraphicsItem(GateGraphicsItem):
+    def __init__(self):
+        gate = DFlipFlop()
+        super().__init__(gate, width=60, height=60)
+
+    def create_pins(self):
+        # Пин 0 - D, пин 1 - EN
+        self.create_input_pins(2)
+        self.create_output_pins(1)
+
+    def paint_details(self, painter):
+        # Подписи входов и запомненное значение
+        painter.drawText(QRectF(4, 0, 20, self.height * 2 / 3), Qt.AlignmentFlag.AlignVCenter, "D")
+        painter.drawText(QRectF(4, self.height / 3, 24, self.height * 2 / 3), Qt.AlignmentFlag.AlignVCenter, "EN")
+        painter.setFont(bold_font(painter))
+        painter.drawText(self.boundingRect(), Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter,
+                         f"{self.gate.value} ")
+
+
+class ClockGraphicsItem(GateGraphicsItem):
+    def __init__(self):
+        gate = ClockGate()
+        super().__init__(gate, width=50, height=30)
+
+    def create_pins(self):
+        self.create_output_pins(1)
+
+    def current_brush(self):
+        # Цвет зависит от значения, как у Input
+        return ONE_BRUSH if self.gate.value == 1 else ZERO_BRUSH
+
+    def paint_details(self, painter):
+        painter.drawText(self.boundingRect(), Qt.AlignmentFlag.AlignCenter, "CLK")
+
+
+# Графические классы по имени типа вентиля
+GATE_ITEM_CLASSES = {
+    "AND": AndGateGraphicsItem,
+    "OR": OrGateGraphicsItem,
+    "NOT": NotGateGraphicsItem,
+    "INPUT": InputGateGraphicsItem,
+    "OUTPUT": OutputGateGraphicsItem,
+    "NAND": NandGateGraphicsItem,
+    "NOR": NorGateGraphicsItem,
+    "XOR": XorGateGraphicsItem,
+    "DFF": DFlipFlopGraphicsItem,
+    "CLOCK": ClockGraphicsItem,
+}
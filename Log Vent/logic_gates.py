@@ -1,12 +1,84 @@
 import logging
 
 
+# Коды типов вентилей. Netlist хранит тип вентиля байтом с этим кодом,
+# он же записывается в двоичный файл схемы - порядок не менять
+OP_AND = 0
+OP_OR = 1
+OP_NOT = 2
+OP_NAND = 3
+OP_NOR = 4
+OP_XOR = 5
+OP_INPUT = 6
+OP_OUTPUT = 7
+OP_DFF = 8
+OP_CLOCK = 9
+
+OPCODE_NAMES = ["AND", "OR", "NOT", "NAND", "NOR", "XOR", "INPUT", "OUTPUT", "DFF", "CLOCK"]
+OPCODES = {name: opcode for opcode, name in enumerate(OPCODE_NAMES)}
+
+# Число входных пинов по коду типа (как у графических вентилей) - по нему
+# проверяются провода при загрузке схемы
+INPUT_PIN_COUNTS = [2, 2, 1, 2, 2, 2, 0, 1, 2, 0]
+
+# Вентили, значение которых не вычисляется по входам: задается снаружи (Input)
+# или хранится между тактами (триггер, Clock). Их значение - атрибут value
+SOURCE_OPCODES = (OP_INPUT, OP_DFF, OP_CLOCK)
+
+
+# Вентили, которые сейчас вычисляются в get_output() - их входы еще
+# обходятся. Повторное обращение к такому вентилю - обратная связь
+_evaluating = set()
+
+
+class Constant:
+    """Постоянное значение на входе вентиля - источник с тем же get_output(),
+    что и у вентиля"""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def get_output(self):
+        return self.value
+
+
 class LogicGate:
+    __slots__ = ("name", "output", "_inputs", "_sources", "_input_gates")
+    opcode = None
+
     def __init__(self, name):
         self.name = name
         self.output = None
         self.inputs = []  # Список входных соединений (теперь объекты или значения)
 
+    @property
+    def inputs(self):
+        """Входы: вентили или значения. Меняются присваиванием, connect() или set_input() -
+        при изменении списка на месте источники не пересчитываются"""
+        return self._inputs
+
+    @inputs.setter
+    def inputs(self, inputs):
+        self._inputs = inputs
+        self.resolve_sources()
+
+    def resolve_sources(self):
+        """Один раз при подключении превращает входы в функции без аргументов:
+        get_output() вентиля или Constant для значения. compute_output() только
+        вызывает их - без hasattr() и промежуточных списков"""
+        self._sources = tuple(inp.get_output if hasattr(inp, 'get_output') else Constant(inp).get_output
+                              for inp in self._inputs)
+        self._input_gates = tuple(inp for inp in self._inputs if isinstance(inp, LogicGate))
+        self.output = None
+
+    def connect(self, pin_index, source):
+        """Подключает source (вентиль или значение) к входу pin_index"""
+        while len(self._inputs) <= pin_index:
+            self._inputs.append(None)  # Неподключенный пин
+        self._inputs[pin_index] = source
+        self.resolve_sources()
+
     def compute_output(self):
         raise NotImplementedError("Subclasses must implement compute_output()")
 
@@ -15,149 +87,168 @@ class LogicGate:
 
     def get_output(self):
         if self.output is None:
-            self.output = self.compute_output()
+            if _evaluating and self in _evaluating:
+                return None  # обратная связь: значение еще не готово, вход считается пустым
+            for inp in self._input_gates:
+                if inp.output is None:
+                    self._evaluate()
+                    break
+            else:
+                self.output = self.compute_output()  # все входы уже посчитаны
         return self.output
 
+    def _evaluate(self):
+        """Считает выход без рекурсии - глубина схемы не ограничена.
+
+        Явный стек обходит еще не посчитанные входы в глубину. Вентиль
+        попадает в _evaluating, когда его входы положены на стек, и
+        вычисляется, когда снова оказывается наверху - после всех входов.
+        """
+        evaluating = _evaluating
+        stack = [self]
+        try:
+            while stack:
+                gate = stack.pop()
+                if gate.output is not None:
+                    continue
+                if gate in evaluating:
+                    gate.output = gate.compute_output()
+                    evaluating.discard(gate)
+                    continue
+
+                evaluating.add(gate)
+                stack.append(gate)
+                top = len(stack)
+                for inp in gate._input_gates:
+                    if inp.output is None and inp not in evaluating:
+                        stack.append(inp)
+                if len(stack) == top:  # считать нечего - вычисляем сразу
+                    stack.pop()
+                    gate.output = gate.compute_output()
+                    evaluating.discard(gate)
+        except BaseException:
+            # Не оставляем вентили "в процессе" - иначе следующий вызов увидит ложную петлю.
+            # Исключение прерывает и внешние вычисления, так что очищается все
+            evaluating.clear()
+            raise
+
     def set_input(self, input_value):
-        self.inputs.append(input_value)
-        self.output = None
+        self._inputs.append(input_value)
+        self.resolve_sources()
 
 
+# Значения вне 0/1 (неподключенный пин - None) на результат не влияют
+
 class AndGate(LogicGate):
+    __slots__ = ()
+    opcode = OP_AND
+
     def __init__(self):
         super().__init__("AND")
 
     def compute_output(self):
-        if not self.inputs:
-            return 0
-
-        values = []
-        for inp in self.inputs:
-            if hasattr(inp, 'get_output'):
-                values.append(inp.get_output())
-            else:
-                values.append(inp)
-
-        # Фильтруем только 0/1
-        values = [v for v in values if v in (0, 1)]
-
-        if len(values) < 2:
-            return 0
-
-        # AND: все входы должны быть 1
-        return 1 if all(v == 1 for v in values) else 0
+        # AND: все входы должны быть 1, нужно минимум два значения
+        valid = 0
+        for source in self._sources:
+            value = source()
+            if value == 1:
+                valid += 1
+            elif value == 0:
+                return 0
+        return 1 if valid >= 2 else 0
 
 
 class OrGate(LogicGate):
+    __slots__ = ()
+    opcode = OP_OR
+
     def __init__(self):
         super().__init__("OR")
 
     def compute_output(self):
-        if not self.inputs:
-            return 0
-
-        values = []
-        for inp in self.inputs:
-            if hasattr(inp, 'get_output'):
-                values.append(inp.get_output())
-            else:
-                values.append(inp)
-
-        values = [v for v in values if v in (0, 1)]
-
         # OR: хотя бы один вход должен быть 1
-        return 1 if any(v == 1 for v in values) else 0
+        for source in self._sources:
+            if source() == 1:
+                return 1
+        return 0
 
 
 class NotGate(LogicGate):
+    __slots__ = ()
+    opcode = OP_NOT
+
     def __init__(self):
         super().__init__("NOT")
 
     def compute_output(self):
-        if not self.inputs:
+        if not self._sources:
             return 1  # NOT без входа = 1
 
-        input_val = self.inputs[0]
-        if hasattr(input_val, 'get_output'):
-            input_val = input_val.get_output()
-
         # NOT: инвертирует вход
-        return 0 if input_val == 1 else 1
+        return 0 if self._sources[0]() == 1 else 1
 
 
 class NandGate(LogicGate):
+    __slots__ = ()
+    opcode = OP_NAND
+
     def __init__(self):
         super().__init__("NAND")
 
     def compute_output(self):
-        if not self.inputs:
-            return 1
-
-        values = []
-        for inp in self.inputs:
-            if hasattr(inp, 'get_output'):
-                values.append(inp.get_output())
-            else:
-                values.append(inp)
-
-        values = [v for v in values if v in (0, 1)]
-
-        if len(values) < 2:
-            return 1
-
         # NAND = NOT(AND)
-        and_result = 1 if all(v == 1 for v in values) else 0
-        return 0 if and_result == 1 else 1
+        valid = 0
+        for source in self._sources:
+            value = source()
+            if value == 1:
+                valid += 1
+            elif value == 0:
+                return 1
+        return 0 if valid >= 2 else 1
 
 
 class NorGate(LogicGate):
+    __slots__ = ()
+    opcode = OP_NOR
+
     def __init__(self):
         super().__init__("NOR")
 
     def compute_output(self):
-        if not self.inputs:
-            return 1
-
-        values = []
-        for inp in self.inputs:
-            if hasattr(inp, 'get_output'):
-                values.append(inp.get_output())
-            else:
-                values.append(inp)
-
-        values = [v for v in values if v in (0, 1)]
-
         # NOR = NOT(OR)
-        or_result = 1 if any(v == 1 for v in values) else 0
-        return 0 if or_result == 1 else 1
+        for source in self._sources:
+            if source() == 1:
+                return 0
+        return 1
 
 
 class XorGate(LogicGate):
+    __slots__ = ()
+    opcode = OP_XOR
+
     def __init__(self):
         super().__init__("XOR")
 
     def compute_output(self):
-        if not self.inputs:
-            return 0
-
-        values = []
-        for inp in self.inputs:
-            if hasattr(inp, 'get_output'):
-                values.append(inp.get_output())
-            else:
-                values.append(inp)
-
-        values = [v for v in values if v in (0, 1)]
-
-        if len(values) < 2:
+        # XOR: нечетное количество единиц, нужно минимум два значения
+        valid = 0
+        ones = 0
+        for source in self._sources:
+            value = source()
+            if value == 1:
+                valid += 1
+                ones += 1
+            elif value == 0:
+                valid += 1
+        if valid < 2:
             return 0
-
-        # XOR: нечетное количество единиц
-        count_ones = sum(1 for v in values if v == 1)
-        return 1 if count_ones % 2 == 1 else 0
+        return ones & 1
 
 
 class InputGate(LogicGate):
+    __slots__ = ("value",)
+    opcode = OP_INPUT
+
     def __init__(self, initial_value=0):
         super().__init__("INPUT")
         self.value = initial_value
@@ -168,24 +259,76 @@ class InputGate(LogicGate):
 
     def set_value(self, value):
         self.value = value
-        self.inputs[0] = value
+        self._inputs[0] = value
         self.output = value
 
 
 class OutputGate(LogicGate):
+    __slots__ = ()
+    opcode = OP_OUTPUT
+
     def __init__(self):
         super().__init__("OUTPUT")
         self.inputs = []
 
     def compute_output(self):
-        if not self.inputs:
+        if not self._sources:
             return 0
-
-        input_val = self.inputs[0]
-        if hasattr(input_val, 'get_output'):
-            return input_val.get_output()
-        else:
-            return input_val
+        return self._sources[0]()
 
     def get_value(self):
-        return self.get_output()
\ No newline at end of file
+        return self.get_output()
+
+
+class DFlipFlop(LogicGate):
+    """D-триггер: пин 0 - D, пин 1 - EN (необязательный).
+
+    На фронте общего тактового сигнала (Netlist.run()) запоминает D,
+    если EN не подключен или равен 1. Выход - запомненное значение.
+    Регистр - ряд таких триггеров с общим EN.
+    """
+    __slots__ = ("value",)
+    opcode = OP_DFF
+
+    def __init__(self, initial_value=0):
+        super().__init__("DFF")
+        self.value = initial_value
+
+    def compute_output(self):
+        return self.value
+
+    def set_value(self, value):
+        self.value = value
+        self.output = value
+
+
+class ClockGate(LogicGate):
+    """Источник тактового сигнала: значение меняется на каждом такте (0, 1, 0, ...)"""
+    __slots__ = ("value",)
+    opcode = OP_CLOCK
+
+    def __init__(self, initial_value=0):
+        super().__init__("CLOCK")
+        self.value = initial_value
+
+    def compute_output(self):
+        return self.value
+
+    def set_value(self, value):
+        self.value = value
+        self.output = value
+
+
+# Классы вентилей по имени типа - для загрузки схем из файла
+GATE_CLASSES = {
+    "AND": AndGate,
+    "OR": OrGate,
+    "NOT": NotGate,
+    "NAND": NandGate,
+    "NOR": NorGate,
+    "XOR": XorGate,
+    "INPUT": InputGate,
+    "OUTPUT": OutputGate,
+    "DFF": DFlipFlop,
+    "CLOCK": ClockGate,
+}
@@ -1,8 +1,6 @@
+import logging
 import sys
 import traceback
-from PyQt6.QtWidgets import QApplication
-from main_window import MainWindow
-from PyQt6.QtGui import QColor
 
 def except_hook(exc_type, exc_value, exc_tb):
     tb = "".join(traceback.format_exception(exc_type, exc_value, exc_tb))
@@ -22,6 +20,22 @@ sys.excepthook = except_hook
 # main.py - ЗАМЕНЯЕМ функцию main()
 
 def main():
+    # Qt и окно импортируются здесь, а не при загрузке модуля: процессы пула
+    # таблицы истинности (spawn) заново импортируют main.py, Qt им не нужен
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtGui import QColor
+    from main_window import MainWindow
+
+    # Настройка логирования - ОДИН ФАЙЛ. Только в главном процессе: процессы
+    # пула иначе обнуляли бы лог работающего приложения
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('circuit_simulator.log', mode='w')
+        ]
+    )
+
     app = QApplication(sys.argv)
 
     # Устанавливаем стиль Fusion для современного вида
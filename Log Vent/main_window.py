@@ -1,30 +1,28 @@
-from PyQt6.QtWidgets import (QMainWindow, QGraphicsView, QGraphicsScene,
+from PyQt6.QtWidgets import (QMainWindow, QGraphicsView, QGraphicsScene, QGraphicsItem,
                              QToolBar, QPushButton, QVBoxLayout, QWidget,
-                             QDockWidget, QMessageBox)
-from PyQt6.QtGui import QPainter, QAction, QColor, QPen, QBrush
-from PyQt6.QtCore import Qt
+                             QDockWidget, QMessageBox, QFileDialog)
+from PyQt6.QtGui import QPainter, QAction, QColor, QPen
+from PyQt6.QtCore import Qt, QRectF, QLineF, QTimer
 
 from pin_graphics import PinGraphicsItem
 from wire_graphics import WireGraphicsItem
 from gate_graphics import (AndGateGraphicsItem, OrGateGraphicsItem, NotGateGraphicsItem,
                           InputGateGraphicsItem, OutputGateGraphicsItem,
-                          NandGateGraphicsItem, NorGateGraphicsItem, XorGateGraphicsItem)  # Добавил новые  # ← Добавил новые классы
-from logic_gates import AndGate, OrGate, NotGate, InputGate, OutputGate  # ← Добавил InputGate
+                          NandGateGraphicsItem, NorGateGraphicsItem, XorGateGraphicsItem,
+                          GATE_ITEM_CLASSES)  # Добавил новые  # ← Добавил новые классы
+from logic_gates import AndGate, OrGate, NotGate, InputGate, OutputGate, OP_INPUT, OP_OUTPUT, SOURCE_OPCODES  # ← Добавил InputGate
 
 from truth_table import TruthTableWidget
+from netlist import Netlist
+from circuit_io import CircuitData, save_circuit, load_circuit
+from signal_trace import SignalTrace
+from truth_engine import column_headers
+from placement import OccupancyGrid, GRID_SIZE
 import logging
-import random
+import math
+import time
 from datetime import datetime
 
-# Настройка логирования - ОДИН ФАЙЛ
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('circuit_simulator.log', mode='w')
-    ]
-)
-
 # Уровни логирования:
 # DEBUG - отладочная информация (много сообщений)
 # INFO - основная информация (умеренно)
@@ -33,6 +31,59 @@ logging.basicConfig(
 
 LOG_LEVEL = logging.DEBUG # Меняй этот уровень по необходимости
 
+# Пауза в правках схемы (мс), после которой запускается симуляция
+SIMULATION_DELAY_MS = 30
+
+# С какого числа вентилей включается кэш отрисовки (MainWindow.update_gate_caching)
+GATE_CACHE_MIN_ITEMS = 500
+
+
+class CircuitScene(QGraphicsScene):
+    """Сцена схемы с индексом занятых клеток для расстановки вентилей
+    (вентили сами отмечаются в нем при добавлении и перемещении).
+
+    Поле растет вслед за вентилями: include() расширяет сцену так, чтобы
+    вокруг схемы оставалось CANVAS_MARGIN пикселей.
+
+    Провода перемещенных вентилей не перестраиваются сразу: schedule_wires()
+    копит их, update_wires() обходит один раз, когда обработаны все события
+    (перетаскивание сотен выделенных вентилей - один проход на кадр).
+    """
+
+    INITIAL_RECT = QRectF(0, 0, 1200, 600)
+    CANVAS_MARGIN = 400
+
+    def __init__(self):
+        super().__init__()
+        self.occupancy = OccupancyGrid()
+        self.setSceneRect(self.INITIAL_RECT)
+        self.pending_wires = {}  # упорядоченное множество проводов, ждущих update_wires()
+        self.wire_timer = QTimer()
+        self.wire_timer.setSingleShot(True)
+        self.wire_timer.timeout.connect(self.update_wires)
+
+    def schedule_wires(self, wires):
+        pending = self.pending_wires
+        for wire in wires:
+            pending[wire] = None
+        if pending and not self.wire_timer.isActive():
+            self.wire_timer.start(0)
+
+    def update_wires(self):
+        """Перестраивает накопленные провода (удаленные со сцены пропускаются)"""
+        wires = self.pending_wires
+        self.pending_wires = {}
+        for wire in wires:
+            if wire.scene() is self:
+                wire.update_position()
+
+    def include(self, rect):
+        """Расширяет сцену, если rect выходит за ее границы"""
+        scene_rect = self.sceneRect()
+        if not scene_rect.contains(rect):
+            margin = self.CANVAS_MARGIN
+            self.setSceneRect(scene_rect.united(rect.adjusted(-margin, -margin, margin, margin)))
+
 
 class GraphicsView(QGraphicsView):
     def __init__(self, scene, main_window):
@@ -40,17 +91,50 @@ class GraphicsView(QGraphicsView):
         self.main_window = main_window
         self.setDragMode(QGraphicsView.DragMode.RubberBandDrag)
         self.setRenderHint(QPainter.RenderHint.Antialiasing)
+        self.grid_pen = QPen(QColor(230, 230, 230))
+        self.grid_pen.setCosmetic(True)
 
-    def mouseReleaseEvent(self, event):
-        # После перемещения вентилей запускаем симуляцию
-        super().mouseReleaseEvent(event)
-        self.main_window.simulate_circuit()
+    # Реже - линии сетки сливаются, ее не рисуем
+    MIN_GRID_PIXELS = 5
+
+    def drawBackground(self, painter, rect):
+        """Сетка рисуется только в перерисовываемой области - элементов в сцене у нее нет"""
+        super().drawBackground(painter, rect)
+        grid = GRID_SIZE
+        if grid * self.transform().m11() < self.MIN_GRID_PIXELS:
+            return
+
+        left = math.floor(rect.left() / grid) * grid
+        top = math.floor(rect.top() / grid) * grid
+        lines = [QLineF(x, rect.top(), x, rect.bottom()) for x in range(left, math.ceil(rect.right()) + 1, grid)]
+        lines.extend(QLineF(rect.left(), y, rect.right(), y) for y in range(top, math.ceil(rect.bottom()) + 1, grid))
+
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, False)
+        painter.setPen(self.grid_pen)
+        painter.drawLines(lines)
+        painter.restore()
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.selected_pin = None
         self.dragging_gate = None  # Для перетаскивания новых вентилей с панели
+        self.netlist = None  # Скомпилированная схема, пересобирается после изменения соединений
+        self.revision = 0  # Растет при каждом изменении схемы или значений - по нему таблица истинности видит, что устарела
+        self.trace = None  # Запись сигналов (SignalTrace) и вентили, на которых стоят пробы
+        self.trace_gates = []
+        # Вентили и провода на сцене - вместо обхода scene.items(), где лежит все подряд.
+        # Словари служат упорядоченными множествами: порядок добавления, удаление за O(1)
+        self.input_items = {}
+        self.output_items = {}
+        self.other_items = {}
+        self.wires = {}
+        self.gate_cache_mode = QGraphicsItem.CacheMode.NoCache
+        # Симуляция после правок схемы - одна на серию правок (request_simulation)
+        self.simulation_timer = QTimer(self)
+        self.simulation_timer.setSingleShot(True)
+        self.simulation_timer.timeout.connect(self.simulate_circuit)
         self.init_ui()
 
     # main_window.py - ДОБАВЛЯЕМ в начало класса MainWindow (после __init__)
@@ -105,14 +189,14 @@ class MainWindow(QMainWindow):
                 background-color: #c0392b;
             }
 
-            QTableWidget {
+            QTableView {
                 background-color: white;
                 border: 1px solid #cccccc;
                 gridline-color: #e0e0e0;
                 font-family: "Segoe UI", Arial;
             }
 
-            QTableWidget::item {
+            QTableView::item {
                 padding: 5px;
             }
 
@@ -139,14 +223,11 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Logic Gate Simulator")
         self.setGeometry(100, 100, 1400, 900)
 
-        # Создаем графическую сцену
-        self.scene = QGraphicsScene()
-        self.scene.setSceneRect(0, 0, 1200, 600)  # Уменьшили высоту сцены
+        # Создаем графическую сцену (сетку рисует GraphicsView.drawBackground)
+        self.scene = CircuitScene()
 
         # Создаем представление для сцены
         self.view = GraphicsView(self.scene, self)
-        # Добавляем сетку на сцену
-        self.add_grid_to_scene()
 
         # Создаем таблицу истинности
         self.truth_table = TruthTableWidget(self)
@@ -165,26 +246,6 @@ class MainWindow(QMainWindow):
         self.create_toolbar()
         #self.add_test_gates()
 
-    # И добавляем метод в класс MainWindow:
-    def add_grid_to_scene(self):
-        """Добавляет сетку на сцену для удобства позиционирования"""
-        from PyQt6.QtGui import QPen, QBrush
-        from PyQt6.QtCore import Qt
-
-        # Рисуем сетку
-        pen = QPen(QColor(230, 230, 230))
-        pen.setWidth(1)
-
-        grid_size = 20  # Размер ячейки сетки
-
-        # Вертикальные линии
-        for x in range(0, int(self.scene.sceneRect().width()), grid_size):
-            self.scene.addLine(x, 0, x, self.scene.sceneRect().height(), pen)
-
-        # Горизонтальные линии
-        for y in range(0, int(self.scene.sceneRect().height()), grid_size):
-            self.scene.addLine(0, y, self.scene.sceneRect().width(), y, pen)
-
     def create_toolbar(self):
 
 
@@ -204,6 +265,8 @@ class MainWindow(QMainWindow):
         btn_nand = QPushButton("NAND Gate")
         btn_nor = QPushButton("NOR Gate")
         btn_xor = QPushButton("XOR Gate")
+        btn_dff = QPushButton("D Flip-Flop")
+        btn_clock = QPushButton("CLOCK")
 
         # Подключаем кнопки к созданию вентилей
         btn_input.clicked.connect(lambda: self.create_gate("INPUT"))  # ← Новый обработчик
@@ -214,6 +277,8 @@ class MainWindow(QMainWindow):
         btn_nand.clicked.connect(lambda: self.create_gate("NAND"))
         btn_nor.clicked.connect(lambda: self.create_gate("NOR"))
         btn_xor.clicked.connect(lambda: self.create_gate("XOR"))
+        btn_dff.clicked.connect(lambda: self.create_gate("DFF"))
+        btn_clock.clicked.connect(lambda: self.create_gate("CLOCK"))
 
         # Добавляем кнопки в layout
         layout.addWidget(btn_input)  # ← Добавляем в layout
@@ -224,6 +289,8 @@ class MainWindow(QMainWindow):
         layout.addWidget(btn_nand)
         layout.addWidget(btn_nor)
         layout.addWidget(btn_xor)
+        layout.addWidget(btn_dff)
+        layout.addWidget(btn_clock)
         layout.addStretch()
 
         widget.setLayout(layout)
@@ -241,6 +308,30 @@ class MainWindow(QMainWindow):
         # Добавляем разделитель перед кнопкой очистки
         layout.addSpacing(20)  # Отступ сверху
 
+        # Сохранение и загрузка схемы
+        btn_save = QPushButton("💾 Сохранить")
+        btn_save.clicked.connect(self.save_circuit_dialog)
+        layout.addWidget(btn_save)
+
+        btn_open = QPushButton("📂 Открыть")
+        btn_open.clicked.connect(self.open_circuit_dialog)
+        layout.addWidget(btn_open)
+
+        # Один такт: триггеры запоминают D, Clock переключается
+        layout.addSpacing(20)
+        btn_tick = QPushButton("⏱ Такт")
+        btn_tick.clicked.connect(self.clock_tick)
+        layout.addWidget(btn_tick)
+
+        # Запись сигналов по шагам и экспорт в VCD
+        btn_trace = QPushButton("📈 Запись")
+        btn_trace.clicked.connect(self.start_trace)
+        layout.addWidget(btn_trace)
+
+        btn_vcd = QPushButton("💾 VCD")
+        btn_vcd.clicked.connect(self.save_trace_dialog)
+        layout.addWidget(btn_vcd)
+
         self.addDockWidget(Qt.DockWidgetArea.LeftDockWidgetArea, dock)
 
     # И ДОБАВЬ этот метод в класс MainWindow:
@@ -250,115 +341,142 @@ class MainWindow(QMainWindow):
 
     # main_window.py - ДОБАВЛЯЕМ метод в класс MainWindow
 
+    def gate_registry(self, item):
+        """Реестр для графического вентиля: Input, Output или остальные"""
+        opcode = item.gate.opcode
+        if opcode == OP_INPUT:
+            return self.input_items
+        if opcode == OP_OUTPUT:
+            return self.output_items
+        return self.other_items
+
+    def gate_items(self):
+        """Все графические вентили: Input, остальные, Output"""
+        return [*self.input_items, *self.other_items, *self.output_items]
+
+    def add_gate_item(self, item):
+        item.setCacheMode(self.gate_cache_mode)
+        self.scene.addItem(item)
+        self.gate_registry(item)[item] = None
+
+    def update_gate_items(self, netlist, gids):
+        for gid in gids:
+            netlist.items[gid].update()
+
+    def update_gate_caching(self):
+        """Включает кэш отрисовки вентилей (DeviceCoordinateCache) на больших схемах.
+
+        Вентиль рисуется в картинку один раз и при прокрутке только копируется;
+        картинка обновляется через item.update() - его вызывают для вентилей,
+        значение которых изменилось.
+        """
+        count = len(self.input_items) + len(self.other_items) + len(self.output_items)
+        mode = (QGraphicsItem.CacheMode.DeviceCoordinateCache if count >= GATE_CACHE_MIN_ITEMS
+                else QGraphicsItem.CacheMode.NoCache)
+        if mode == self.gate_cache_mode:
+            return
+        self.gate_cache_mode = mode
+        for item in self.gate_items():
+            item.setCacheMode(mode)
+        logging.info(f"Кэш отрисовки вентилей: {mode.name} ({count} вентилей)")
+
+    def add_wire_item(self, wire):
+        self.scene.addItem(wire)
+        self.wires[wire] = None
+
+    def remove_wire(self, wire):
+        """Убирает провод со сцены. Вход отключается, только если к этому
+        пину не идет другой провод - иначе источником становится он"""
+        end_pin = wire.end_pin
+        wire.start_pin.connected_wires.remove(wire)
+        end_pin.connected_wires.remove(wire)
+        remaining = [other for other in end_pin.connected_wires if other.end_pin is end_pin]
+        if remaining:
+            remaining[-1].connect_gates()
+        else:
+            end_pin.parent_gate.gate.connect(end_pin.pin_index, None)
+        self.scene.removeItem(wire)
+        del self.wires[wire]
+
+    def delete_items(self, items):
+        """Удаляет вентили вместе с их проводами"""
+        gate_items = [item for item in items if hasattr(item, 'gate')]
+        if not gate_items:
+            return
+        for item in gate_items:
+            for pin in item.input_pins + item.output_pins:
+                for wire in list(pin.connected_wires):
+                    self.remove_wire(wire)
+            self.scene.removeItem(item)
+            del self.gate_registry(item)[item]
+
+        # Пробы на удаленных вентилях не переставить - запись начинается заново
+        removed = {id(item.gate) for item in gate_items}
+        if any(id(gate) in removed for gate in self.trace_gates):
+            self.trace = None
+            self.trace_gates = []
+        if self.selected_pin is not None and self.selected_pin.parent_gate in gate_items:
+            self.selected_pin = None
+
+        self.invalidate_netlist()
+        logging.info(f"Удалено вентилей: {len(gate_items)}")
+
     def find_free_position(self, width, height):
         """Находит свободное место для нового вентиля на сцене"""
-        # Используем сетку для аккуратного размещения
-        grid_size = 20
-        scene_rect = self.scene.sceneRect()
-
         # Начинаем поиск с левого верхнего угла видимой области
+        scene_rect = self.scene.sceneRect()
         view_rect = self.view.mapToScene(self.view.viewport().geometry()).boundingRect()
         start_x = max(50, view_rect.x())
         start_y = max(50, view_rect.y())
 
-        # Пытаемся найти свободное место, двигаясь по сетке
-        for attempt in range(10):  # 10 попыток в основной области
-            for y_offset in range(0, 400, grid_size * 3):  # Ищем в пределах 400px по вертикали
-                for x_offset in range(0, 400, grid_size * 3):  # И в пределах 400px по горизонтали
-                    x = start_x + x_offset
-                    y = start_y + y_offset
-
-                    # Проверяем, чтобы вентиль не выходил за границы сцены
-                    if x + width > scene_rect.width() - 50:
-                        continue
-                    if y + height > scene_rect.height() - 50:
-                        continue
-
-                    # Создаем временный прямоугольник для проверки коллизий
-                    temp_rect = self.scene.addRect(x, y, width, height,
-                                                   QPen(Qt.GlobalColor.transparent),
-                                                   QBrush(Qt.GlobalColor.transparent))
-                    colliding_items = temp_rect.collidingItems()
-                    self.scene.removeItem(temp_rect)
-
-                    # Фильтруем только значимые коллизии (вентили и провода)
-                    significant_collisions = []
-                    for item in colliding_items:
-                        # Проверяем, что это не фоновая сетка и не сам временный прямоугольник
-                        if (hasattr(item, 'gate') or  # Вентили
-                                isinstance(item, WireGraphicsItem) or  # Провода
-                                (hasattr(item, 'parent_gate') and hasattr(item, 'pin_type'))):  # Пины
-                            significant_collisions.append(item)
-
-                    # Если нет значимых коллизий - место свободно
-                    if not significant_collisions:
-                        return x, y
-
-        # Если не нашли свободного места в основной области, пробуем найти любое место с минимальным перекрытием
-        best_position = None
-        min_collisions = float('inf')
-
-        # Пробуем несколько случайных позиций
-        for attempt in range(20):
-            x = start_x + random.randint(0, 300)
-            y = start_y + random.randint(0, 300)
-
-            # Проверяем границы
-            if x + width > scene_rect.width() - 50 or y + height > scene_rect.height() - 50:
-                continue
-
-            # Проверяем коллизии
-            temp_rect = self.scene.addRect(x, y, width, height,
-                                           QPen(Qt.GlobalColor.transparent),
-                                           QBrush(Qt.GlobalColor.transparent))
-            colliding_items = temp_rect.collidingItems()
-            self.scene.removeItem(temp_rect)
-
-            # Считаем значимые коллизии
-            significant_count = 0
-            for item in colliding_items:
-                if (hasattr(item, 'gate') or
-                        isinstance(item, WireGraphicsItem) or
-                        (hasattr(item, 'parent_gate') and hasattr(item, 'pin_type'))):
-                    significant_count += 1
-
-            if significant_count < min_collisions:
-                min_collisions = significant_count
-                best_position = (x, y)
-
-            # Если нашли место с 1 или 0 коллизиями - используем его
-            if significant_count <= 1:
-                return x, y
-
-        # Если ничего не нашли, возвращаем лучшее найденное место или центр
-        if best_position:
-            return best_position
-
-        # Последний вариант - центр видимой области
-        return view_rect.center().x() - width / 2, view_rect.center().y() - height / 2
+        # Места ищутся по индексу занятых клеток, без запросов к сцене
+        occupancy = self.scene.occupancy
+        position = occupancy.find_free(width, height, start_x, start_y,
+                                       scene_rect.right() - 50, scene_rect.bottom() - 50)
+        if position is None:
+            # До низа сцены места нет - ищем под ней по всей ширине, сцена растет вниз.
+            # Вентиль шире сцены ставится у левого края, сцена растет и вправо
+            right = max(scene_rect.right() - 50, 50 + width + 2 * GRID_SIZE)
+            position = occupancy.find_free(width, height, 50, scene_rect.bottom() - 50 - height, right)
+            self.scene.include(QRectF(position[0], position[1], width, height))
+        return position
+
+    def place_gates(self, gate_types, left=50, top=50):
+        """Добавляет пачку вентилей (например, сгенерированную схему) без наложений.
+
+        Места выбираются по индексу подряд, элементы добавляются при
+        отключенном индексе сцены. Возвращает созданные графические вентили.
+        """
+        items = [GATE_ITEM_CLASSES[gate_type]() for gate_type in gate_types]
+        right = max(self.scene.sceneRect().right() - 50, left + max((item.width for item in items), default=0))
+        positions = self.scene.occupancy.place_many(
+            ((item, (item.width, item.height)) for item in items), left, top, right)
+
+        self.scene.setItemIndexMethod(QGraphicsScene.ItemIndexMethod.NoIndex)
+        try:
+            for item, (x, y) in zip(items, positions):
+                item.setPos(x, y)
+                item.setZValue(10)
+                self.add_gate_item(item)
+        finally:
+            self.scene.setItemIndexMethod(QGraphicsScene.ItemIndexMethod.BspTreeIndex)
+
+        if items:
+            self.scene.include(self.scene.itemsBoundingRect())
+        self.invalidate_netlist()
+        logging.info(f"Размещено {len(items)} вентилей")
+        return items
 
     def create_gate(self, gate_type):
         """Создает новый вентиль с интеллектуальным позиционированием"""
         logging.info(f"Создание вентиля: {gate_type}")
 
-        # Создаем вентиль
-        gate_constructors = {
-            "AND": AndGateGraphicsItem,
-            "OR": OrGateGraphicsItem,
-            "NOT": NotGateGraphicsItem,
-            "INPUT": InputGateGraphicsItem,
-            "OUTPUT": OutputGateGraphicsItem,
-            "NAND": NandGateGraphicsItem,
-            "NOR": NorGateGraphicsItem,
-            "XOR": XorGateGraphicsItem
-        }
-
-        if gate_type not in gate_constructors:
+        if gate_type not in GATE_ITEM_CLASSES:
             logging.warning(f"Неизвестный тип вентиля: {gate_type}")
             return
 
         # Создаем экземпляр вентиля
-        new_gate = gate_constructors[gate_type]()
+        new_gate = GATE_ITEM_CLASSES[gate_type]()
         logging.debug(f"Вентиль {gate_type} создан")
 
         # Используем интеллектуальное позиционирование
@@ -367,7 +485,8 @@ class MainWindow(QMainWindow):
         new_gate.setZValue(10)
 
         # Добавляем на сцену
-        self.scene.addItem(new_gate)
+        self.add_gate_item(new_gate)
+        self.invalidate_netlist()
 
         logging.info(f"Вентиль {gate_type} размещен в ({int(pos[0])}, {int(pos[1])})")
 
@@ -420,19 +539,16 @@ class MainWindow(QMainWindow):
         logging.info(f"Создание провода: {start_pin.parent_gate.gate.name} -> {end_pin.parent_gate.gate.name}")
 
         wire = WireGraphicsItem(start_pin, end_pin)
-        self.scene.addItem(wire)
+        self.add_wire_item(wire)
+        self.invalidate_netlist()
 
         logging.debug("Провод создан")
 
-        # ЗАКОММЕНТИРУЙ эту строку - симуляция уже запускается в connect_gates
-        # self.simulate_circuit()
+        # Симуляцию ставит в очередь invalidate_netlist() - серия проводов считается один раз
 
         # Только итоговое состояние для дебага
         if logging.getLogger().isEnabledFor(logging.DEBUG):
-            states = []
-            for item in self.scene.items():
-                if hasattr(item, 'gate'):
-                    states.append(f"{item.gate.name}:{item.gate.get_output()}")
+            states = [f"{item.gate.name}:{item.gate.get_output()}" for item in self.gate_items()]
             logging.debug("Состояния: " + " | ".join(states))
 
 
@@ -448,86 +564,199 @@ class MainWindow(QMainWindow):
         )
 
         if reply == QMessageBox.StandardButton.Yes:
-            # Удаляем только пользовательские элементы (вентили и провода)
-            # Оставляем сетку и фон
-
-            items_to_remove = []
-            for item in self.scene.items():
-                # Проверяем тип элемента
-                if (hasattr(item, 'gate') or  # Все вентили
-                        isinstance(item, WireGraphicsItem) or  # Все провода
-                        (hasattr(item, 'parent_gate') and hasattr(item, 'pin_type'))):  # Все пины
-                    items_to_remove.append(item)
-
-            # Удаляем найденные элементы
-            for item in items_to_remove:
-                self.scene.removeItem(item)
-
-            # Сбрасываем состояние
-            self.selected_pin = None
-
-            # Логируем действие
-            logging.info(f"Удалено {len(items_to_remove)} элементов со сцены")
-
-            # Обновляем таблицу истинности
-            self.truth_table.table.clear()
-            self.truth_table.table.setRowCount(0)
-            self.truth_table.table.setColumnCount(0)
+            self.remove_all_items()
 
             # Запускаем симуляцию для обновления состояния
             self.simulate_circuit()
 
-    def simulate_with_inputs(self, input_values):
-        """Устанавливает входы, симулирует схему и возвращает значения всех вентилей"""
-        logging.debug(f"simulate_with_inputs: входные значения {input_values}")
-
-        # Находим все Input вентили
-        input_gates = []
-        for item in self.scene.items():
-            if hasattr(item, 'gate') and item.gate.name == "INPUT":
-                input_gates.append(item)
-
-        if len(input_gates) != len(input_values):
-            logging.warning(
-                f"Количество Input вентилей ({len(input_gates)}) не совпадает с количеством входных значений ({len(input_values)})")
-            return {}
+    def remove_all_items(self):
+        """Удаляет вентили и провода"""
+        removed = len(self.input_items) + len(self.output_items) + len(self.other_items) + len(self.wires)
 
-        # Сохраняем оригинальные значения входов
-        original_inputs = [gate.gate.get_output() for gate in input_gates]
+        # Поштучный removeItem на больших схемах медленный - очищаем сцену целиком
+        self.scene.clear()
+        self.scene.occupancy.clear()
+        self.scene.pending_wires.clear()
+        for registry in (self.input_items, self.output_items, self.other_items, self.wires):
+            registry.clear()
 
-        # Устанавливаем новые значения
-        for i, gate_item in enumerate(input_gates):
-            gate_item.gate.set_value(input_values[i])
+        # Сбрасываем состояние
+        self.selected_pin = None
+        self.invalidate_netlist()
+        self.trace = None
+        self.trace_gates = []
+
+        # Логируем действие
+        logging.info(f"Удалено {removed} элементов со сцены")
+
+        # Обновляем таблицу истинности
+        self.truth_table.clear_table()
+
+    def circuit_from_scene(self):
+        """Схема со сцены в виде CircuitData (для сохранения)"""
+        gate_items = self.gate_items()
+        index = {id(item): i for i, item in enumerate(gate_items)}
+
+        circuit = CircuitData()
+        for item in gate_items:
+            value = item.gate.value if item.gate.opcode in SOURCE_OPCODES else 0
+            circuit.add_gate(item.gate.name, item.pos().x(), item.pos().y(), value)
+
+        for wire in self.wires:
+            src = index.get(id(wire.start_pin.parent_gate))
+            dst = index.get(id(wire.end_pin.parent_gate))
+            if src is not None and dst is not None:
+                circuit.connect(src, dst, wire.end_pin.pin_index)
+
+        return circuit
+
+    def load_circuit_to_scene(self, circuit):
+        """Заменяет содержимое сцены схемой из файла.
+
+        Элементы создаются пачкой при отключенном индексе сцены:
+        BSP-дерево строится один раз в конце, а не после каждого addItem.
+        """
+        self.view.setUpdatesEnabled(False)
+        self.scene.setItemIndexMethod(QGraphicsScene.ItemIndexMethod.NoIndex)
+        try:
+            self.remove_all_items()
+
+            gate_items = []
+            for gate_type, (x, y), value in zip(circuit.types, circuit.positions, circuit.values):
+                item = GATE_ITEM_CLASSES[gate_type]()
+                item.setPos(x, y)
+                item.setZValue(10)
+                if item.gate.opcode in SOURCE_OPCODES:
+                    item.gate.set_value(value)
+                self.add_gate_item(item)
+                gate_items.append(item)
+
+            skipped = 0
+            for src, dst, pin_index in circuit.connections:
+                start_item, end_item = gate_items[src], gate_items[dst]
+                if not start_item.output_pins or not 0 <= pin_index < len(end_item.input_pins):
+                    skipped += 1
+                    continue
+                self.add_wire_item(WireGraphicsItem(start_item.output_pins[0], end_item.input_pins[pin_index]))
+            if skipped:
+                logging.warning(f"Пропущено {skipped} проводов с неверными пинами")
+        finally:
+            self.scene.setItemIndexMethod(QGraphicsScene.ItemIndexMethod.BspTreeIndex)
+            self.view.setUpdatesEnabled(True)
+
+        # Сцена растет, если схема не помещается
+        self.scene.include(self.scene.itemsBoundingRect())
+        self.invalidate_netlist()
+
+    def save_circuit_dialog(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Сохранить схему", "",
+                                              "Схема (*.lgs);;JSON (*.json)")
+        if not path:
+            return
+        try:
+            save_circuit(self.circuit_from_scene(), path)
+        except OSError as e:
+            QMessageBox.warning(self, "Ошибка сохранения", str(e))
+
+    def open_circuit_dialog(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Открыть схему", "",
+                                              "Схемы (*.lgs *.json);;Все файлы (*)")
+        if not path:
+            return
+        try:
+            started = time.perf_counter()
+            circuit = load_circuit(path)
+            self.load_circuit_to_scene(circuit)
+            logging.info(f"Схема {path} открыта за {time.perf_counter() - started:.2f} с")
+        except (OSError, ValueError, KeyError) as e:
+            QMessageBox.warning(self, "Ошибка загрузки", str(e))
+            return
 
-        # Сбрасываем все вентили
-        for item in self.scene.items():
-            if hasattr(item, 'gate'):
-                item.gate.reset_computation()
+        self.simulate_circuit()
 
-        # Симулируем схему (один проход достаточно)
-        self.update_all_connections()
+    def invalidate_netlist(self):
+        """Сбрасывает скомпилированную схему после изменения вентилей или проводов
+        и ставит симуляцию в очередь"""
+        self.netlist = None
+        self.revision += 1
+        self.update_gate_caching()
+        self.request_simulation()
+
+    def request_simulation(self):
+        """Симуляция через SIMULATION_DELAY_MS после последнего запроса: каждый
+        запрос откладывает ее заново, серия правок считается одним запуском.
+        Перемещение вентилей логику не меняет и симуляцию не запускает"""
+        self.simulation_timer.start(SIMULATION_DELAY_MS)
+
+    def get_netlist(self):
+        """Возвращает скомпилированную схему, собирая ее со сцены только при необходимости"""
+        if self.netlist is None:
+            gate_items = self.gate_items()
+            wires = list(self.wires)
+            self.netlist = Netlist.from_items(gate_items, wires)
+            logging.debug(f"Схема скомпилирована: {len(gate_items)} вентилей, {len(wires)} проводов")
+
+            # Петли не обрезаем молча - сообщаем, какие вентили в них входят
+            for loop in self.netlist.feedback_loops:
+                names = ", ".join(self.netlist.kind(gid) for gid in loop)
+                logging.warning(f"Обратная связь из {len(loop)} вентилей: {names}")
+
+            # ID вентилей поменялись - пробы переставляются на новые
+            if self.trace is not None:
+                self.trace.rebind([self.netlist.gate_id(gate) for gate in self.trace_gates])
+        return self.netlist
+
+    def start_trace(self):
+        """Начинает запись сигналов выбранных вентилей (без выбора - Input, Output, DFF, CLOCK)"""
+        items = [item for item in self.scene.selectedItems() if hasattr(item, 'gate')]
+        if not items:
+            items = [item for item in self.gate_items() if item.gate.opcode in SOURCE_OPCODES or item.gate.opcode == OP_OUTPUT]
+        if not items:
+            logging.info("Запись сигналов: нет вентилей для проб")
+            return
 
-        # Вычисляем выходы
-        for item in self.scene.items():
-            if hasattr(item, 'gate'):
-                # Принудительно вычисляем выход
-                item.gate.get_output()
+        # Пробы слева направо, как колонки таблицы истинности
+        items.sort(key=lambda item: (item.pos().x(), item.pos().y()))
+        self.trace_gates = [item.gate for item in items]
+        netlist = self.get_netlist()
+        gids = [netlist.gate_id(gate) for gate in self.trace_gates]
+        self.trace = SignalTrace(gids, column_headers([netlist.kind(gid) for gid in gids]))
+        self.simulate_circuit()  # начальное состояние - первый шаг записи
+        logging.info(f"Запись сигналов: {len(gids)} проб")
+
+    def record_trace(self):
+        """Добавляет шаг в запись сигналов по текущим значениям netlist"""
+        if self.trace is not None and self.netlist is not None:
+            self.trace.record(self.netlist.values)
+
+    def save_trace_dialog(self):
+        if self.trace is None or not len(self.trace):
+            QMessageBox.information(self, "Запись сигналов", "Запись не ведется - нажмите \"📈 Запись\"")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Сохранить запись сигналов", "", "VCD (*.vcd)")
+        if not path:
+            return
+        try:
+            self.trace.save_vcd(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Ошибка сохранения", str(e))
 
-        # Собираем результаты
-        results = {}
-        for item in self.scene.items():
-            if hasattr(item, 'gate'):
-                results[id(item.gate)] = item.gate.get_output()
+    def simulate_with_inputs(self, input_values):
+        """Симулирует схему с заданными входами и возвращает значения всех вентилей"""
+        logging.debug(f"simulate_with_inputs: входные значения {input_values}")
 
-        # Восстанавливаем оригинальные значения
-        for i, gate_item in enumerate(input_gates):
-            gate_item.gate.set_value(original_inputs[i])
+        netlist = self.get_netlist()
+        if len(netlist.input_ids) != len(input_values):
+            logging.warning(
+                f"Количество Input вентилей ({len(netlist.input_ids)}) не совпадает с количеством входных значений ({len(input_values)})")
+            return {}
 
-        # Снова сбрасываем для восстановления состояния
-        for item in self.scene.items():
-            if hasattr(item, 'gate'):
-                item.gate.reset_computation()
+        # Значения InputGate не трогаем - входы подставляются только в netlist
+        values = netlist.simulate(input_values)
+        results = {id(gate): value for gate, value in zip(netlist.gates, values)}
 
+        # Возвращаем netlist в текущее состояние схемы
+        netlist.simulate()
         return results
 
     def create_main_toolbar(self):
@@ -553,104 +782,43 @@ class MainWindow(QMainWindow):
 
     def simulate_circuit(self):
         """Запускает симуляцию всей схемы"""
-        logging.debug("=" * 50)
-        logging.debug("НАЧАЛО ДЕТАЛЬНОЙ СИМУЛЯЦИИ")
-        logging.debug("=" * 50)
-        # 1. Собираем информацию о всех вентилях
-        all_gates = []
-        # main_window.py - ДОБАВИТЬ в simulate_circuit() в начале
-
+        self.simulation_timer.stop()  # отложенный запрос выполняется этим запуском
         logging.debug("=" * 50)
         logging.debug("НАЧАЛО СИМУЛЯЦИИ")
-        # Выводим состояние всех вентилей перед симуляцией
-        for item in self.scene.items():
-            if hasattr(item, 'gate'):
-                gate = item.gate
-                inputs_str = str(gate.inputs) if hasattr(gate, 'inputs') else "нет"
-                logging.debug(f"  {gate.name}: inputs={inputs_str}, output={gate.output}")
-
-        logging.debug(f"Все вентили на сцене: {all_gates}")
 
+        # 1. Берем скомпилированную схему (пересобирается только после изменений)
+        netlist = self.get_netlist()
 
-        # 1. Сбрасываем ВСЕ вычисления
-        for item in self.scene.items():
-            if hasattr(item, 'gate'):
-                item.gate.reset_computation()
+        # 2. Один проход в заранее вычисленном порядке
+        values = netlist.simulate()
+        if not netlist.stable:
+            logging.warning("Схема не стабилизировалась: обратная связь генерирует")
 
-        # 2. ОБНОВЛЯЕМ ВСЕ СОЕДИНЕНИЯ
-        self.update_all_connections()
+        # 3. Переносим значения в вентили для отрисовки
+        changed = netlist.write_back()
+        self.record_trace()
 
-        # 3. ВЫЧИСЛЯЕМ МНОГО РАЗ чтобы гарантировать распространение
-        final_states = {}
-        for pass_num in range(5):  # 5 проходов для надежности
-            any_changed = False
-
-            for item in self.scene.items():
-                if hasattr(item, 'gate'):
-                    old_output = item.gate.output
-                    new_output = item.gate.get_output()
-
-                    if old_output != new_output:
-                        any_changed = True
-                        if logging.getLogger().isEnabledFor(logging.DEBUG):
-                            logging.debug(f"Проход {pass_num + 1}: {item.gate.name} {old_output}->{new_output}")
-
-                    final_states[item.gate.name] = new_output
-
-            # Если на этом проходе ничего не изменилось - выходим
-            if not any_changed:
-                if pass_num > 0 and logging.getLogger().isEnabledFor(logging.DEBUG):
-                    logging.debug(f"Схема стабилизировалась за {pass_num + 1} проходов")
-                break
-
-        # 4. Перерисовываем сцену
-        self.scene.update()
+        # 4. Перерисовываем только изменившиеся вентили (кэш отрисовки сбрасывает update())
+        self.update_gate_items(netlist, changed)
 
         # Только итоговый результат
         if logging.getLogger().isEnabledFor(logging.INFO):
+            final_states = {netlist.kind(gid): value for gid, value in enumerate(values)}
             states_str = ", ".join([f"{name}:{state}" for name, state in final_states.items()])
             logging.info(f"Результат симуляции: {states_str}")
 
+    def clock_tick(self):
+        """Один такт схемы с триггерами (Netlist.run)"""
+        netlist = self.get_netlist()
+        netlist.run(1, self.trace)
+        self.revision += 1  # триггеры - константы таблицы истинности
+        self.update_gate_items(netlist, netlist.write_back())
+        logging.info(f"Такт {netlist.cycle}: триггеров {len(netlist.dff_ids)}")
+
     def topological_sort(self):
         """Сортирует вентили в порядке вычислений (Input -> ... -> Output)"""
-        gates = [item for item in self.scene.items() if hasattr(item, 'gate')]
-
-        # Простой подход: несколько проходов пока все не вычислятся
-        sorted_gates = []
-        remaining_gates = gates.copy()
-
-        max_passes = 10  # Защита от бесконечного цикла
-        for pass_num in range(max_passes):
-            if not remaining_gates:
-                break
-
-            ready_gates = []
-            for gate_item in remaining_gates:
-                # Input gates всегда готовы
-                if gate_item.gate.name == "INPUT":
-                    ready_gates.append(gate_item)
-                    continue
-
-                # Проверяем зависят ли входы от других gates
-                inputs_ready = True
-                for pin in gate_item.input_pins:
-                    for wire in pin.connected_wires:
-                        start_gate = wire.start_pin.parent_gate
-                        if start_gate in remaining_gates:
-                            inputs_ready = False
-                            break
-
-                if inputs_ready:
-                    ready_gates.append(gate_item)
-
-            # Убираем готовые gates из оставшихся
-            for gate in ready_gates:
-                if gate in remaining_gates:
-                    remaining_gates.remove(gate)
-                    sorted_gates.append(gate)
-
-        # Добавляем оставшиеся gates в конце
-        sorted_gates.extend(remaining_gates)
+        netlist = self.get_netlist()
+        sorted_gates = [netlist.items[gid] for gid in netlist.evaluation_order()]
 
         if logging.getLogger().isEnabledFor(logging.DEBUG):
             order = [g.gate.name for g in sorted_gates]
@@ -658,62 +826,59 @@ class MainWindow(QMainWindow):
 
         return sorted_gates
 
-    # main_window.py - ЗАМЕНА метода update_all_connections()
-
-    def update_all_connections(self):
-        """Обновляет все логические соединения в схеме - ИСПРАВЛЕННАЯ ВЕРСИЯ"""
-        logging.debug("Обновление всех соединений схемы")
+    def update_input(self, gate_item, value):
+        """Меняет значение Input и пересчитывает только зависящие от него вентили"""
+        gate_item.gate.set_value(value)
+        self.revision += 1
+        if self.simulation_timer.isActive():
+            # Схему пересчитает отложенная симуляция. Сам Input она изменившимся
+            # не увидит (set_value уже записал output) - перерисовываем его здесь
+            gate_item.update()
+            return
 
-        # 1. Сбрасываем inputs у всех вентилей (кроме InputGate)
-        for item in self.scene.items():
-            if hasattr(item, 'gate') and hasattr(item.gate, 'inputs'):
-                if item.gate.name != "INPUT":
-                    # Полностью очищаем inputs
-                    item.gate.inputs = []
+        netlist = self.get_netlist()
+        gid = netlist.gate_id(gate_item.gate)
+        if gid is None:
+            return
 
-        # 2. Устанавливаем соединения через провода
-        count = 0
-        for item in self.scene.items():
-            if isinstance(item, WireGraphicsItem):
-                item.connect_gates()
-                count += 1
+        changed = netlist.set_input(gid, value)
+        self.record_trace()
+        values = netlist.values
+        for changed_id in changed:
+            netlist.gates[changed_id].output = values[changed_id]
+            netlist.items[changed_id].update()  # Перерисовываем только изменившиеся
 
-        logging.debug(f"Обновлено {count} соединений")
+        logging.debug(f"Input -> {value}: изменилось вентилей {len(changed)}")
 
     def set_selected_input(self, value):
         """Устанавливает значение выбранному Input элементу"""
         selected_items = self.scene.selectedItems()
         for item in selected_items:
             if isinstance(item, InputGateGraphicsItem):
-                item.gate.set_value(value)
+                self.update_input(item, value)
                 logging.info(f"Input установлен в: {value}")
-                item.update()  # Перерисовываем
 
     def keyPressEvent(self, event):
         selected_items = self.scene.selectedItems()
 
+        if event.key() == Qt.Key.Key_Delete:
+            self.delete_items(selected_items)
+            return
+
         for item in selected_items:
             if isinstance(item, InputGateGraphicsItem):
                 if event.key() == Qt.Key.Key_0:
-                    item.gate.set_value(0)
+                    self.update_input(item, 0)
                     logging.info("Input установлен в 0")
                 elif event.key() == Qt.Key.Key_1:
-                    item.gate.set_value(1)
+                    self.update_input(item, 1)
                     logging.info("Input установлен в 1")
 
-                # ПРИНУДИТЕЛЬНОЕ ОБНОВЛЕНИЕ
-                logging.debug("Обновление схемы после изменения Input")
-                self.update_all_connections()
-                self.simulate_circuit()
-
-        self.scene.update()
-
     def update_all_connections(self):
         """Обновляет все логические соединения в схеме"""
         logging.debug("Обновление всех соединений схемы")
         count = 0
-        for item in self.scene.items():
-            if isinstance(item, WireGraphicsItem):
-                item.connect_gates()
-                count += 1
+        for wire in self.wires:
+            wire.connect_gates()
+            count += 1
         logging.debug(f"Обновлено {count} соединений")
\ No newline at end of file
@@ -0,0 +1,765 @@
+import heapq
+import logging
+from array import array
+
+from logic_gates import (OP_AND, OP_OR, OP_NOT, OP_NAND, OP_NOR, OP_XOR, OP_INPUT, OP_OUTPUT,
+                         OP_DFF, OP_CLOCK, OPCODE_NAMES, SOURCE_OPCODES)
+
+
+# Такт схемы крупнее этого считается общим циклом, а не сгенерированной функцией
+CODEGEN_MAX_GATES = 20000
+
+
+# Вычисление одного вентиля по значениям его входов.
+# values - значения всех вентилей, источники вентиля - index[lo:hi]
+# (срез массива fanin в формате CSR, без создания списка).
+# Семантика совпадает с compute_output() из logic_gates.py
+
+def _eval_and(values, index, lo, hi):
+    if hi - lo < 2:
+        return 0
+    for k in range(lo, hi):
+        if values[index[k]] != 1:
+            return 0
+    return 1
+
+
+def _eval_or(values, index, lo, hi):
+    for k in range(lo, hi):
+        if values[index[k]] == 1:
+            return 1
+    return 0
+
+
+def _eval_not(values, index, lo, hi):
+    if lo == hi:
+        return 1
+    return 0 if values[index[lo]] == 1 else 1
+
+
+def _eval_nand(values, index, lo, hi):
+    return 1 - _eval_and(values, index, lo, hi)
+
+
+def _eval_nor(values, index, lo, hi):
+    return 1 - _eval_or(values, index, lo, hi)
+
+
+def _eval_xor(values, index, lo, hi):
+    if hi - lo < 2:
+        return 0
+    ones = 0
+    for k in range(lo, hi):
+        if values[index[k]] == 1:
+            ones += 1
+    return ones & 1
+
+
+def _eval_output(values, index, lo, hi):
+    if lo == hi:
+        return 0
+    return values[index[lo]]
+
+
+# Вычислители по коду типа вентиля. Для Input, триггера и Clock - None:
+# их значение не зависит от входов в пределах такта
+_EVALUATORS = [None] * len(OPCODE_NAMES)
+_EVALUATORS[OP_AND] = _eval_and
+_EVALUATORS[OP_OR] = _eval_or
+_EVALUATORS[OP_NOT] = _eval_not
+_EVALUATORS[OP_NAND] = _eval_nand
+_EVALUATORS[OP_NOR] = _eval_nor
+_EVALUATORS[OP_XOR] = _eval_xor
+_EVALUATORS[OP_OUTPUT] = _eval_output
+
+
+# Побитово-параллельные версии: значение цепи - слово, бит k которого
+# равен значению цепи в k-й строке таблицы истинности.
+# ones - слово из одних единиц (нужно для инверсии), zero - из нулей.
+# Используются только &, |, ^, поэтому словом может быть и int, и массив NumPy
+
+def _word_and(words, index, lo, hi, ones, zero):
+    if hi - lo < 2:
+        return zero
+    result = words[index[lo]]
+    for k in range(lo + 1, hi):
+        result = result & words[index[k]]
+    return result
+
+
+def _word_or(words, index, lo, hi, ones, zero):
+    result = zero
+    for k in range(lo, hi):
+        result = result | words[index[k]]
+    return result
+
+
+def _word_not(words, index, lo, hi, ones, zero):
+    if lo == hi:
+        return ones
+    return words[index[lo]] ^ ones
+
+
+def _word_nand(words, index, lo, hi, ones, zero):
+    return _word_and(words, index, lo, hi, ones, zero) ^ ones
+
+
+def _word_nor(words, index, lo, hi, ones, zero):
+    return _word_or(words, index, lo, hi, ones, zero) ^ ones
+
+
+def _word_xor(words, index, lo, hi, ones, zero):
+    if hi - lo < 2:
+        return zero
+    result = words[index[lo]]
+    for k in range(lo + 1, hi):
+        result = result ^ words[index[k]]
+    return result
+
+
+def _word_output(words, index, lo, hi, ones, zero):
+    if lo == hi:
+        return zero
+    return words[index[lo]]
+
+
+_WORD_EVALUATORS = [None] * len(OPCODE_NAMES)
+_WORD_EVALUATORS[OP_AND] = _word_and
+_WORD_EVALUATORS[OP_OR] = _word_or
+_WORD_EVALUATORS[OP_NOT] = _word_not
+_WORD_EVALUATORS[OP_NAND] = _word_nand
+_WORD_EVALUATORS[OP_NOR] = _word_nor
+_WORD_EVALUATORS[OP_XOR] = _word_xor
+_WORD_EVALUATORS[OP_OUTPUT] = _word_output
+
+
+def _cycle_expression(op, names):
+    """Выражение для вентиля в сгенерированной функции такта (значения - 0/1).
+    Семантика та же, что у _eval_*: AND, NAND и XOR нужны два входа"""
+    if op == OP_AND:
+        return " & ".join(names) if len(names) >= 2 else "0"
+    if op == OP_OR:
+        return " | ".join(names) if names else "0"
+    if op == OP_NOT:
+        return f"{names[0]} ^ 1" if names else "1"
+    if op == OP_NAND:
+        return f"({' & '.join(names)}) ^ 1" if len(names) >= 2 else "1"
+    if op == OP_NOR:
+        return f"({' | '.join(names)}) ^ 1" if names else "1"
+    if op == OP_XOR:
+        return " ^ ".join(names) if len(names) >= 2 else "0"
+    if op == OP_OUTPUT:
+        return names[0] if names else "0"
+    raise ValueError(f"Нет выражения для кода вентиля {op}")
+
+
+def _zeros(count):
+    """array('i') из count нулей"""
+    return array("i", [0]) * count
+
+
+class Netlist:
+    """Схема, скомпилированная для симуляции без обращения к QGraphicsScene.
+
+    Вентили пронумерованы целыми ID, тип вентиля - код из logic_gates (ops,
+    по байту на вентиль), значения - bytearray. Входы и выходы вентилей
+    хранятся в формате CSR: источники вентиля gid -
+    fanin_index[fanin_start[gid]:fanin_start[gid + 1]], получатели -
+    так же в fanout_start/fanout_index. Порядок вычислений считается один
+    раз при построении: комбинационная часть упорядочена алгоритмом Кана
+    и считается за один проход, обратные связи выделены в сильно связные
+    компоненты.
+
+    Триггеры (DFF) и Clock - источники, как Input: в пределах такта их
+    значение не зависит от входов, поэтому петля через триггер не считается
+    обратной связью. run() считает такты: на фронте все триггеры разом
+    запоминают D, затем комбинационная часть пересчитывается один раз.
+
+    Объекты LogicGate (gates) нужны только для связи с графикой - netlist,
+    собранный from_ops(), обходится без них.
+    """
+
+    def __init__(self, gates, connections):
+        """gates - объекты LogicGate, connections - тройки (src_id, dst_id, pin_index)"""
+        self.gates = list(gates)
+        self._build(bytearray(gate.opcode for gate in self.gates), connections)
+        self._ids = {id(gate): i for i, gate in enumerate(self.gates)}
+
+    @classmethod
+    def from_ops(cls, ops, connections, values=None):
+        """Netlist без объектов LogicGate: ops - коды типов вентилей, values - начальные
+        значения Input, триггеров и Clock (остальные не используются), дальше они
+        хранятся в self.values"""
+        netlist = cls.__new__(cls)
+        netlist.gates = None
+        netlist._build(bytearray(ops), connections)
+        netlist._ids = {}
+        if values is not None:
+            for gid in netlist.source_ids:
+                netlist.values[gid] = values[gid]
+        return netlist
+
+    def _build(self, ops, connections):
+        self.ops = ops
+        count = len(ops)
+
+        # Провод на пин перезаписывает предыдущий - как в WireGraphicsItem.connect_gates()
+        drivers = {}
+        for src, dst, pin_index in connections:
+            drivers[dst, pin_index] = src
+
+        # Источники по возрастанию номера пина
+        self.fanin_start = fanin_start = _zeros(count + 1)
+        self.fanin_index = fanin_index = array("i")
+        for (dst, pin_index), src in sorted(drivers.items()):
+            fanin_start[dst + 1] += 1
+            fanin_index.append(src)
+        for gid in range(count):
+            fanin_start[gid + 1] += fanin_start[gid]
+
+        # Получатели - сортировкой подсчетом по источнику
+        self.fanout_start = fanout_start = _zeros(count + 1)
+        for src in fanin_index:
+            fanout_start[src + 1] += 1
+        for gid in range(count):
+            fanout_start[gid + 1] += fanout_start[gid]
+        self.fanout_index = fanout_index = _zeros(len(fanin_index))
+        fill = fanout_start[:-1]
+        for dst in range(count):
+            for k in range(fanin_start[dst], fanin_start[dst + 1]):
+                src = fanin_index[k]
+                fanout_index[fill[src]] = dst
+                fill[src] += 1
+
+        self.input_ids = [i for i, op in enumerate(ops) if op == OP_INPUT]
+        self.output_ids = [i for i, op in enumerate(ops) if op == OP_OUTPUT]
+        self.dff_ids = [i for i, op in enumerate(ops) if op == OP_DFF]
+        self.clock_ids = [i for i, op in enumerate(ops) if op == OP_CLOCK]
+        self.source_ids = [i for i, op in enumerate(ops) if op in SOURCE_OPCODES]
+        self._is_source = bytearray(op in SOURCE_OPCODES for op in ops)
+
+        # У триггера пины различаются: ID источника D и EN (-1 - не подключен)
+        self.dff_d = array("i", (drivers.get((gid, 0), -1) for gid in self.dff_ids))
+        self.dff_en = array("i", (drivers.get((gid, 1), -1) for gid in self.dff_ids))
+        self.cycle = 0  # сколько тактов посчитал run()
+        self._cycle_function = None
+        self._cycle_probes = None  # пробы, запись которых встроена в _cycle_function
+
+        # order/levels - ациклическая часть, cyclic - петли и все, что после них
+        self.order, self.levels, self.cyclic = self._compute_order()
+        self.cyclic_groups = self._find_components(self.cyclic)
+        self.feedback_loops = [group for group in self.cyclic_groups
+                               if len(group) > 1 or group[0] in self.sources(group[0])]
+
+        self.values = bytearray(count)
+        self.simulated = False  # values заполнены хотя бы одним полным проходом
+        self.stable = True  # все обратные связи пришли к устойчивому состоянию
+
+        # Позиция вентиля в порядке вычислений - приоритет в очереди событий
+        self.rank = _zeros(count)
+        for position, gid in enumerate(self.evaluation_order()):
+            self.rank[gid] = position
+        self._in_cycle = bytearray(count)
+        for gid in self.cyclic:
+            self._in_cycle[gid] = 1
+
+        logging.debug(f"Netlist: {count} вентилей, {len(fanin_index)} соединений, "
+                      f"уровней: {max(self.levels, default=-1) + 1}, "
+                      f"обратных связей: {len(self.feedback_loops)}")
+
+    @classmethod
+    def from_items(cls, gate_items, wires):
+        """Строит netlist по графическим вентилям и проводам (WireGraphicsItem)"""
+        gate_items = list(gate_items)
+        index = {id(item): i for i, item in enumerate(gate_items)}
+
+        connections = []
+        for wire in wires:
+            src = index.get(id(wire.start_pin.parent_gate))
+            dst = index.get(id(wire.end_pin.parent_gate))
+            if src is None or dst is None:
+                continue
+            connections.append((src, dst, wire.end_pin.pin_index))
+
+        netlist = cls([item.gate for item in gate_items], connections)
+        netlist.items = gate_items
+        return netlist
+
+    def subcircuit(self, roots):
+        """Часть схемы, от которой зависят вентили roots: (netlist, mapping), где
+        mapping[старый ID] -> новый ID. Входы триггеров в нее не попадают -
+        триггеры и Clock остаются источниками со своими текущими значениями"""
+        cone = set()
+        stack = list(roots)
+        while stack:
+            gid = stack.pop()
+            if gid in cone:
+                continue
+            cone.add(gid)
+            if self.ops[gid] not in SOURCE_OPCODES:
+                stack.extend(self.sources(gid))
+
+        kept = sorted(cone)
+        mapping = {gid: new_id for new_id, gid in enumerate(kept)}
+        ops = bytearray(self.ops[gid] for gid in kept)
+        values = bytearray(self.input_value(gid) if self.ops[gid] in SOURCE_OPCODES else 0 for gid in kept)
+        connections = [(mapping[src], mapping[gid], pin)
+                       for gid in kept if self.ops[gid] not in SOURCE_OPCODES
+                       for pin, src in enumerate(self.sources(gid))]
+        return Netlist.from_ops(ops, connections, values), mapping
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __getstate__(self):
+        """Для передачи в другие процессы: только массивы, без объектов LogicGate и Qt.
+
+        Текущие значения Input сохраняются в values, их читает evaluate_words().
+        """
+        state = self.__dict__.copy()
+        values = bytearray(self.values)
+        for gid in self.source_ids:
+            values[gid] = self.input_value(gid)
+        state['values'] = values
+        state['gates'] = None
+        state['_ids'] = {}
+        state['_cycle_function'] = None
+        state.pop('items', None)
+        return state
+
+    def kind(self, gid):
+        """Имя типа вентиля ('AND', 'INPUT', ...) - для заголовков и логов"""
+        return OPCODE_NAMES[self.ops[gid]]
+
+    def sources(self, gid):
+        """ID вентилей на входах gid по порядку пинов"""
+        return self.fanin_index[self.fanin_start[gid]:self.fanin_start[gid + 1]]
+
+    def sinks(self, gid):
+        """ID вентилей, к которым подключен выход gid"""
+        return self.fanout_index[self.fanout_start[gid]:self.fanout_start[gid + 1]]
+
+    def input_value(self, gid):
+        """Текущее значение Input, триггера или Clock (без объектов LogicGate - сохраненное в values)"""
+        if self.gates is None:
+            return self.values[gid]
+        return self.gates[gid].value
+
+    def gate_id(self, gate):
+        """ID вентиля в netlist по объекту LogicGate (None, если его нет)"""
+        return self._ids.get(id(gate))
+
+    def _compute_order(self):
+        """Порядок вычислений и уровни по алгоритму Кана за O(вентили + провода).
+
+        Уровень - длина самого длинного пути от источника. Вентили, до которых
+        обход не дошел (петли и все, что от них зависит), возвращаются отдельно.
+        """
+        count = len(self.ops)
+        fanin_start = self.fanin_start
+        fanout_start = self.fanout_start
+        fanout_index = self.fanout_index
+        is_source = self._is_source
+        # Источники (Input, триггеры, Clock) готовы сразу, провода в них порядок не задают
+        pending = array("i", (0 if is_source[gid] else fanin_start[gid + 1] - fanin_start[gid]
+                              for gid in range(count)))
+        levels = _zeros(count)
+        order = array("i", (gid for gid in range(count) if pending[gid] == 0))
+
+        for gid in order:  # массив растет по ходу обхода
+            next_level = levels[gid] + 1
+            for k in range(fanout_start[gid], fanout_start[gid + 1]):
+                dst = fanout_index[k]
+                if is_source[dst]:
+                    continue
+                if levels[dst] < next_level:
+                    levels[dst] = next_level
+                pending[dst] -= 1
+                if pending[dst] == 0:
+                    order.append(dst)
+
+        cyclic = [gid for gid in range(count) if pending[gid] > 0]
+        for gid in cyclic:
+            levels[gid] = -1
+        return order, levels, cyclic
+
+    def _find_components(self, gids):
+        """Сильно связные компоненты среди gids (алгоритм Тарьяна без рекурсии)
+        в топологическом порядке"""
+        inside = set(gids)
+        sinks = self.sinks
+        index = {}
+        low = {}
+        stack = []
+        on_stack = set()
+        components = []
+        counter = 0
+
+        for root in gids:
+            if root in index:
+                continue
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(sinks(root)))]
+
+            while work:
+                node, children = work[-1]
+                descended = False
+                for child in children:
+                    if child not in inside:
+                        continue
+                    if child not in index:
+                        index[child] = low[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(sinks(child))))
+                        descended = True
+                        break
+                    if child in on_stack and index[child] < low[node]:
+                        low[node] = index[child]
+                if descended:
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if low[node] < low[parent]:
+                        low[parent] = low[node]
+
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    component.sort()
+                    components.append(component)
+
+        # Тарьян выдает компоненты от стоков к источникам
+        components.reverse()
+        return components
+
+    def evaluation_order(self):
+        """Все вентили в порядке вычислений: ациклическая часть, затем компоненты"""
+        order = list(self.order)
+        for group in self.cyclic_groups:
+            order.extend(group)
+        return order
+
+    def evaluate(self, gid):
+        """Вычисляет значение вентиля по текущим значениям его входов"""
+        evaluator = _EVALUATORS[self.ops[gid]]
+        if evaluator is None:
+            return self.input_value(gid)
+        return evaluator(self.values, self.fanin_index, self.fanin_start[gid], self.fanin_start[gid + 1])
+
+    def simulate(self, input_values=None):
+        """Один проход по схеме. input_values - значения Input в порядке input_ids,
+        по умолчанию берутся текущие значения InputGate. Триггеры и Clock
+        сохраняют свое значение - такт не делается"""
+        values = self.values
+        gates = self.gates
+        if gates is not None:
+            for gid in self.dff_ids:
+                values[gid] = gates[gid].value
+            for gid in self.clock_ids:
+                values[gid] = gates[gid].value
+
+        if input_values is not None:
+            if len(input_values) != len(self.input_ids):
+                raise ValueError(f"Ожидалось {len(self.input_ids)} входных значений, "
+                                 f"получено {len(input_values)}")
+            for gid, value in zip(self.input_ids, input_values):
+                values[gid] = value
+        elif gates is not None:
+            for gid in self.input_ids:
+                values[gid] = gates[gid].value
+
+        self._evaluate_combinational()
+        self.simulated = True
+        return values
+
+    def _evaluate_combinational(self):
+        """Пересчитывает все вычисляемые вентили по текущим значениям источников"""
+        values = self.values
+        ops = self.ops
+        start = self.fanin_start
+        index = self.fanin_index
+        evaluators = _EVALUATORS
+        for gid in self.order:
+            evaluator = evaluators[ops[gid]]
+            if evaluator is not None:
+                values[gid] = evaluator(values, index, start[gid], start[gid + 1])
+
+        self._settle_cyclic()
+
+    def _settle_passes(self, group):
+        """Сколько проходов дается компоненте: вентилю вне петли хватит одного"""
+        if len(group) == 1 and group[0] not in self.sources(group[0]):
+            return 1
+        return 2 * len(group) + 1
+
+    def _settle_cyclic(self, changed=None):
+        """Вентили после ациклической части: компоненты по очереди.
+
+        Одиночный вентиль вне петли считается один раз, петля - до устойчивого
+        состояния. Если петля генерирует и не успокоилась за отведенные
+        проходы, self.stable становится False.
+        """
+        values = self.values
+        ops = self.ops
+        start = self.fanin_start
+        index = self.fanin_index
+        self.stable = True
+
+        for group in self.cyclic_groups:
+            passes = self._settle_passes(group)
+            for pass_num in range(passes):
+                any_changed = False
+                for gid in group:
+                    evaluator = _EVALUATORS[ops[gid]]
+                    if evaluator is None:
+                        continue
+                    new_value = evaluator(values, index, start[gid], start[gid + 1])
+                    if new_value != values[gid]:
+                        values[gid] = new_value
+                        any_changed = True
+                        if changed is not None:
+                            changed.add(gid)
+                if not any_changed:
+                    break
+            else:
+                if passes > 1:
+                    self.stable = False
+
+    def set_input(self, gid, value):
+        """Событийная симуляция: меняет один Input и пересчитывает только его конус fan-out.
+
+        Распространение идет в порядке вычислений и останавливается на вентилях,
+        чей выход не изменился. Возвращает ID вентилей с новым значением.
+        """
+        values = self.values
+        if not self.simulated:
+            if self.gates is None:
+                values[gid] = value
+            self.simulate()
+            return list(range(len(self.ops)))
+
+        if values[gid] == value:
+            return []
+        values[gid] = value
+        changed = [gid]
+
+        ops = self.ops
+        start = self.fanin_start
+        index = self.fanin_index
+        fanout_start = self.fanout_start
+        fanout_index = self.fanout_index
+        rank = self.rank
+        in_cycle = self._in_cycle
+
+        queue = []
+        queued = set()
+        touches_cycle = False
+        for k in range(fanout_start[gid], fanout_start[gid + 1]):
+            dst = fanout_index[k]
+            if dst not in queued:
+                queued.add(dst)
+                heapq.heappush(queue, (rank[dst], dst))
+
+        while queue:
+            _, current = heapq.heappop(queue)
+            if in_cycle[current]:
+                touches_cycle = True
+                continue
+            evaluator = _EVALUATORS[ops[current]]
+            if evaluator is None:
+                continue  # триггер меняется только на фронте такта
+
+            new_value = evaluator(values, index, start[current], start[current + 1])
+            if new_value == values[current]:
+                continue
+            values[current] = new_value
+            changed.append(current)
+
+            for k in range(fanout_start[current], fanout_start[current + 1]):
+                dst = fanout_index[k]
+                if dst not in queued:
+                    queued.add(dst)
+                    heapq.heappush(queue, (rank[dst], dst))
+
+        if touches_cycle:
+            cyclic_changed = set()
+            self._settle_cyclic(cyclic_changed)
+            changed.extend(cyclic_changed)
+
+        return changed
+
+    def evaluate_words(self, input_ids, input_words, ones):
+        """Побитово-параллельная симуляция: один проход считает сразу много строк.
+
+        input_words[i] - слово для входа input_ids[i], ones - слово из единиц
+        нужной ширины. Остальные Input берут текущее значение вентиля.
+        Возвращает список слов по ID вентилей.
+        """
+        zero = ones ^ ones
+        words = [zero] * len(self.ops)
+        for gid in self.source_ids:
+            words[gid] = ones if self.input_value(gid) == 1 else zero
+        for gid, word in zip(input_ids, input_words):
+            words[gid] = word
+
+        ops = self.ops
+        start = self.fanin_start
+        index = self.fanin_index
+        evaluators = _WORD_EVALUATORS
+        for gid in self.order:
+            evaluator = evaluators[ops[gid]]
+            if evaluator is not None:
+                words[gid] = evaluator(words, index, start[gid], start[gid + 1], ones, zero)
+
+        # Обратные связи - как в _settle_cyclic(), но для всех строк сразу
+        for group in self.cyclic_groups:
+            for pass_num in range(self._settle_passes(group)):
+                any_changed = False
+                for gid in group:
+                    evaluator = evaluators[ops[gid]]
+                    if evaluator is None:
+                        continue
+                    new_word = evaluator(words, index, start[gid], start[gid + 1], ones, zero)
+                    differs = new_word != words[gid]
+                    if not isinstance(differs, bool):
+                        differs = differs.any()  # массивы NumPy сравниваются поэлементно
+                    if differs:
+                        words[gid] = new_word
+                        any_changed = True
+                if not any_changed:
+                    break
+
+        return words
+
+    def run(self, cycles=1, trace=None):
+        """Тактовая симуляция без графики: cycles фронтов общего тактового сигнала.
+
+        Сначала схема считается целиком (simulate()). На каждом фронте все
+        триггеры разом запоминают D (если EN не подключен или равен 1), Clock
+        меняет значение, затем комбинационная часть пересчитывается один раз
+        в порядке уровней. Состояние триггеров и Clock переносится в объекты
+        LogicGate. Возвращает values.
+
+        trace (SignalTrace) записывает состояние после каждого такта.
+        """
+        self.simulate()
+        if cycles > 0:
+            if self.cyclic or len(self.ops) > CODEGEN_MAX_GATES:
+                for _ in range(cycles):
+                    self._clock_edge()
+                    self._evaluate_combinational()
+                    if trace is not None:
+                        trace.record(self.values)
+            else:
+                probes = tuple(trace.gids) if trace is not None else ()
+                if self._cycle_function is None or self._cycle_probes != probes:
+                    self._cycle_function = self._compile_cycle(probes)
+                    self._cycle_probes = probes
+                if trace is None:
+                    self._cycle_function(self.values, cycles, None, 0)
+                else:
+                    position = trace.count % trace.depth * trace.row_bytes
+                    self._cycle_function(self.values, cycles, trace.buffer, position)
+                    trace.count += cycles
+        self.cycle += cycles
+
+        if self.gates is not None:
+            for gid in self.dff_ids + self.clock_ids:
+                self.gates[gid].value = self.values[gid]
+        return self.values
+
+    def _clock_edge(self):
+        """Фронт такта: новые значения всех триггеров считаются до записи любого из них"""
+        values = self.values
+        dff_ids = self.dff_ids
+        dff_d = self.dff_d
+        dff_en = self.dff_en
+        next_state = bytearray(len(dff_ids))
+        for k, gid in enumerate(dff_ids):
+            en = dff_en[k]
+            if en < 0 or values[en] == 1:
+                d = dff_d[k]
+                next_state[k] = values[d] if d >= 0 else 0
+            else:
+                next_state[k] = values[gid]
+        for k, gid in enumerate(dff_ids):
+            values[gid] = next_state[k]
+        for gid in self.clock_ids:
+            values[gid] ^= 1
+
+    def _compile_cycle(self, probes=()):
+        """Генерирует функцию cycle(values, cycles, buffer, position) для схемы без петель.
+
+        Значения вентилей - локальные переменные v<ID>, такт - прямолинейный
+        код без вызовов: защелкивание триггеров одним присваиванием кортежа
+        и по строке на вентиль в порядке уровней. Значения в netlist - только
+        0 и 1, поэтому вентили записываются через &, |, ^. Значения проб
+        (probes) в конце такта упаковываются сдвигами в строку бит и пишутся
+        прямо в кольцевой буфер SignalTrace с байта position.
+        """
+        ops = self.ops
+        step = []
+        if self.dff_ids:
+            next_state = []
+            for gid, d, en in zip(self.dff_ids, self.dff_d, self.dff_en):
+                value = f"v{d}" if d >= 0 else "0"
+                if en >= 0:
+                    value = f"({value} if v{en} else v{gid})"
+                next_state.append(value)
+            targets = ", ".join(f"v{gid}" for gid in self.dff_ids)
+            step.append(f"{targets}, = {', '.join(next_state)},")
+        for gid in self.clock_ids:
+            step.append(f"v{gid} ^= 1")
+        for gid in self.order:
+            op = ops[gid]
+            if _EVALUATORS[op] is not None:
+                names = [f"v{src}" for src in self.sources(gid)]
+                step.append(f"v{gid} = {_cycle_expression(op, names)}")
+        if probes:
+            row = " | ".join(f"v{gid} << {k}" if k else f"v{gid}" for k, gid in enumerate(probes))
+            row_bytes = (len(probes) + 7) // 8
+            if row_bytes == 1:
+                step.append(f"buffer[position] = {row}")
+            else:
+                step.append(f"buffer[position:position + {row_bytes}] = ({row}).to_bytes({row_bytes}, 'little')")
+            step.append(f"position += {row_bytes}")
+            step.append("if position == end: position = 0")
+
+        # Схема уже посчитана simulate() - начальные значения берутся из values
+        lines = ["def cycle(values, cycles, buffer, position):"]
+        if probes:
+            lines.append("    end = len(buffer)")
+        lines.extend(f"    v{gid} = values[{gid}]" for gid in range(len(ops)))
+        lines.append("    for _ in range(cycles):")
+        lines.extend("        " + line for line in step or ["pass"])
+        lines.extend(f"    values[{gid}] = v{gid}" for gid in range(len(ops)) if ops[gid] != OP_INPUT)
+
+        namespace = {}
+        exec(compile("\n".join(lines), "<netlist cycle>", "exec"), namespace)
+        logging.debug(f"Netlist: сгенерирована функция такта на {len(ops)} вентилей")
+        return namespace["cycle"]
+
+    def write_back(self):
+        """Записывает результаты в объекты LogicGate (для отрисовки).
+        Возвращает ID вентилей, у которых значение изменилось - перерисовывать
+        нужно только их"""
+        if self.gates is None:
+            return []
+        changed = []
+        for gid, (gate, value) in enumerate(zip(self.gates, self.values)):
+            if gate.output != value:
+                gate.output = value
+                changed.append(gid)
+        return changed
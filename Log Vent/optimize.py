@@ -0,0 +1,244 @@
+"""Упрощение схемы перед симуляцией и расчетом таблицы истинности.
+
+Проходы (за один обход в порядке вычислений):
+    - свертка констант: вентиль, значение которого не зависит от Input
+      (AND с одним входом, OR с входом-константой 1 и т.п.), заменяется константой;
+      нейтральные константы на входах отбрасываются;
+    - двойная инверсия: NOT(NOT(x)) -> x;
+    - структурное хеширование: вентили одного типа с одинаковыми входами
+      сливаются в один (входы AND/OR/NAND/NOR/XOR - без учета порядка);
+    - удаление мертвых вентилей: остаются только те, от которых зависит
+      хотя бы один OutputGate (или вентиль из keep).
+
+Результат - новый Netlist (from_ops) и отображение старых ID в новые.
+Семантика вентилей та же, что у _eval_* в netlist.py: на входах только
+подключенные пины, AND, NAND и XOR нужны два входа.
+"""
+import logging
+from array import array
+
+from logic_gates import OP_AND, OP_OR, OP_NOT, OP_NAND, OP_NOR, OP_XOR, OP_OUTPUT, SOURCE_OPCODES
+from netlist import Netlist
+
+# Константы внутри прохода - отрицательные номера, в схему они попадают
+# вентилями без входов только там, где нужны: OR() = 0, NOR() = 1
+CONST0 = -1
+CONST1 = -2
+
+
+def _const_value(signal):
+    """0 или 1 для константы, None для вентиля"""
+    if signal == CONST0:
+        return 0
+    if signal == CONST1:
+        return 1
+    return None
+
+
+def _constant(value):
+    return CONST1 if value else CONST0
+
+
+class OptimizationReport:
+    """Сколько вентилей убрал каждый проход"""
+
+    def __init__(self, before):
+        self.before = before
+        self.after = before
+        self.constants = 0  # вентили, ставшие константой
+        self.inversions = 0  # снятые двойные NOT
+        self.merged = 0  # слитые одинаковые вентили
+        self.dead = 0  # вентили, не влияющие на выходы
+        self.skipped = False  # схема с обратными связями не упрощается
+
+    def __str__(self):
+        if self.skipped:
+            return f"Вентилей: {self.before} (схема с обратными связями не упрощается)"
+        return (f"Вентилей: {self.before} -> {self.after} (константы: {self.constants}, "
+                f"двойные NOT: {self.inversions}, одинаковые: {self.merged}, "
+                f"без выхода: {self.dead})")
+
+
+class OptimizedCircuit:
+    """Упрощенная схема: netlist, mapping[старый ID] -> новый ID (-1 - вентиль
+    удален) и отчет"""
+
+    def __init__(self, netlist, mapping, report):
+        self.netlist = netlist
+        self.mapping = mapping
+        self.report = report
+
+    def map_ids(self, gids):
+        """Новые ID для списка старых (все вентили должны остаться в схеме)"""
+        mapped = [self.mapping[gid] for gid in gids]
+        if -1 in mapped:
+            raise ValueError("Вентиль удален при упрощении схемы - добавьте его в keep")
+        return mapped
+
+
+class _Builder:
+    """Новая схема: вентили создаются через node(), одинаковые - один раз"""
+
+    def __init__(self, report):
+        self.report = report
+        self.ops = bytearray()
+        self.fanins = []  # входы вентиля по порядку пинов
+        self.values = bytearray()
+        self.table = {}
+
+    def add(self, op, inputs=(), value=0):
+        self.ops.append(op)
+        self.fanins.append(inputs)
+        self.values.append(value)
+        return len(self.ops) - 1
+
+    def node(self, op, inputs):
+        """Вентиль op с входами inputs - существующий, если такой уже есть"""
+        key = (op, tuple(inputs) if op == OP_NOT else tuple(sorted(inputs)))
+        node = self.table.get(key)
+        if node is None:
+            node = self.table[key] = self.add(op, key[1])
+        else:
+            self.report.merged += 1
+        return node
+
+    def materialize(self, signal):
+        """Номер вентиля для сигнала: константа становится OR() или NOR()"""
+        if signal >= 0:
+            return signal
+        key = (OP_NOR if signal == CONST1 else OP_OR, ())
+        node = self.table.get(key)
+        if node is None:
+            node = self.table[key] = self.add(key[0])
+        return node
+
+    def invert(self, signal):
+        value = _const_value(signal)
+        if value is not None:
+            return _constant(1 - value)
+        if self.ops[signal] == OP_NOT:
+            self.report.inversions += 1
+            return self.fanins[signal][0]
+        return self.node(OP_NOT, [signal])
+
+    def gate(self, op, inputs):
+        """Сигнал вентиля op над сигналами inputs с упрощениями"""
+        if op == OP_NOT:
+            return self.invert(inputs[0]) if inputs else CONST1
+
+        if op == OP_XOR:
+            if len(inputs) < 2:
+                return CONST0
+            parity = 0
+            odd = {}  # x ^ x = 0: остаются сигналы, встретившиеся нечетное число раз
+            for signal in inputs:
+                value = _const_value(signal)
+                if value is not None:
+                    parity ^= value
+                elif signal in odd:
+                    del odd[signal]
+                else:
+                    odd[signal] = True
+            rest = list(odd)
+            if not rest:
+                return _constant(parity)
+            result = rest[0] if len(rest) == 1 else self.node(OP_XOR, rest)
+            return self.invert(result) if parity else result
+
+        inverted = op in (OP_NAND, OP_NOR)
+        if op in (OP_AND, OP_NAND):
+            if len(inputs) < 2 or CONST0 in inputs:
+                return _constant(inverted)
+            neutral = CONST1
+        else:
+            if CONST1 in inputs:
+                return _constant(not inverted)
+            neutral = CONST0
+
+        # Нейтральные константы и повторы не меняют результат (два входа у AND уже есть)
+        rest = list(dict.fromkeys(signal for signal in inputs if signal != neutral))
+        if not rest:
+            return _constant(_const_value(neutral) ^ inverted)
+        if len(rest) == 1:
+            return self.invert(rest[0]) if inverted else rest[0]
+        return self.node(op, rest)
+
+
+def optimize(netlist, keep=()):
+    """Упрощает netlist. keep - ID вентилей, которые нужно сохранить, даже
+    если от них не зависит ни один выход (например, колонки таблицы).
+
+    Input, Output и Clock сохраняются всегда, триггеры - если от них
+    зависит что-то сохраненное. Возвращает OptimizedCircuit.
+    """
+    count = len(netlist)
+    report = OptimizationReport(count)
+    if netlist.cyclic:
+        # Значения в петлях зависят от порядка пересчета - такую схему не трогаем
+        report.skipped = True
+        logging.info(f"Упрощение схемы: {report}")
+        return OptimizedCircuit(netlist, array("i", range(count)), report)
+
+    ops = netlist.ops
+    builder = _Builder(report)
+    signals = [CONST0] * count
+    for gid in netlist.order:
+        op = ops[gid]
+        if op in SOURCE_OPCODES:
+            signals[gid] = builder.add(op, value=netlist.input_value(gid))
+        elif op == OP_OUTPUT:
+            sources = netlist.sources(gid)
+            inputs = (builder.materialize(signals[sources[0]]),) if len(sources) else ()
+            signals[gid] = builder.add(op, inputs)
+        else:
+            signals[gid] = builder.gate(op, [signals[src] for src in netlist.sources(gid)])
+            if signals[gid] < 0:
+                report.constants += 1
+
+    # Входы триггеров - после всей комбинационной части: D может зависеть от самого триггера
+    for gid, d, en in zip(netlist.dff_ids, netlist.dff_d, netlist.dff_en):
+        d_signal = signals[d] if d >= 0 else CONST0  # неподключенный D - это 0
+        if en >= 0 and signals[en] != CONST1:  # EN = 1 - как неподключенный
+            inputs = (builder.materialize(d_signal), builder.materialize(signals[en]))
+        elif d_signal != CONST0:
+            inputs = (builder.materialize(d_signal),)
+        else:
+            inputs = ()
+        builder.fanins[signals[gid]] = inputs
+
+    # Константы, которые просили сохранить, получают свой вентиль
+    for gid in keep:
+        signals[gid] = builder.materialize(signals[gid])
+
+    # Мертвые вентили: обратный обход от выходов, keep и источников
+    new_ops = builder.ops
+    fanins = builder.fanins
+    live = bytearray(len(new_ops))
+    stack = [signals[gid] for gid in netlist.output_ids + netlist.input_ids + netlist.clock_ids]
+    stack.extend(signals[gid] for gid in keep)
+    while stack:
+        node = stack.pop()
+        if node < 0 or live[node]:
+            continue
+        live[node] = 1
+        stack.extend(fanins[node])
+
+    new_ids = array("i", [-1]) * len(new_ops)
+    kept = 0
+    for node in range(len(new_ops)):
+        if live[node]:
+            new_ids[node] = kept
+            kept += 1
+
+    reduced_ops = bytearray(op for node, op in enumerate(new_ops) if live[node])
+    values = bytearray(value for node, value in enumerate(builder.values) if live[node])
+    connections = [(new_ids[src], new_ids[node], pin)
+                   for node in range(len(new_ops)) if live[node]
+                   for pin, src in enumerate(fanins[node])]
+    reduced = Netlist.from_ops(reduced_ops, connections, values)
+
+    mapping = array("i", (new_ids[signal] if signal >= 0 else -1 for signal in signals))
+    report.after = len(reduced)
+    report.dead = len(new_ops) - kept
+    logging.info(f"Упрощение схемы: {report}")
+    return OptimizedCircuit(reduced, mapping, report)
@@ -3,6 +3,9 @@ from PyQt6.QtCore import QRectF, QPointF
 from PyQt6.QtGui import QPen, QBrush, QColor
 import logging
 
+# Мельче этого масштаба пины не рисуются (как и детали вентилей, gate_graphics.LOD_SHAPE)
+PIN_MIN_LOD = 0.3
+
 class PinGraphicsItem(QGraphicsItem):
     def __init__(self, parent_gate, pin_type, pin_index=0):
         super().__init__(parent_gate)
@@ -25,6 +28,9 @@ class PinGraphicsItem(QGraphicsItem):
         return QRectF(-self.radius, -self.radius, 2 * self.radius, 2 * self.radius)
 
     def paint(self, painter, option, widget):
+        # На мелком масштабе пины не видны - не рисуем
+        if option.levelOfDetailFromTransform(painter.worldTransform()) < PIN_MIN_LOD:
+            return
         painter.setBrush(self.brush)
         painter.drawEllipse(self.boundingRect())
 
@@ -0,0 +1,146 @@
+"""Индекс занятых клеток сцены для расстановки вентилей.
+
+Сцена делится на клетки GRID_SIZE x GRID_SIZE. Каждый вентиль занимает
+прямоугольник клеток (с полем в MARGIN клеток под пины и провода), занятость
+хранится словарем клетка -> число вентилей. Проверка места - обход клеток
+нового прямоугольника без запросов к сцене; сетка и провода препятствиями
+не считаются. Индекс обновляется при добавлении, перемещении и удалении
+вентиля (GateGraphicsItem.itemChange).
+"""
+
+GRID_SIZE = 20
+MARGIN = 1
+
+
+class OccupancyGrid:
+    """Занятые клетки: ключ (обычно графический вентиль) -> его прямоугольник"""
+
+    def __init__(self, cell=GRID_SIZE, margin=MARGIN):
+        self.cell = cell
+        self.margin = margin
+        self.cells = {}  # (cx, cy) -> сколько вентилей занимает клетку
+        self.items = {}  # ключ -> ((x0, y0, x1, y1) в клетках, ширина, высота)
+        # (размер в клетках, границы поиска) -> первая строка клеток, выше которой
+        # такому вентилю места нет. Добавление вентилей места не освобождает -
+        # подсказки сбрасываются только при удалении
+        self.hints = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def _span(self, x, y, width, height):
+        """Клетки прямоугольника: (x0, y0, x1, y1), правая и нижняя границы не входят"""
+        cell = self.cell
+        return (int(x // cell), int(y // cell),
+                int(-(-(x + width) // cell)), int(-(-(y + height) // cell)))
+
+    def add(self, key, x, y, width, height):
+        """Отмечает вентиль key в (x, y); повторный вызов переносит его"""
+        x0, y0, x1, y1 = self._span(x, y, width, height)
+        m = self.margin
+        rect = (x0 - m, y0 - m, x1 + m, y1 + m)
+        old = self.items.get(key)
+        if old is not None:
+            if old[0] == rect:
+                return
+            self.remove(key)
+        self.items[key] = (rect, width, height)
+        cells = self.cells
+        for cy in range(rect[1], rect[3]):
+            for cx in range(rect[0], rect[2]):
+                cells[cx, cy] = cells.get((cx, cy), 0) + 1
+
+    def move(self, key, x, y):
+        entry = self.items.get(key)
+        if entry is not None:
+            self.add(key, x, y, entry[1], entry[2])
+
+    def remove(self, key):
+        entry = self.items.pop(key, None)
+        if entry is None:
+            return
+        self.hints.clear()
+        x0, y0, x1, y1 = entry[0]
+        cells = self.cells
+        for cy in range(y0, y1):
+            for cx in range(x0, x1):
+                count = cells[cx, cy] - 1
+                if count:
+                    cells[cx, cy] = count
+                else:
+                    del cells[cx, cy]
+
+    def clear(self):
+        self.cells.clear()
+        self.items.clear()
+        self.hints.clear()
+
+    def _blocker(self, cx, cy, columns, rows):
+        """Самая правая занятая клетка в прямоугольнике или None, если он свободен"""
+        cells = self.cells
+        for x in range(cx + columns - 1, cx - 1, -1):
+            for y in range(cy, cy + rows):
+                if (x, y) in cells:
+                    return x
+        return None
+
+    def is_free(self, x, y, width, height):
+        x0, y0, x1, y1 = self._span(x, y, width, height)
+        return self._blocker(x0, y0, x1 - x0, y1 - y0) is None
+
+    def find_free(self, width, height, left, top, right, bottom=None, start=None):
+        """Первое свободное место по строкам клеток слева направо, сверху вниз
+        внутри [left, right) x [top, bottom). bottom=None - вниз без границы.
+
+        Занятая клетка отбрасывает сразу все позиции, которые ее накрывают,
+        так что ряд вентилей пропускается за одну проверку на вентиль.
+        start - клетка (cx, cy), с которой продолжить поиск. Возвращает
+        (x, y) в координатах сцены или None.
+        """
+        cell = self.cell
+        columns = -(-int(width) // cell)
+        rows = -(-int(height) // cell)
+        first_x = -(-int(left) // cell)
+        last_x = int(right) // cell - columns  # последняя допустимая клетка
+        cy = -(-int(top) // cell)
+        last_y = None if bottom is None else int(bottom) // cell - rows
+        if last_x < first_x:
+            return None
+        cx = first_x
+        # Заполненные строки над подсказкой не проверяем
+        hint_key = (columns, rows, first_x, last_x, cy)
+        from_hint = start is None
+        if from_hint:
+            cy = self.hints.get(hint_key, cy)
+        else:
+            cx, cy = max(start[0], first_x), max(start[1], cy)
+
+        while last_y is None or cy <= last_y:
+            while cx <= last_x:
+                blocker = self._blocker(cx, cy, columns, rows)
+                if blocker is None:
+                    if from_hint:
+                        self.hints[hint_key] = cy
+                    return cx * cell, cy * cell
+                cx = blocker + 1
+            cx = first_x
+            cy += 1
+        if from_hint:
+            self.hints[hint_key] = cy
+        return None
+
+    def place_many(self, items, left, top, right):
+        """Расставляет пачку вентилей: items - пары (ключ, (ширина, высота)).
+        Поиск продолжается с места предыдущего вентиля, а не с начала -
+        пачка из N вентилей ставится за O(N). Возвращает позиции (x, y)"""
+        positions = []
+        start = None
+        for key, (width, height) in items:
+            x, y = self.find_free(width, height, left, top, right, start=start)
+            self.add(key, x, y, width, height)
+            positions.append((x, y))
+            start = (int(x // self.cell), int(y // self.cell))
+        return positions
@@ -0,0 +1,134 @@
+"""Запись сигналов по шагам симуляции и экспорт в VCD.
+
+Шаг - один снимок значений выбранных вентилей (проб). Снимок хранится
+строкой бит: бит k - значение пробы k, строка занимает ceil(N / 8) байт.
+Строки лежат в кольцевом буфере фиксированной глубины: после заполнения
+новые шаги затирают самые старые, память не растет при длинных прогонах.
+Текст VCD формируется только при экспорте.
+"""
+import logging
+from datetime import datetime
+from operator import itemgetter
+
+DEFAULT_DEPTH = 1 << 16
+
+# Значения netlist (0/1) -> символы '0'/'1' для int(..., 2)
+_BIT_CHARS = bytes.maketrans(b"\x00\x01", b"01")
+
+# Идентификаторы сигналов в VCD - печатные символы ASCII от '!' до '~'
+_VCD_ID_FIRST = 33
+_VCD_ID_BASE = 94
+
+
+def vcd_identifier(index):
+    """Короткий идентификатор сигнала VCD: 0 -> '!', 93 -> '~', 94 -> '!!' ..."""
+    chars = []
+    index += 1
+    while index:
+        index, digit = divmod(index - 1, _VCD_ID_BASE)
+        chars.append(chr(_VCD_ID_FIRST + digit))
+    return "".join(chars)
+
+
+class SignalTrace:
+    """Пробы на вентилях netlist с кольцевым буфером бит.
+
+    gids - ID вентилей в netlist, names - их имена для VCD (по умолчанию
+    g<ID>), depth - сколько последних шагов хранится.
+    """
+
+    def __init__(self, gids, names=None, depth=DEFAULT_DEPTH):
+        gids = list(gids)
+        if not gids:
+            raise ValueError("Не выбрано ни одного сигнала для записи")
+        if depth < 1:
+            raise ValueError(f"Глубина записи должна быть положительной, получено {depth}")
+        if names is None:
+            names = [f"g{gid}" for gid in gids]
+        if len(names) != len(gids):
+            raise ValueError(f"Ожидалось {len(gids)} имен сигналов, получено {len(names)}")
+
+        self.names = list(names)
+        self.depth = depth
+        self.row_bytes = (len(gids) + 7) // 8
+        self.count = 0  # всего записано шагов, в буфере - последние min(count, depth)
+        # Шаг номер s лежит с байта s % depth * row_bytes, младший байт строки первым
+        self.buffer = bytearray(depth * self.row_bytes)
+        self.rebind(gids)
+
+    def __len__(self):
+        return min(self.count, self.depth)
+
+    def rebind(self, gids):
+        """Новые ID тех же проб (после пересборки netlist). История сохраняется"""
+        gids = list(gids)
+        if self.count and len(gids) != len(self.gids):
+            raise ValueError("Число проб нельзя менять после начала записи")
+        self.gids = gids
+        # Старшая проба первой: строка '0'/'1' читается int(..., 2) сразу с нужным порядком бит
+        getter = itemgetter(*reversed(gids))
+        self._getter = getter if len(gids) > 1 else (lambda values: (getter(values),))
+
+    def record(self, values):
+        """Записывает шаг по значениям netlist (bytearray values)"""
+        row = int(bytes(self._getter(values)).translate(_BIT_CHARS), 2)
+        row_bytes = self.row_bytes
+        position = self.count % self.depth * row_bytes
+        self.buffer[position:position + row_bytes] = row.to_bytes(row_bytes, "little")
+        self.count += 1
+
+    @property
+    def first_step(self):
+        """Номер самого старого шага, который еще хранится в буфере"""
+        return self.count - len(self)
+
+    def rows(self):
+        """Хранящиеся шаги от старых к новым: пары (номер шага, упакованная строка)"""
+        row_bytes = self.row_bytes
+        buffer = self.buffer
+        for step in range(self.first_step, self.count):
+            position = step % self.depth * row_bytes
+            yield step, int.from_bytes(buffer[position:position + row_bytes], "little")
+
+    def samples(self, probe):
+        """Значения пробы номер probe по хранящимся шагам"""
+        return bytearray(row >> probe & 1 for step, row in self.rows())
+
+    def clear(self):
+        self.count = 0
+
+    def write_vcd(self, f, timescale="1 ns", module="circuit"):
+        """Пишет хранящиеся шаги в текстовый поток f в формате VCD.
+
+        Время в VCD - номер шага. После начального $dumpvars пишутся только
+        изменившиеся сигналы.
+        """
+        ids = [vcd_identifier(k) for k in range(len(self.names))]
+        f.write(f"$date {datetime.now():%Y-%m-%d %H:%M:%S} $end\n")
+        f.write("$version Logic Gate Simulator $end\n")
+        f.write(f"$timescale {timescale} $end\n")
+        f.write(f"$scope module {module} $end\n")
+        for identifier, name in zip(ids, self.names):
+            f.write(f"$var wire 1 {identifier} {'_'.join(str(name).split())} $end\n")
+        f.write("$upscope $end\n$enddefinitions $end\n")
+
+        previous = None
+        for step, row in self.rows():
+            if previous is None:
+                f.write(f"#{step}\n$dumpvars\n")
+                f.writelines(f"{row >> k & 1}{identifier}\n" for k, identifier in enumerate(ids))
+                f.write("$end\n")
+            elif row != previous:
+                f.write(f"#{step}\n")
+                changed = row ^ previous
+                while changed:
+                    k = (changed & -changed).bit_length() - 1
+                    f.write(f"{row >> k & 1}{ids[k]}\n")
+                    changed &= changed - 1
+            previous = row
+
+    def save_vcd(self, path, **kwargs):
+        """Сохраняет запись в файл VCD"""
+        with open(path, "w", encoding="utf-8", newline="\n") as f:
+            self.write_vcd(f, **kwargs)
+        logging.info(f"Запись сигналов сохранена: {path} ({len(self.names)} сигналов, {len(self)} шагов)")
@@ -0,0 +1,188 @@
+"""Кэш таблиц истинности по структуре схемы.
+
+Ключ - отпечаток (fingerprint()) той части схемы, от которой зависят
+колонки таблицы: типы вентилей, соединения, значения триггеров и Clock,
+номера Input в порядке колонок. Номера вентилей и их положение на сцене
+в отпечаток не входят - та же схема, собранная заново или вставленная
+в другое место, дает тот же ключ.
+
+Таблица хранится упакованными колонками (как column_bytes()) в LRU
+в памяти и, если задан каталог, в файлах .lgtt (формат write_binary()),
+так что повторный анализ после перезапуска не считает таблицу заново.
+"""
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+
+from logic_gates import OP_NOT, OP_OUTPUT, OP_INPUT, SOURCE_OPCODES
+from truth_engine import TruthTableResult, read_binary, write_binary
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 512 * 1024 * 1024
+CACHE_SUFFIX = ".lgtt"
+
+# Порядок входов важен только у этих вентилей
+_ORDERED_OPCODES = (OP_NOT, OP_OUTPUT)
+
+
+def default_directory():
+    """Каталог кэша пользователя: $XDG_CACHE_HOME или ~/.cache"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "logic-gate-simulator", "tables")
+
+
+def column_digests(netlist, input_ids, column_ids):
+    """Отпечатки отдельных колонок (bytes), или None для схемы с обратными связями.
+
+    Хеш вентиля строится из его типа и хешей входов (у AND/OR/NAND/NOR/XOR
+    без учета порядка пинов), Input задается своим номером в input_ids.
+    Равные отпечатки - равные колонки таблицы.
+    """
+    if netlist.cyclic:
+        return None
+    ops = netlist.ops
+    position = {gid: k for k, gid in enumerate(input_ids)}
+
+    cone = set()
+    stack = list(column_ids)
+    while stack:
+        gid = stack.pop()
+        if gid in cone:
+            continue
+        cone.add(gid)
+        if ops[gid] not in SOURCE_OPCODES:
+            stack.extend(netlist.sources(gid))
+
+    digests = {}
+    for gid in netlist.order:
+        if gid not in cone:
+            continue
+        op = ops[gid]
+        if op == OP_INPUT and gid in position:
+            data = b"I" + position[gid].to_bytes(4, "little")
+        elif op in SOURCE_OPCODES:
+            data = b"C" + bytes((op, netlist.input_value(gid) & 0xFF))
+        else:
+            children = [digests[src] for src in netlist.sources(gid)]
+            if op not in _ORDERED_OPCODES:
+                children.sort()
+            data = bytes((op,)) + b"".join(children)
+        digests[gid] = hashlib.blake2b(data, digest_size=16).digest()
+    return [digests[gid] for gid in column_ids]
+
+
+def fingerprint(netlist, input_ids, column_ids, digests=None):
+    """Отпечаток всей таблицы: hex-строка, или None для схемы с обратными связями.
+    digests - уже посчитанные column_digests()"""
+    if digests is None:
+        digests = column_digests(netlist, input_ids, column_ids)
+        if digests is None:
+            return None
+    total = hashlib.blake2b(digest_size=16)
+    total.update(len(input_ids).to_bytes(4, "little"))
+    for digest in digests:
+        total.update(digest)
+    return total.hexdigest()
+
+
+class TruthTableCache:
+    """LRU таблиц по отпечатку: не больше max_bytes в памяти и, если задан
+    directory, не больше max_disk_bytes на диске (старые файлы удаляются)"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, directory=None, max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = OrderedDict()  # ключ -> (num_inputs, колонки)
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _path(self, key):
+        if self.directory is None:
+            return None
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def get(self, key):
+        """TruthTableResult для ключа или None. Колонка k результата - k-я
+        колонка, переданная в put()"""
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        else:
+            entry = self._load(key)
+            if entry is not None:
+                self._remember(key, *entry)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return TruthTableResult.from_columns(*entry)
+
+    def put(self, key, num_inputs, columns):
+        """Запоминает таблицу: columns - упакованные колонки (column_bytes())"""
+        columns = [bytes(column) for column in columns]
+        self._remember(key, num_inputs, columns)
+        if self.directory is not None:
+            self._save(key, num_inputs, columns)
+
+    def _remember(self, key, num_inputs, columns):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= sum(len(column) for column in old[1])
+        size = sum(len(column) for column in columns)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (num_inputs, columns)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.size -= sum(len(column) for column in evicted)
+
+    def _load(self, key):
+        path = self._path(key)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                num_inputs, _, columns = read_binary(f)
+            os.utime(path)  # недавно использованные файлы удаляются последними
+        except (OSError, ValueError) as e:
+            logging.warning(f"Не удалось прочитать таблицу из кэша {path}: {e}")
+            return None
+        return num_inputs, columns
+
+    def _save(self, key, num_inputs, columns):
+        path = self._path(key)
+        temporary = path + ".tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temporary, "wb") as f:
+                write_binary(TruthTableResult.from_columns(num_inputs, columns), range(len(columns)),
+                             [str(k) for k in range(len(columns))], f)
+            os.replace(temporary, path)
+            self._prune()
+        except OSError as e:
+            logging.warning(f"Не удалось сохранить таблицу в кэш {path}: {e}")
+
+    def _prune(self):
+        """Удаляет самые давно использованные файлы сверх max_disk_bytes"""
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(CACHE_SUFFIX):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in files)
+        for _, size, name in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
@@ -0,0 +1,88 @@
+import csv
+import logging
+import cli
+import pytest
+from circuit_io import CircuitData, save_json, load_json, save_circuit, load_circuit
+
+
+def build_half_adder():
+    """Полусумматор с позициями как на сцене: входы слева, выходы справа"""
+    circuit = CircuitData()
+    a = circuit.add_gate("INPUT", 40, 40)
+    b = circuit.add_gate("INPUT", 40, 120, value=1)
+    xor = circuit.add_gate("XOR", 160, 40)
+    carry = circuit.add_gate("AND", 160, 120)
+    out_sum = circuit.add_gate("OUTPUT", 300, 40)
+    out_carry = circuit.add_gate("OUTPUT", 300, 120)
+    for gate in (xor, carry):
+        circuit.connect(a, gate, 0)
+        circuit.connect(b, gate, 1)
+    circuit.connect(xor, out_sum)
+    circuit.connect(carry, out_carry)
+    return circuit
+
+
+def test_json_round_trip(tmp_path):
+    logging.info("=== Сохранение и загрузка схемы в JSON ===")
+    path = tmp_path / "half_adder.json"
+    save_json(build_half_adder(), path)
+    circuit = load_json(path)
+
+    assert circuit.types == ["INPUT", "INPUT", "XOR", "AND", "OUTPUT", "OUTPUT"]
+    assert circuit.values[1] == 1
+    assert circuit.connections[-1] == (3, 5, 0)
+
+    values = circuit.build_netlist().simulate()
+    assert list(values[4:]) == [1, 0], f"A = 0, B = 1: expected SUM = 1, CARRY = 0, got {values[4:]}"
+
+
+def test_binary_round_trip(tmp_path):
+    logging.info("=== Двоичный формат схемы ===")
+    original = build_half_adder()
+    path = tmp_path / "half_adder.lgs"
+    save_circuit(original, path)
+    assert path.read_bytes().startswith(b"LGSC")
+
+    # load_circuit определяет формат по содержимому, а не по расширению
+    circuit = load_circuit(path)
+    assert circuit.types == original.types
+    assert circuit.values == original.values
+    assert circuit.positions == original.positions
+    assert circuit.connections == original.connections
+
+    # Провод на пин -1 не подключается молча к последнему пину
+    broken = build_half_adder()
+    broken.connections[0] = (0, 2, -1)
+    for name in ("pin.lgs", "pin.json"):
+        save_circuit(broken, tmp_path / name)
+        with pytest.raises(ValueError):
+            load_circuit(tmp_path / name)
+
+    # Обрезанный файл не загружается молча
+    path.write_bytes(path.read_bytes()[:-4])
+    with pytest.raises(ValueError):
+        load_circuit(path)
+
+
+def test_cli_table(tmp_path):
+    logging.info("=== Таблица истинности из командной строки ===")
+    path = tmp_path / "half_adder.json"
+    save_json(build_half_adder(), path)
+    out_dir = tmp_path / "out"
+
+    assert cli.main(["table", str(path), "--output-dir", str(out_dir)]) == 0
+    with open(out_dir / "half_adder.csv", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["Ин1", "Ин2", "XOR1", "AND1", "Вых1", "Вых2"]
+    assert rows[1:] == [["0", "0", "0", "0", "0", "0"], ["0", "1", "1", "0", "1", "0"],
+                        ["1", "0", "1", "0", "1", "0"], ["1", "1", "0", "1", "0", "1"]]
+
+    assert cli.main(["table", str(path), "--output-dir", str(out_dir), "--format", "bin"]) == 0
+    data = (out_dir / "half_adder.bin").read_bytes()
+    assert data.startswith(b"LGTT")
+    # Колонка Вых2 (перенос) - единица только в строке 3: байт 0b1000
+    assert data[-1] == 0b1000
+
+    assert cli.main(["simulate", str(path), "--inputs", "11", "--output-dir", str(out_dir)]) == 0
+    with open(out_dir / "half_adder.csv", encoding="utf-8") as f:
+        assert list(csv.reader(f))[1] == ["1", "1", "0", "1", "0", "1"]
@@ -1,5 +1,5 @@
 import logging
-from logic_gates import AndGate, OrGate, NotGate, InputGate, OutputGate
+from logic_gates import AndGate, OrGate, NotGate, NandGate, XorGate, InputGate, OutputGate
 
 # Настраиваем логирование для тестов
 logging.basicConfig(
@@ -76,5 +76,51 @@ def test_gates():
     logging.info("Все тесты пройдены успешно! ✅")
 
 
+def test_connect():
+    logging.info("=== Подключение входов через connect() ===")
+    input1 = InputGate(1)
+    input2 = InputGate(1)
+
+    # Подключен только второй пин - первый остается пустым (None)
+    nand_gate = NandGate()
+    nand_gate.connect(1, input1)
+    assert nand_gate.inputs == [None, input1]
+    assert nand_gate.get_output() == 1, "NAND с одним подключенным входом = 1"
+
+    # Подключение сбрасывает запомненный выход
+    nand_gate.connect(0, input2)
+    assert nand_gate.get_output() == 0, "NAND(1, 1) expected 0"
+
+    xor_gate = XorGate()
+    xor_gate.connect(0, input1)
+    xor_gate.connect(1, 0)  # постоянное значение вместо вентиля
+    assert xor_gate.get_output() == 1, "XOR(1, 0) expected 1"
+
+    output = OutputGate()
+    assert output.get_output() == 0, "Неподключенный Output = 0"
+    output.connect(0, xor_gate)
+    assert output.get_output() == 1
+
+
+def test_deep_chain():
+    logging.info("=== Глубокая цепочка без рекурсии ===")
+    # 10000 инверторов - рекурсивный get_output() упирался в лимит глубины
+    gates = [InputGate(1)]
+    for _ in range(10000):
+        not_gate = NotGate()
+        not_gate.inputs = [gates[-1]]
+        gates.append(not_gate)
+    assert gates[-1].get_output() == 1, "Четное число инверторов не меняет значение"
+    assert gates[-2].output == 0, "Промежуточные значения запомнены"
+
+    # Кольцо: вход, который еще вычисляется, считается пустым - без зависания
+    ring = NotGate()
+    ring.connect(0, ring)
+    assert ring.get_output() == 1
+    assert gates[-1].get_output() == 1, "После петли вычисления не сломаны"
+
+
 if __name__ == "__main__":
-    test_gates()
\ No newline at end of file
+    test_gates()
+    test_connect()
+    test_deep_chain()
\ No newline at end of file
@@ -0,0 +1,489 @@
+import io
+import logging
+import tempfile
+import pytest
+from logic_gates import AndGate, OrGate, NotGate, NorGate, XorGate, InputGate, OutputGate,\
+    DFlipFlop, ClockGate, OP_INPUT, OP_XOR, OP_AND, OP_OUTPUT, OP_NOT, OP_OR, OP_NOR, OP_NAND
+import netlist as netlist_module
+from netlist import Netlist
+from signal_trace import SignalTrace, vcd_identifier
+from optimize import optimize
+from bdd import SymbolicCircuit, BddTooLarge, check_equivalence
+from truth_engine import input_words, compute_truth_table, evaluate_rows
+from table_cache import TruthTableCache, fingerprint
+
+
+def build_half_adder():
+    """Полусумматор: OUT0 = A XOR B, OUT1 = A AND B"""
+    gates = [InputGate(0), InputGate(0), XorGate(), AndGate(), OutputGate(), OutputGate()]
+    connections = [
+        (0, 2, 0), (1, 2, 1),  # A, B -> XOR
+        (0, 3, 0), (1, 3, 1),  # A, B -> AND
+        (2, 4, 0),             # XOR -> OUT0
+        (3, 5, 0),             # AND -> OUT1
+    ]
+    return Netlist(gates, connections)
+
+
+def test_netlist_half_adder():
+    logging.info("=== Netlist: полусумматор ===")
+    netlist = build_half_adder()
+
+    assert netlist.input_ids == [0, 1]
+    assert netlist.output_ids == [4, 5]
+    assert not netlist.cyclic, "В полусумматоре нет обратных связей"
+
+    for a in (0, 1):
+        for b in (0, 1):
+            values = netlist.simulate([a, b])
+            assert values[4] == a ^ b, f"SUM({a}, {b}) expected {a ^ b}, got {values[4]}"
+            assert values[5] == a & b, f"CARRY({a}, {b}) expected {a & b}, got {values[5]}"
+
+
+def test_netlist_matches_logic_gates():
+    logging.info("=== Netlist совпадает с compute_output() ===")
+    # NOT(OR(A, B)) при всех значениях входов
+    for a in (0, 1):
+        for b in (0, 1):
+            in_a, in_b = InputGate(a), InputGate(b)
+            or_gate, not_gate = OrGate(), NotGate()
+            or_gate.inputs = [in_a, in_b]
+            not_gate.inputs = [or_gate]
+
+            netlist = Netlist([in_a, in_b, or_gate, not_gate], [(0, 2, 0), (1, 2, 1), (2, 3, 0)])
+            values = netlist.simulate()
+            assert values[3] == not_gate.get_output(), f"NOT(OR({a}, {b})) differs"
+
+    # Неподключенные вентили ведут себя как в logic_gates
+    netlist = Netlist([AndGate(), NotGate(), OutputGate()], [])
+    assert list(netlist.simulate()) == [0, 1, 0]
+
+
+def test_netlist_event_driven_input():
+    logging.info("=== Netlist: событийное обновление Input ===")
+    netlist = build_half_adder()
+    netlist.simulate()
+
+    # A = 1: меняются A, XOR и OUT0, ветка AND остается прежней
+    netlist.gates[0].set_value(1)
+    changed = netlist.set_input(0, 1)
+    assert sorted(changed) == [0, 2, 4], f"Unexpected changed gates: {changed}"
+
+    # Повторная установка того же значения ничего не пересчитывает
+    assert netlist.set_input(0, 1) == []
+
+    # Результат совпадает с полным проходом
+    netlist.gates[1].set_value(1)
+    netlist.set_input(1, 1)
+    incremental = list(netlist.values)
+    assert list(netlist.simulate()) == incremental
+    assert incremental[4:] == [0, 1]
+
+
+def test_netlist_from_ops():
+    logging.info("=== Netlist без объектов LogicGate ===")
+    ops = [OP_INPUT, OP_INPUT, OP_XOR, OP_AND, OP_OUTPUT, OP_OUTPUT]
+    connections = [(0, 2, 0), (1, 2, 1), (0, 3, 0), (1, 3, 1), (2, 4, 0), (3, 5, 0),
+                   (0, 4, 0)]  # провод на занятый пин заменяет прежний
+    netlist = Netlist.from_ops(ops, connections, values=[1, 1, 0, 0, 0, 0])
+
+    assert netlist.gates is None and netlist.kind(2) == "XOR"
+    assert list(netlist.sources(3)) == [0, 1]
+    assert list(netlist.sources(4)) == [0], "Последний провод на пин побеждает"
+    assert sorted(netlist.sinks(0)) == [2, 3, 4]
+
+    # Значения Input хранятся в самом netlist
+    values = netlist.simulate()
+    assert list(values) == [1, 1, 0, 1, 1, 1]
+    assert sorted(netlist.set_input(1, 0)) == [1, 2, 3, 5]
+    assert list(netlist.values) == [1, 0, 1, 0, 1, 0]
+
+    # Копия для другого процесса совпадает с оригиналом
+    assert netlist.__getstate__()["values"] == netlist.values
+
+
+def test_input_words():
+    logging.info("=== Слова входов для побитовой таблицы ===")
+    num_inputs = 4
+    for start, count in ((0, 16), (0, 4), (8, 4), (12, 1)):
+        words = input_words(num_inputs, start, count)
+        for k in range(count):
+            row = start + k
+            expected = [(row >> bit) & 1 for bit in range(num_inputs - 1, -1, -1)]
+            actual = [(word >> k) & 1 for word in words]
+            assert actual == expected, f"Row {row}: expected {expected}, got {actual}"
+
+
+def test_truth_table_matches_simulation():
+    logging.info("=== Побитовая таблица совпадает со скалярной симуляцией ===")
+    netlist = build_half_adder()
+    # Входы в обратном порядке и маленькие блоки - проверяем сборку из нескольких блоков
+    input_ids = [1, 0]
+    result = compute_truth_table(netlist, input_ids, chunk_rows=2)
+    assert result.row_count == 4 and result.is_complete()
+
+    for row in range(result.row_count):
+        b, a = (row >> 1) & 1, row & 1
+        expected = list(netlist.simulate([a, b]))
+        assert result.row_values(row, range(len(netlist))) == expected, f"Row {row} differs"
+
+    # Отдельные строки без блока (просмотр строк, до которых расчет не дошел)
+    words = evaluate_rows(netlist, input_ids, 2, 2)
+    assert [(words[gid] >> 1) & 1 for gid in range(len(netlist))] == result.row_values(3, range(len(netlist)))
+
+
+def test_truth_table_numpy_backend():
+    logging.info("=== Бэкенд NumPy совпадает с бэкендом int ===")
+    pytest.importorskip("numpy")
+    gates = [InputGate() for _ in range(8)]
+    connections = []
+    for i in range(0, 8, 2):
+        gates.append(XorGate())
+        connections += [(i, len(gates) - 1, 0), (i + 1, len(gates) - 1, 1)]
+    gates.append(OrGate())
+    connections += [(8, 12, 0), (11, 12, 1)]
+
+    netlist = Netlist(gates, connections)
+    packed = compute_truth_table(netlist, netlist.input_ids, chunk_rows=128, backend="numpy")
+    reference = compute_truth_table(netlist, netlist.input_ids, backend="int")
+    assert packed.backend == "numpy" and packed.chunk_count == 2
+
+    gids = range(len(netlist))
+    for row in range(reference.row_count):
+        assert packed.row_values(row, gids) == reference.row_values(row, gids), f"Row {row} differs"
+
+
+def test_truth_table_sharded():
+    logging.info("=== Таблица в нескольких процессах совпадает с однопоточной ===")
+    netlist = build_half_adder()
+    netlist.gates[1].set_value(1)  # вход B не перебирается - его значение уходит в процессы
+
+    reference = compute_truth_table(netlist, [0], chunk_rows=1)
+    sharded = compute_truth_table(netlist, [0], chunk_rows=1, workers=2)
+
+    assert sharded.is_complete() and sharded.chunk_count == 2
+    gids = range(len(netlist))
+    for row in range(reference.row_count):
+        assert sharded.row_values(row, gids) == reference.row_values(row, gids), f"Row {row} differs"
+    assert sharded.row_values(1, [4, 5]) == [0, 1], "A = 1, B = 1: SUM = 0, CARRY = 1"
+
+def test_netlist_feedback_loops():
+    logging.info("=== Netlist: обратные связи выделяются в компоненты ===")
+    # RS-защелка на NOR: S -> NOR1, R -> NOR2, выходы перекрестно на входы
+    gates = [InputGate(1), InputGate(0), NorGate(), NorGate(), OutputGate()]
+    connections = [(1, 2, 0), (3, 2, 1), (0, 3, 0), (2, 3, 1), (2, 4, 0)]
+    netlist = Netlist(gates, connections)
+
+    assert list(netlist.order) == [0, 1]
+    assert netlist.feedback_loops == [[2, 3]], f"Unexpected loops: {netlist.feedback_loops}"
+    assert netlist.cyclic_groups == [[2, 3], [4]], "Выход идет после петли"
+
+    values = netlist.simulate()
+    assert netlist.stable and values[4] == 1, "S = 1 устанавливает Q = 1"
+
+    # Кольцо из одного NOT генерирует и не стабилизируется
+    ring = Netlist([NotGate()], [(0, 0, 0)])
+    assert ring.feedback_loops == [[0]]
+    ring.simulate()
+    assert not ring.stable
+
+    # Длинная цепочка считается за один проход, уровни растут по цепочке
+    chain = Netlist([InputGate(1)] + [NotGate() for _ in range(100)],
+                    [(i, i + 1, 0) for i in range(100)])
+    assert not chain.cyclic and chain.levels[-1] == 100
+    assert chain.simulate()[-1] == 1
+
+
+def build_counter(gates=None):
+    """Двухбитный счетчик с разрешением: Q0 <- NOT Q0, Q1 <- Q1 XOR Q0 при EN = 1"""
+    if gates is None:
+        gates = [InputGate(1), DFlipFlop(), DFlipFlop(), NotGate(), XorGate(), ClockGate()]
+    connections = [
+        (1, 3, 0), (3, 1, 0), (0, 1, 1),             # Q0 -> NOT -> D0, EN
+        (1, 4, 0), (2, 4, 1), (4, 2, 0), (0, 2, 1),  # Q0, Q1 -> XOR -> D1, EN
+    ]
+    return Netlist(gates, connections)
+
+
+@pytest.mark.parametrize("codegen", [True, False])
+def test_netlist_counter_run(codegen, monkeypatch):
+    logging.info(f"=== Netlist: тактовая симуляция счетчика (codegen={codegen}) ===")
+    if not codegen:
+        monkeypatch.setattr(netlist_module, "CODEGEN_MAX_GATES", 0)
+    netlist = build_counter()
+
+    assert netlist.dff_ids == [1, 2] and netlist.clock_ids == [5]
+    assert not netlist.cyclic, "Петля через триггер не является обратной связью"
+
+    for cycle in range(1, 6):
+        values = netlist.run()
+        assert values[1] + 2 * values[2] == cycle % 4, f"Такт {cycle}: {list(values)}"
+        assert values[5] == cycle % 2, "Clock меняется на каждом такте"
+
+    # Состояние хранится в вентилях и переживает пересборку netlist
+    assert netlist.gates[1].value == 1 and netlist.gates[2].value == 0
+    netlist = build_counter(netlist.gates)
+    values = netlist.run(8)
+    assert values[1] + 2 * values[2] == (5 + 8) % 4 and netlist.cycle == 8
+
+    # EN = 0: триггеры держат значение
+    netlist.gates[0].set_value(0)
+    values = netlist.run(3)
+    assert values[1] + 2 * values[2] == 1
+
+
+@pytest.mark.parametrize("codegen", [True, False])
+def test_signal_trace(codegen, monkeypatch):
+    logging.info(f"=== Запись сигналов счетчика (codegen={codegen}) ===")
+    if not codegen:
+        monkeypatch.setattr(netlist_module, "CODEGEN_MAX_GATES", 0)
+    netlist = build_counter()
+    trace = SignalTrace([1, 2, 5], ["Q0", "Q1", "CLK"], depth=4)
+    trace.record(netlist.simulate())
+    netlist.run(6, trace)
+
+    # Хранятся только 4 последних шага из 7, строка - 1 байт
+    assert trace.count == 7 and len(trace) == 4 and len(trace.buffer) == 4
+    assert [step for step, row in trace.rows()] == [3, 4, 5, 6]
+    assert list(trace.samples(0)) == [1, 0, 1, 0], "Q0 меняется каждый такт"
+    assert list(trace.samples(1)) == [1, 0, 0, 1], "Q1 - второй бит счетчика"
+
+    text = io.StringIO()
+    trace.write_vcd(text)
+    vcd = text.getvalue()
+    assert "$var wire 1 ! Q0 $end" in vcd and "$enddefinitions $end" in vcd
+    body = vcd.split("$enddefinitions $end\n")[1].split("\n")
+    assert body[:6] == ["#3", "$dumpvars", "1!", "1\"", "1#", "$end"]
+    assert body[6:10] == ["#4", "0!", "0\"", "0#"], "Пишутся только изменения"
+
+    assert [vcd_identifier(k) for k in (0, 93, 94)] == ["!", "~", "!!"]
+
+
+def test_optimize():
+    logging.info("=== Упрощение схемы ===")
+    ops = [OP_INPUT, OP_INPUT, OP_NOT, OP_NOT, OP_AND, OP_AND, OP_OR, OP_AND, OP_OR, OP_XOR,
+           OP_OUTPUT, OP_OUTPUT]
+    connections = [
+        (0, 2, 0), (2, 3, 0),             # NOT(NOT(A))
+        (0, 4, 0), (1, 4, 1),             # AND(A, B)
+        (1, 5, 0), (0, 5, 1),             # AND(B, A) - тот же вентиль
+        (4, 6, 0), (5, 6, 1),             # OR(x, x) = x
+        (0, 7, 0),                        # AND с одним входом = 0
+        (7, 8, 0), (3, 8, 1),             # OR(0, A) = A
+        (0, 9, 0), (1, 9, 1),             # XOR ни на что не влияет
+        (6, 10, 0), (8, 11, 0),
+    ]
+    netlist = Netlist.from_ops(ops, connections)
+    optimized = optimize(netlist)
+    report = optimized.report
+    reduced = optimized.netlist
+
+    assert (report.before, report.after) == (12, 5), str(report)
+    assert (report.constants, report.inversions, report.merged, report.dead) == (1, 1, 1, 2), str(report)
+    assert sorted(reduced.kind(gid) for gid in range(len(reduced))) == ["AND", "INPUT", "INPUT", "OUTPUT", "OUTPUT"]
+    assert optimized.mapping[8] == optimized.mapping[0], "OR(0, NOT(NOT(A))) - это A"
+    assert optimized.mapping[6] == optimized.mapping[4] == optimized.mapping[5]
+    assert optimized.mapping[7] == -1 and optimized.mapping[9] == -1
+
+    # Выходы совпадают с исходной схемой при всех значениях входов
+    outputs = optimized.map_ids(netlist.output_ids)
+    for a in (0, 1):
+        for b in (0, 1):
+            values = netlist.simulate([a, b])
+            inputs = dict(zip(optimized.map_ids([0, 1]), (a, b)))
+            reduced_values = reduced.simulate([inputs[gid] for gid in reduced.input_ids])
+            assert [reduced_values[gid] for gid in outputs] == [values[10], values[11]]
+
+    # Константа из keep остается вентилем без входов
+    kept = optimize(netlist, keep=[7])
+    constant = kept.mapping[7]
+    assert kept.netlist.ops[constant] in (OP_OR, OP_NOR) and kept.netlist.simulate()[constant] == 0
+    with pytest.raises(ValueError):
+        optimized.map_ids([7])
+
+    # Петля через триггер упрощается, комбинационная - нет. Без выходов
+    # триггеры счетчика ни на что не влияют и остаются только по keep
+    counter = build_counter()
+    assert optimize(counter).report.after == 2, "Остаются Input и Clock"
+    assert optimize(counter, keep=counter.dff_ids).report.after == 6
+    assert optimize(Netlist([NotGate()], [(0, 0, 0)])).report.skipped
+
+
+def build_adder(bits, nand_xor=False, broken_carry=None):
+    """Сумматор с последовательным переносом: входы a0..a(n-1), b0..b(n-1),
+    выходы - биты суммы и перенос. XOR можно собрать из четырех NAND,
+    broken_carry - бит, где перенос ошибочно считается через AND"""
+    ops = []
+    connections = []
+
+    def add(op, *sources):
+        ops.append(op)
+        connections.extend((src, len(ops) - 1, pin) for pin, src in enumerate(sources))
+        return len(ops) - 1
+
+    def xor(x, y):
+        if not nand_xor:
+            return add(OP_XOR, x, y)
+        n = add(OP_NAND, x, y)
+        return add(OP_NAND, add(OP_NAND, x, n), add(OP_NAND, y, n))
+
+    a = [add(OP_INPUT) for _ in range(bits)]
+    b = [add(OP_INPUT) for _ in range(bits)]
+    carry = None
+    for i in range(bits):
+        p = xor(a[i], b[i])
+        add(OP_OUTPUT, xor(p, carry) if carry is not None else p)
+        g = add(OP_AND, a[i], b[i])
+        if carry is not None:
+            g = add(OP_AND if i == broken_carry else OP_OR, g, add(OP_AND, p, carry))
+        carry = g
+    add(OP_OUTPUT, carry)
+    return Netlist.from_ops(ops, connections)
+
+
+def test_bdd_adder():
+    logging.info("=== BDD: сумматор без перебора строк ===")
+    netlist = build_adder(16)  # 32 входа - 2^32 строк
+    symbolic = SymbolicCircuit(netlist)
+    rows = 1 << 32
+
+    assert all(symbolic.count_ones(gid) == rows // 2 for gid in netlist.output_ids[:-1])
+    carry = netlist.output_ids[-1]
+    assert symbolic.count_ones(carry) == (1 << 16) * ((1 << 16) - 1) // 2, "a + b >= 2^16"
+    assert len(symbolic.bdd) < 5000, "Биты чередуются - диаграмма линейна"
+
+    # Найденный набор действительно дает перенос
+    example = [value or 0 for value in symbolic.satisfy(carry)]
+    assert netlist.simulate(example)[carry] == 1
+    assert symbolic.satisfy(carry, 0) is not None
+
+    # Все наборы для старшего бита маленького сумматора покрывают ровно его единицы
+    small = build_adder(3)
+    small_symbolic = SymbolicCircuit(small)
+    cubes = list(small_symbolic.cubes(small.output_ids[2]))
+    covered = sum(1 << cube.count(None) for cube in cubes)
+    assert covered == small_symbolic.count_ones(small.output_ids[2]) == 32
+    for row in range(64):
+        bits = [(row >> k) & 1 for k in range(6)]
+        in_cube = any(all(v is None or v == bit for v, bit in zip(cube, bits)) for cube in cubes)
+        assert in_cube == (small.simulate(bits)[small.output_ids[2]] == 1)
+
+
+def test_bdd_equivalence():
+    logging.info("=== BDD: эквивалентность схем ===")
+    reference = build_adder(8)
+    assert check_equivalence(reference, build_adder(8, nand_xor=True)) is None
+
+    broken = build_adder(8, broken_carry=3)
+    output, inputs = check_equivalence(reference, broken)
+    assert output == 4, "Ошибка переноса в бите 3 видна в бите суммы 4"
+    inputs = [value or 0 for value in inputs]
+    assert reference.simulate(inputs)[reference.output_ids[4]] != broken.simulate(inputs)[broken.output_ids[4]]
+
+    with pytest.raises(BddTooLarge):
+        SymbolicCircuit(reference, max_nodes=10).count_ones(reference.output_ids[-1])
+    with pytest.raises(ValueError):
+        ring = Netlist.from_ops([OP_NOT, OP_OUTPUT], [(0, 0, 0), (0, 1, 0)])
+        SymbolicCircuit(ring).count_ones(1)
+
+
+def test_bdd_flip_flop():
+    logging.info("=== BDD: триггер внутри конуса выхода ===")
+    # Input -> NOT -> D; Q -> OUT0, Q AND Input -> OUT1. D строится позже Q
+    flip_flop = DFlipFlop()
+    flip_flop.value = 1
+    gates = [InputGate(0), NotGate(), flip_flop, OutputGate(), AndGate(), OutputGate()]
+    connections = [(0, 1, 0), (1, 2, 0), (2, 3, 0), (0, 4, 0), (2, 4, 1), (4, 5, 0)]
+    netlist = Netlist(gates, connections)
+
+    symbolic = SymbolicCircuit(netlist)
+    assert symbolic.count_ones(3) == 2, "Триггер берется с текущим значением 1"
+    assert symbolic.count_ones(5) == 1 and symbolic.satisfy(5) == [1]
+
+
+def test_table_cache(tmp_path):
+    logging.info("=== Кэш таблиц истинности ===")
+    netlist = build_adder(4)
+    columns = netlist.output_ids
+    key = fingerprint(netlist, netlist.input_ids, columns)
+
+    # Та же схема с другой нумерацией вентилей и переставленными пинами AND
+    count = len(netlist)
+    new_id = list(reversed(range(count)))
+    ops = bytearray(count)
+    connections = []
+    for gid in range(count):
+        ops[new_id[gid]] = netlist.ops[gid]
+        sources = list(netlist.sources(gid))
+        if netlist.ops[gid] == OP_AND:
+            sources.reverse()
+        connections.extend((new_id[src], new_id[gid], pin) for pin, src in enumerate(sources))
+    renumbered = Netlist.from_ops(ops, connections)
+    renumbered_inputs = [new_id[gid] for gid in netlist.input_ids]
+    renumbered_columns = [new_id[gid] for gid in columns]
+    assert fingerprint(renumbered, renumbered_inputs, renumbered_columns) == key
+    assert fingerprint(renumbered, renumbered_inputs[::-1], renumbered_columns) != key, "Порядок Input важен"
+    assert fingerprint(build_adder(4, broken_carry=2), netlist.input_ids, columns) != key
+
+    result = compute_truth_table(netlist, netlist.input_ids)
+    packed = [result.column_bytes(gid) for gid in columns]
+    cache = TruthTableCache(directory=str(tmp_path))
+    assert cache.get(key) is None
+    cache.put(key, len(netlist.input_ids), packed)
+    cached = cache.get(key)
+    assert cached.is_complete()
+    assert all(cached.row_values(row, range(len(columns))) == result.row_values(row, columns)
+               for row in range(result.row_count))
+
+    # После перезапуска таблица читается с диска
+    restored = TruthTableCache(directory=str(tmp_path)).get(key)
+    assert [restored.column_bytes(k) for k in range(len(columns))] == packed
+
+    # Вытеснение самой давно использованной таблицы
+    small = TruthTableCache(max_bytes=2 * len(b"".join(packed)))
+    for name in ("a", "b", "c"):
+        small.put(name, 8, packed)
+    assert small.get("a") is None and small.get("c") is not None
+    assert len(small) == 2
+
+    ring = Netlist.from_ops([OP_NOT, OP_OUTPUT], [(0, 0, 0), (0, 1, 0)])
+    assert fingerprint(ring, [], [1]) is None
+
+
+def test_netlist_subcircuit():
+    logging.info("=== Netlist: часть схемы для пересчета колонок ===")
+    netlist = build_adder(4)
+    carry = netlist.output_ids[-1]
+    part, mapping = netlist.subcircuit([carry] + netlist.input_ids)
+    assert len(part) < len(netlist)
+    assert all(netlist.ops[gid] == part.ops[new_id] for gid, new_id in mapping.items())
+
+    full = compute_truth_table(netlist, netlist.input_ids)
+    reduced = compute_truth_table(part, [mapping[gid] for gid in netlist.input_ids])
+    assert reduced.column_bytes(mapping[carry]) == full.column_bytes(carry)
+
+    # Триггер остается источником со своим значением, его вход не нужен
+    counter = build_counter()
+    dff = counter.dff_ids[0]
+    counter.gates[dff].set_value(1)
+    part, mapping = counter.subcircuit([dff])
+    assert len(part) == 1 and part.input_value(mapping[dff]) == 1
+
+
+if __name__ == "__main__":
+    test_netlist_half_adder()
+    test_netlist_matches_logic_gates()
+    test_netlist_event_driven_input()
+    test_netlist_from_ops()
+    test_input_words()
+    test_truth_table_matches_simulation()
+    test_truth_table_numpy_backend()
+    test_truth_table_sharded()
+    test_netlist_feedback_loops()
+    test_netlist_counter_run(True, pytest.MonkeyPatch())
+    test_signal_trace(True, pytest.MonkeyPatch())
+    test_optimize()
+    test_bdd_adder()
+    test_bdd_equivalence()
+    test_table_cache(tempfile.mkdtemp())
+    test_netlist_subcircuit()
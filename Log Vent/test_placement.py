@@ -0,0 +1,28 @@
+import logging
+from placement import OccupancyGrid
+
+
+def test_occupancy_grid():
+    logging.info("=== Индекс занятых клеток для расстановки вентилей ===")
+    grid = OccupancyGrid()
+    first = grid.find_free(80, 60, 50, 50, 260)
+    assert first == (60, 60), "Позиции выравниваются по клеткам"
+    grid.add("a", *first, 80, 60)
+    assert not grid.is_free(100, 80, 40, 40)
+
+    # Следующий вентиль правее, с пустой клеткой между ними
+    second = grid.find_free(80, 60, 50, 50, 260)
+    assert second == (160, 60)
+    grid.add("b", *second, 80, 60)
+    assert grid.find_free(80, 60, 50, 50, 260, bottom=140) is None, "Строка заполнена"
+
+    # Перемещение и удаление освобождают клетки
+    grid.move("a", 600, 600)
+    assert grid.find_free(80, 60, 50, 50, 260) == (60, 60)
+    grid.remove("a")
+    grid.remove("b")
+    assert not grid.cells and len(grid) == 0
+
+    positions = grid.place_many([(k, (40, 40)) for k in range(50)], 0, 0, 400)
+    assert len(set(positions)) == 50
+    assert not any(grid.is_free(x, y, 40, 40) for x, y in positions)
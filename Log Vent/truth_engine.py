@@ -0,0 +1,328 @@
+import csv
+import logging
+import struct
+from concurrent.futures import ProcessPoolExecutor
+
+from logic_gates import OP_INPUT, OP_OUTPUT
+
+try:
+    import numpy as np
+except ImportError:  # NumPy не обязателен - без него работает бэкенд на int
+    np = None
+
+
+# Сколько строк таблицы считается за один проход по схеме
+DEFAULT_CHUNK_ROWS = 4096
+
+# Бэкенд NumPy: блоки крупнее, слова - uint64 по 64 строки
+NUMPY_CHUNK_ROWS = 1 << 16
+NUMPY_MIN_INPUTS = 16  # с меньшим числом входов int не медленнее
+WORD_BITS = 64
+ALL_ONES = (1 << WORD_BITS) - 1
+
+
+def input_words(num_inputs, start, count):
+    """Слова входов для строк [start, start + count).
+
+    Строка r таблицы - двоичная запись r, первый вход - старший бит
+    (строки идут в порядке возрастания). count - степень двойки,
+    start кратен count. Бит k слова входа - его значение в строке start + k.
+    """
+    ones = (1 << count) - 1
+    words = []
+    for i in range(num_inputs):
+        bit = num_inputs - 1 - i
+        half = 1 << bit
+        if half >= count:
+            # Внутри блока вход не меняется
+            words.append(ones if (start >> bit) & 1 else 0)
+        else:
+            # half нулей, затем half единиц - и так по всему слову
+            period = half << 1
+            block = ((1 << half) - 1) << half
+            repeat = ones // ((1 << period) - 1)
+            words.append(block * repeat)
+    return words
+
+
+def input_arrays(num_inputs, start, count):
+    """То же, что input_words(), но для бэкенда NumPy: вход - массив uint64,
+    слово j покрывает строки start + 64 * j ... start + 64 * j + 63"""
+    words = count // WORD_BITS
+    first = start // WORD_BITS
+    index = np.arange(first, first + words, dtype=np.uint64)
+    # Младшие 6 бит номера строки повторяются в каждом слове одинаково
+    patterns = input_words(num_inputs, 0, WORD_BITS)
+
+    arrays = []
+    for i in range(num_inputs):
+        bit = num_inputs - 1 - i
+        if bit < 6:
+            arrays.append(np.full(words, patterns[i], dtype=np.uint64))
+        else:
+            selected = (index >> np.uint64(bit - 6)) & np.uint64(1)
+            arrays.append(selected * np.uint64(ALL_ONES))
+    return arrays
+
+
+def choose_backend(num_inputs, backend="auto"):
+    """Выбирает бэкенд: 'int' (длинные целые Python) или 'numpy'"""
+    if backend == "auto":
+        if np is not None and num_inputs >= NUMPY_MIN_INPUTS:
+            return "numpy"
+        return "int"
+    if backend == "numpy":
+        if np is None:
+            raise ImportError("Для бэкенда 'numpy' нужен пакет numpy")
+        if (1 << num_inputs) < WORD_BITS:
+            return "int"  # таблица меньше одного слова uint64
+    elif backend != "int":
+        raise ValueError(f"Неизвестный бэкенд таблицы истинности: {backend}")
+    return backend
+
+
+class TruthTableResult:
+    """Упакованная таблица истинности.
+
+    Строки разбиты на блоки по chunk_rows. Для каждого блока хранится
+    по одному слову на вентиль (по ID из netlist): бит k слова - значение
+    вентиля в строке index * chunk_rows + k. В бэкенде 'int' блок - список
+    int, в бэкенде 'numpy' - битовая матрица uint64 формы (вентили, chunk_rows / 64).
+    """
+
+    def __init__(self, num_inputs, chunk_rows=None, backend="auto"):
+        self.num_inputs = num_inputs
+        self.row_count = 1 << num_inputs
+        self.backend = choose_backend(num_inputs, backend)
+        if chunk_rows is None:
+            chunk_rows = NUMPY_CHUNK_ROWS if self.backend == "numpy" else DEFAULT_CHUNK_ROWS
+        self.chunk_rows = min(chunk_rows, self.row_count)
+        if self.backend == "numpy":
+            self.chunk_rows = max(self.chunk_rows, WORD_BITS)
+        self.chunks = {}
+
+    @classmethod
+    def from_columns(cls, num_inputs, columns):
+        """Результат из упакованных колонок (как column_bytes()): вентиль
+        номер k - колонка k. Бэкенд 'int', блоки по DEFAULT_CHUNK_ROWS строк"""
+        result = cls(num_inputs, backend="int")
+        size = max(result.chunk_rows // 8, 1)
+        for index in range(result.chunk_count):
+            offset = index * size
+            result.add_chunk(index, [int.from_bytes(column[offset:offset + size], "little")
+                                     for column in columns])
+        return result
+
+    def empty_copy(self):
+        """Пустой результат с тем же разбиением - для передачи в другие процессы"""
+        return TruthTableResult(self.num_inputs, self.chunk_rows, self.backend)
+
+    @property
+    def chunk_count(self):
+        return (self.row_count + self.chunk_rows - 1) // self.chunk_rows
+
+    def chunk_start(self, index):
+        return index * self.chunk_rows
+
+    def add_chunk(self, index, words):
+        self.chunks[index] = words
+
+    def has_row(self, row):
+        return row // self.chunk_rows in self.chunks
+
+    def is_complete(self):
+        return len(self.chunks) == self.chunk_count
+
+    def value(self, row, gid):
+        """Значение вентиля gid в строке row"""
+        return self.row_values(row, (gid,))[0]
+
+    def row_values(self, row, gids):
+        """Значения нескольких вентилей в одной строке"""
+        words = self.chunks[row // self.chunk_rows]
+        shift = row % self.chunk_rows
+        if self.backend == "numpy":
+            word, bit = divmod(shift, WORD_BITS)
+            return [(int(words[gid, word]) >> bit) & 1 for gid in gids]
+        return [(words[gid] >> shift) & 1 for gid in gids]
+
+    def column_bytes(self, gid):
+        """Все строки столбца упакованными битами: строка r - бит r % 8 байта r // 8"""
+        size = (self.chunk_rows + 7) // 8
+        parts = []
+        for index in range(self.chunk_count):
+            words = self.chunks[index]
+            if self.backend == "numpy":
+                parts.append(words[gid].astype("<u8").tobytes())
+            else:
+                parts.append(words[gid].to_bytes(size, "little"))
+        return b"".join(parts)
+
+
+def column_layout(ops, xs):
+    """Порядок колонок как в TruthTableWidget: Input, остальные, Output,
+    внутри групп - слева направо. ops - коды типов вентилей.
+    Возвращает (input_ids, column_ids)"""
+    by_x = sorted(range(len(ops)), key=lambda gid: xs[gid])
+    input_ids = [gid for gid in by_x if ops[gid] == OP_INPUT]
+    output_ids = [gid for gid in by_x if ops[gid] == OP_OUTPUT]
+    other_ids = [gid for gid in by_x if ops[gid] not in (OP_INPUT, OP_OUTPUT)]
+    return input_ids, input_ids + other_ids + output_ids
+
+
+def column_headers(kinds):
+    """Заголовки колонок по типам вентилей: Ин1.., AND1.., Вых1.."""
+    headers = []
+    input_counter = 1
+    output_counter = 1
+    other_counter = {}
+
+    for kind in kinds:
+        if kind == "INPUT":
+            headers.append(f"Ин{input_counter}")
+            input_counter += 1
+        elif kind == "OUTPUT":
+            headers.append(f"Вых{output_counter}")
+            output_counter += 1
+        else:
+            if kind not in other_counter:
+                other_counter[kind] = 1
+            else:
+                other_counter[kind] += 1
+            headers.append(f"{kind}{other_counter[kind]}")
+
+    return headers
+
+
+def write_csv(result, column_ids, headers, stream):
+    """Таблица в CSV: строка заголовков и по строке на комбинацию входов"""
+    writer = csv.writer(stream)
+    writer.writerow(headers)
+    for row in range(result.row_count):
+        writer.writerow(result.row_values(row, column_ids))
+
+
+# Двоичный формат: заголовок, имена колонок, затем столбцы упакованных битов
+BINARY_MAGIC = b"LGTT"
+BINARY_VERSION = 1
+
+
+def write_binary(result, column_ids, headers, stream):
+    """Таблица в двоичном виде: по (2^n + 7) // 8 байт на колонку"""
+    stream.write(BINARY_MAGIC)
+    stream.write(struct.pack("<HHI", BINARY_VERSION, result.num_inputs, len(column_ids)))
+    for header in headers:
+        name = header.encode("utf-8")
+        stream.write(struct.pack("<H", len(name)))
+        stream.write(name)
+    for gid in column_ids:
+        stream.write(result.column_bytes(gid))
+
+
+def read_binary(stream):
+    """Читает таблицу, записанную write_binary(): (num_inputs, headers, columns),
+    колонки - упакованные биты"""
+    magic = stream.read(len(BINARY_MAGIC))
+    if magic != BINARY_MAGIC:
+        raise ValueError("Файл не является таблицей истинности")
+    version, num_inputs, column_count = struct.unpack("<HHI", stream.read(8))
+    if version > BINARY_VERSION:
+        raise ValueError(f"Неподдерживаемая версия формата: {version}")
+    headers = []
+    for _ in range(column_count):
+        length, = struct.unpack("<H", stream.read(2))
+        headers.append(stream.read(length).decode("utf-8"))
+    size = ((1 << num_inputs) + 7) // 8
+    columns = [stream.read(size) for _ in range(column_count)]
+    if any(len(column) != size for column in columns):
+        raise ValueError("Файл таблицы поврежден")
+    return num_inputs, headers, columns
+
+
+def evaluate_chunk(netlist, input_ids, result, index):
+    """Считает один блок строк и кладет его в result"""
+    words = compute_chunk(netlist, input_ids, result, index)
+    result.add_chunk(index, words)
+    return words
+
+
+def evaluate_rows(netlist, input_ids, start, count):
+    """Слова всех вентилей для строк [start, start + count) на бэкенде int -
+    несколько строк без расчета целого блока. count - степень двойки, start кратен count"""
+    return netlist.evaluate_words(input_ids, input_words(len(input_ids), start, count), (1 << count) - 1)
+
+
+def compute_chunk(netlist, input_ids, result, index):
+    """Считает один блок строк (разбиение и бэкенд берутся из result), в result не кладет"""
+    start = result.chunk_start(index)
+    count = result.chunk_rows
+    if result.backend == "numpy":
+        ones = np.full(count // WORD_BITS, ALL_ONES, dtype=np.uint64)
+        words = netlist.evaluate_words(input_ids, input_arrays(len(input_ids), start, count), ones)
+        words = np.stack(words)
+    else:
+        words = netlist.evaluate_words(input_ids, input_words(len(input_ids), start, count),
+                                       (1 << count) - 1)
+    return words
+
+
+def shard_ranges(chunk_count, shards):
+    """Делит блоки [0, chunk_count) на shards непрерывных диапазонов (first, last)"""
+    shards = max(1, min(shards, chunk_count))
+    step, extra = divmod(chunk_count, shards)
+    ranges = []
+    first = 0
+    for i in range(shards):
+        last = first + step + (1 if i < extra else 0)
+        ranges.append((first, last))
+        first = last
+    return ranges
+
+
+def compute_shard(netlist, input_ids, layout, first, last):
+    """Блоки [first, last) - выполняется в процессе пула, netlist приходит копией"""
+    return [compute_chunk(netlist, input_ids, layout, index) for index in range(first, last)]
+
+
+# Схема процесса пула: init_chunk_worker() получает ее один раз при запуске
+# процесса, задания compute_worker_chunk() передают только номер блока
+_worker_state = None
+
+
+def init_chunk_worker(netlist, input_ids, layout):
+    global _worker_state
+    _worker_state = (netlist, input_ids, layout)
+
+
+def compute_worker_chunk(index):
+    """Один блок в процессе пула, подготовленном init_chunk_worker()"""
+    netlist, input_ids, layout = _worker_state
+    return compute_chunk(netlist, input_ids, layout, index)
+
+
+def compute_truth_table(netlist, input_ids, chunk_rows=None, backend="auto",
+                        workers=1, mp_context=None):
+    """Полная таблица истинности: перебираются все 2^n значений входов input_ids
+    (первый вход - старший бит номера строки).
+
+    При workers > 1 блоки делятся на непрерывные диапазоны и считаются
+    в ProcessPoolExecutor, результаты собираются по порядку.
+    """
+    result = TruthTableResult(len(input_ids), chunk_rows, backend)
+
+    if workers > 1 and result.chunk_count > 1:
+        layout = result.empty_copy()
+        ranges = shard_ranges(result.chunk_count, workers)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+            futures = [executor.submit(compute_shard, netlist, input_ids, layout, first, last)
+                       for first, last in ranges]
+            for (first, last), future in zip(ranges, futures):
+                for index, words in enumerate(future.result(), first):
+                    result.add_chunk(index, words)
+    else:
+        for index in range(result.chunk_count):
+            evaluate_chunk(netlist, input_ids, result, index)
+
+    logging.debug(f"Таблица истинности: {result.row_count} строк, {result.chunk_count} блоков, "
+                  f"бэкенд {result.backend}")
+    return result
@@ -1,12 +1,283 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QTableWidget, QTableWidgetItem,\
-    QLabel, QPushButton, QHBoxLayout, QHeaderView
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QColor
-import copy
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QTableView, QAbstractItemView,\
+    QLabel, QPushButton, QHBoxLayout, QHeaderView, QProgressBar
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QObject, QRunnable,\
+    QThreadPool, pyqtSignal
+from PyQt6.QtGui import QColor, QFont
 import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from logic_gates import OP_INPUT, OP_OUTPUT
+from optimize import optimize
+from bdd import SymbolicCircuit, BddTooLarge
+from table_cache import TruthTableCache, default_directory, column_digests, fingerprint
+from truth_engine import TruthTableResult, evaluate_rows, compute_chunk, init_chunk_worker, compute_worker_chunk,\
+    column_headers
+
+
+class TruthTableSignals(QObject):
+    """Сигналы фонового расчета (QRunnable сам сигналы отправлять не умеет)"""
+    chunk_ready = pyqtSignal(int, object)  # номер блока, слова блока
+    progress = pyqtSignal(int, int)  # посчитано строк, всего строк
+    finished = pyqtSignal(bool)  # True - досчитано, False - отменено
+
+
+class TruthTableWorker(QRunnable):
+    """Считает таблицу истинности в пуле потоков блок за блоком.
+
+    Работает со снимком схемы: netlist после построения не меняется,
+    при правке схемы MainWindow собирает новый. При processes > 1 блоки
+    по одному раздаются пулу процессов: задание короткое, так что отмена
+    снимает очередь и останавливает расчет за время одного блока.
+    """
+
+    def __init__(self, netlist, input_ids, result, processes=1):
+        super().__init__()
+        self.netlist = netlist
+        self.input_ids = input_ids
+        self.result = result  # только для разбиения на блоки, пишет в него GUI-поток
+        self.processes = processes
+        self.signals = TruthTableSignals()
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        if self.processes > 1 and self.result.chunk_count > 1:
+            completed = self.run_sharded()
+        else:
+            completed = self.run_serial()
+        self.signals.finished.emit(completed)
+
+    def run_serial(self):
+        result = self.result
+        done_rows = 0
+        for index in range(result.chunk_count):
+            if self.cancelled:
+                return False
+
+            words = compute_chunk(self.netlist, self.input_ids, result, index)
+            done_rows = min(done_rows + result.chunk_rows, result.row_count)
+            self.signals.chunk_ready.emit(index, words)
+            self.signals.progress.emit(done_rows, result.row_count)
+
+        return True
+
+    def run_sharded(self):
+        result = self.result
+        layout = result.empty_copy()
+        done_rows = 0
+
+        # fork из процесса Qt с потоками может зависнуть - процессы запускаются заново (spawn)
+        # Схема передается процессу один раз (initializer), задание - номер блока
+        futures = {}
+        executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=init_chunk_worker,
+                                       initargs=(self.netlist, self.input_ids, layout))
+        try:
+            futures = {executor.submit(compute_worker_chunk, index): index for index in range(result.chunk_count)}
+            for future in as_completed(futures):
+                if self.cancelled:
+                    return False
+
+                self.signals.chunk_ready.emit(futures[future], future.result())
+                done_rows = min(done_rows + result.chunk_rows, result.row_count)
+                self.signals.progress.emit(done_rows, result.row_count)
+        finally:
+            # Блоки в очереди снимаем сами: cancel_futures выполняет поток пула, а он
+            # пропускает отмену, если объект executor уже удален (после return)
+            for future in futures:
+                future.cancel()
+            # Без ожидания: выход из with ждал бы все запущенные блоки
+            executor.shutdown(wait=False)
+
+        return True
+
+
+class TruthTableModel(QAbstractTableModel):
+    """Модель таблицы истинности без объекта на каждую ячейку.
+
+    Значения читаются из упакованного TruthTableResult в data(). Блоки приходят
+    из фонового расчета (add_chunk); если представлению нужна строка, до которой
+    расчет еще не дошел, сразу считаются только PREVIEW_ROWS строк вокруг нее,
+    а не целый блок (у NumPy это 65536 строк). Такие строки хранятся отдельно
+    от result, их не больше MAX_PREVIEW_BLOCKS блоков.
+    """
+
+    PREVIEW_ROWS = 128
+    MAX_PREVIEW_BLOCKS = 64
+
+    # Цвета и шрифт общие для всех ячеек: (фон, текст) по значению
+    COLORS = {
+        1: (QColor(144, 238, 144), QColor(0, 100, 0)),  # Светло-зеленый / темно-зеленый
+        0: (QColor(255, 182, 193), QColor(139, 0, 0)),  # Светло-красный / темно-красный
+    }
+    UNKNOWN_COLORS = (QColor(255, 255, 150), QColor(102, 102, 0))  # Желтый для "?"
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.netlist = None
+        self.input_ids = []
+        self.column_ids = []
+        self.headers = []
+        self.result = None
+        self.reused = {}  # колонка -> упакованные биты из прошлой таблицы (column_bytes())
+        self.preview = {}  # блок из PREVIEW_ROWS строк -> слова вентилей (evaluate_rows())
+
+        self.font = QFont()
+        self.font.setBold(True)
+        self.font.setPointSize(11)
+
+    def set_table(self, netlist, input_ids, column_ids, headers, result=None, reused=None):
+        """Новая таблица: строки будут посчитаны при первом обращении.
+        result - уже готовая таблица (из кэша), column_ids - ее колонки;
+        reused - колонки, которые не пересчитываются"""
+        self.beginResetModel()
+        self.netlist = netlist
+        self.input_ids = input_ids
+        self.column_ids = column_ids
+        self.headers = headers
+        self.result = result if result is not None else TruthTableResult(len(input_ids))
+        self.reused = reused or {}
+        self.preview = {}
+        self.endResetModel()
+
+    def add_chunk(self, index, words):
+        """Блок из фонового расчета: сохраняем и обновляем его строки"""
+        result = self.result
+        result.add_chunk(index, words)
+
+        first_row = result.chunk_start(index)
+        last_row = min(first_row + result.chunk_rows, result.row_count) - 1
+        self.dataChanged.emit(self.index(first_row, 0),
+                              self.index(last_row, max(len(self.column_ids) - 1, 0)))
+
+    def clear(self):
+        self.beginResetModel()
+        self.netlist = None
+        self.input_ids = []
+        self.column_ids = []
+        self.headers = []
+        self.result = None
+        self.reused = {}
+        self.preview = {}
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.result is None:
+            return 0
+        return self.result.row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.column_ids)
+
+    def cell_value(self, row, col):
+        """Значение ячейки; если блока еще нет, считаются PREVIEW_ROWS строк вокруг"""
+        packed = self.reused.get(col)
+        if packed is not None:
+            return packed[row >> 3] >> (row & 7) & 1
+        result = self.result
+        if result.has_row(row):
+            return result.value(row, self.column_ids[col])
+
+        rows = min(self.PREVIEW_ROWS, result.row_count)
+        block, shift = divmod(row, rows)
+        words = self.preview.get(block)
+        if words is None:
+            if len(self.preview) >= self.MAX_PREVIEW_BLOCKS:
+                # Выбрасываем самый старый (словари помнят порядок добавления)
+                del self.preview[next(iter(self.preview))]
+            words = evaluate_rows(self.netlist, self.input_ids, block * rows, rows)
+            self.preview[block] = words
+        return words[self.column_ids[col]] >> shift & 1
+
+    def row_values(self, row):
+        return [self.cell_value(row, col) for col in range(len(self.column_ids))]
+
+    def column_bytes(self, col):
+        """Колонка col упакованными битами (таблица должна быть досчитана)"""
+        packed = self.reused.get(col)
+        if packed is not None:
+            return packed
+        return self.result.column_bytes(self.column_ids[col])
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or self.result is None:
+            return None
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return str(self.cell_value(index.row(), index.column()))
+        if role == Qt.ItemDataRole.BackgroundRole:
+            value = self.cell_value(index.row(), index.column())
+            return self.COLORS.get(value, self.UNKNOWN_COLORS)[0]
+        if role == Qt.ItemDataRole.ForegroundRole:
+            value = self.cell_value(index.row(), index.column())
+            return self.COLORS.get(value, self.UNKNOWN_COLORS)[1]
+        if role == Qt.ItemDataRole.FontRole:
+            return self.font
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            if 0 <= section < len(self.headers):
+                return self.headers[section]
+            return None
+        return str(section + 1)
+
+
+class SymbolicSummaryModel(QAbstractTableModel):
+    """Сводка по выходам для схем, таблицу которых не перебрать: по строке на
+    Output - сколько строк таблицы дают 1 и пример входов (из BDD)"""
+
+    HEADERS = ["Выход", "Строк с 1", "Доля", "Пример входов"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.rows[index.row()][index.column()]
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return str(section + 1)
 
 
 class TruthTableWidget(QWidget):
+    # С какого числа входов таблица считается в нескольких процессах
+    PARALLEL_MIN_INPUTS = 20
+    # С какого числа входов строки не перебираются - показывается сводка по BDD
+    SYMBOLIC_MIN_INPUTS = 25
+
     def __init__(self, main_window):
         super().__init__()
         self.main_window = main_window
@@ -14,6 +285,20 @@ class TruthTableWidget(QWidget):
         self.other_gates = []
         self.output_gates = []
         self.gate_order = []
+        self.worker = None
+        self.started_at = 0.0
+        # Таблицы уже встречавшихся схем - по отпечатку структуры, с копией на диске
+        self.cache = TruthTableCache(directory=default_directory())
+        self.cache_key = None
+        # Ревизия схемы (MainWindow.revision) и вентили-колонки текущей таблицы:
+        # пока они те же, повторный анализ ничего не пересчитывает
+        self.revision = None
+        self.table_gates = []
+        # Колонки последней досчитанной таблицы по отпечаткам (column_digests) -
+        # при частичном изменении схемы пересчитываются только остальные
+        self.digests = []
+        self.last_columns = {}
+        self.last_num_inputs = None
         self.init_ui()
 
     def init_ui(self):
@@ -50,45 +335,37 @@ class TruthTableWidget(QWidget):
 
         layout.addLayout(top_panel)
 
-        # Таблица
-        self.table = QTableWidget()
+        # Прогресс фонового расчета и кнопка отмены (видны только во время расчета)
+        progress_panel = QHBoxLayout()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        progress_panel.addWidget(self.progress_bar)
+
+        self.cancel_button = QPushButton("Отмена")
+        self.cancel_button.clicked.connect(self.cancel_analysis)
+        progress_panel.addWidget(self.cancel_button)
+
+        self.progress_bar.hide()
+        self.cancel_button.hide()
+        layout.addLayout(progress_panel)
+
+        # Таблица: данные отдает модель, виджеты на ячейки не создаются
+        self.model = TruthTableModel(self)
+        self.summary_model = SymbolicSummaryModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         layout.addWidget(self.table)
 
         self.setLayout(layout)
 
     def collect_gates_from_scene(self):
         """Собирает вентили со сцены и определяет порядок"""
-        self.input_gates = []
-        self.other_gates = []
-        self.output_gates = []
-        self.gate_order = []
-
-        if not self.main_window.scene:
-            logging.warning("Нет сцены для анализа")
-            return
-
-        # Собираем все вентили
-        all_gates = []
-        for item in self.main_window.scene.items():
-            if hasattr(item, 'gate'):
-                all_gates.append(item)
-
-        if not all_gates:
-            logging.warning("На сцене нет вентилей")
-            return
-
-        # Сортируем по позиции X (слева направо)
-        all_gates.sort(key=lambda x: x.pos().x())
-
-        # Распределяем по категориям
-        for gate_item in all_gates:
-            gate = gate_item.gate
-            if gate.name == "INPUT":
-                self.input_gates.append(gate_item)
-            elif gate.name == "OUTPUT":
-                self.output_gates.append(gate_item)
-            else:
-                self.other_gates.append(gate_item)
+        # Вентили по группам берутся из реестров MainWindow и сортируются
+        # по позиции X (слева направо)
+        main_window = self.main_window
+        self.input_gates = sorted(main_window.input_items, key=lambda item: item.pos().x())
+        self.other_gates = sorted(main_window.other_items, key=lambda item: item.pos().x())
+        self.output_gates = sorted(main_window.output_items, key=lambda item: item.pos().x())
 
         # Порядок: Input -> Другие вентили -> Output
         self.gate_order = self.input_gates + self.other_gates + self.output_gates
@@ -96,55 +373,33 @@ class TruthTableWidget(QWidget):
         logging.info(
             f"Найдено вентилей: {len(self.gate_order)} (Input: {len(self.input_gates)}, Other: {len(self.other_gates)}, Output: {len(self.output_gates)})")
 
-    # truth_table.py - ЗАМЕНЯЕМ метод generate_all_input_combinations()
-
-    def generate_all_input_combinations(self):
-        """Генерирует все комбинации значений для Input вентилей в порядке возрастания"""
-        if not self.input_gates:
-            return []
-
-        num_inputs = len(self.input_gates)
-        combinations = []
-
-        # Генерируем от 0 до 2^n - 1
-        for i in range(2 ** num_inputs):
-            combo = []
-            # Преобразуем число в бинарный список, начиная с младшего бита
-            for bit in range(num_inputs - 1, -1, -1):
-                value = (i >> bit) & 1
-                combo.append(value)
-            combinations.append(combo)
-
-        logging.debug(f"Сгенерировано {len(combinations)} комбинаций в порядке возрастания")
-        return combinations
-
-
     # truth_table.py - ЗАМЕНЯЕМ метод setup_table_style()
     def setup_table_style(self):
         """Настраивает стиль таблицы"""
         self.table.setAlternatingRowColors(True)
-        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         self.table.verticalHeader().setVisible(False)
         self.table.setShowGrid(True)
         self.table.setGridStyle(Qt.PenStyle.SolidLine)
 
-        # Устанавливаем режим растяжения заголовков
+        # Ширина колонок подбирается один раз по видимым строкам, а не по всей таблице
         header = self.table.horizontalHeader()
-        header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)  # Автоподбор по содержимому
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
         header.setStretchLastSection(False)  # Запрещаем растяжение последней колонки
 
         # Устанавливаем минимальные и максимальные ширины
         header.setMinimumSectionSize(50)
         header.setMaximumSectionSize(150)
 
-        # Устанавливаем высоту строк
-        for i in range(self.table.rowCount()):
-            self.table.setRowHeight(i, 30)
+        # Высота строк одна на всех - без обхода каждой строки
+        vertical_header = self.table.verticalHeader()
+        vertical_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        vertical_header.setDefaultSectionSize(30)
 
         # Настраиваем стиль ячеек для лучшей читаемости
         self.table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: white;
                 border: 1px solid #cccccc;
                 gridline-color: #e0e0e0;
@@ -152,14 +407,14 @@ class TruthTableWidget(QWidget):
                 font-size: 11pt;
             }
 
-            QTableWidget::item {
+            QTableView::item {
                 padding: 5px;
                 border: none;
                 color: #333333;  /* Темно-серый текст для контраста */
                 font-weight: 500;
             }
 
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #4a86e8;
                 color: white;
             }
@@ -175,57 +430,6 @@ class TruthTableWidget(QWidget):
         """)
 
 
-    # truth_table.py - ЗАМЕНА simulate_with_inputs() полностью
-    def simulate_with_inputs(self, input_values):
-        """Устанавливает значения Input и симулирует схему"""
-        logging.debug(f"=== НАЧАЛО СИМУЛЯЦИИ с входами: {input_values} ===")
-
-        # 1. Запоминаем оригинальные значения Input
-        original_values = {}
-        for i, gate_item in enumerate(self.input_gates):
-            original_values[i] = gate_item.gate.get_output()
-
-        # 2. Устанавливаем новые значения для Input
-        for i, gate_item in enumerate(self.input_gates):
-            if i < len(input_values):
-                gate = gate_item.gate
-                if hasattr(gate, 'set_value'):
-                    gate.set_value(input_values[i])
-                    logging.debug(f"Установлен Input {i}: {input_values[i]}")
-                else:
-                    logging.error(f"Input gate {i} не имеет set_value")
-
-        # 3. ПРИНУДИТЕЛЬНО сбрасываем ВСЕ вычисления
-        for gate_item in self.gate_order:
-            gate_item.gate.reset_computation()
-
-        # 4. Запускаем симуляцию через main_window (чтобы все соединения обновились)
-        if self.main_window:
-            self.main_window.update_all_connections()
-            self.main_window.simulate_circuit()
-
-        # 5. Собираем конечные значения
-        gate_values = {}
-        for gate_item in self.gate_order:
-            gate = gate_item.gate
-            value = gate.get_output()
-            gate_values[id(gate)] = value
-            logging.debug(f"Итоговое значение {gate.name}: {value}")
-
-        # 6. Восстанавливаем оригинальные значения
-        for i, gate_item in enumerate(self.input_gates):
-            if i in original_values:
-                gate = gate_item.gate
-                if hasattr(gate, 'set_value'):
-                    gate.set_value(original_values[i])
-
-        # 7. Снова сбрасываем для восстановления состояния
-        for gate_item in self.gate_order:
-            gate_item.gate.reset_computation()
-
-        logging.debug(f"=== КОНЕЦ СИМУЛЯЦИИ ===")
-        return gate_values
-
     # truth_table.py - ЗАМЕНА метода analyze_and_update_table() полностью
 
     def analyze_and_update_table(self):
@@ -237,79 +441,77 @@ class TruthTableWidget(QWidget):
         # Собираем информацию о вентилях
         self.collect_gates_from_scene()
 
+        # Схема не менялась - таблица (или идущий расчет) остается
+        if self.revision == self.main_window.revision and self.table_gates == self.gate_order:
+            logging.info("Схема не изменилась с прошлого анализа - таблица не пересчитывается")
+            return
+
+        # Предыдущий расчет больше не нужен
+        self.cancel_analysis()
+
         # Проверяем наличие Input
         if not self.input_gates:
             logging.warning("Нет Input вентилей для анализа")
-            self.table.setRowCount(0)
-            self.table.setColumnCount(0)
+            self.clear_table()
             return
 
-        # Генерируем все комбинации входов
-        input_combinations = self.generate_all_input_combinations()
-        logging.info(f"Генерируем {len(input_combinations)} комбинаций входов")
-
-        # Настраиваем таблицу
-        total_columns = len(self.gate_order)
-        self.table.setColumnCount(total_columns)
-        self.table.setRowCount(len(input_combinations))
-
-        # Устанавливаем заголовки
-        headers = []
-        input_counter = 1
-        output_counter = 1
-        other_counter = {}
-
-        for gate_item in self.gate_order:
-            gate = gate_item.gate
-            if gate.name == "INPUT":
-                headers.append(f"Ин{input_counter}")
-                input_counter += 1
-            elif gate.name == "OUTPUT":
-                headers.append(f"Вых{output_counter}")
-                output_counter += 1
-            else:
-                if gate.name not in other_counter:
-                    other_counter[gate.name] = 1
-                else:
-                    other_counter[gate.name] += 1
-                headers.append(f"{gate.name}{other_counter[gate.name]}")
-
-        self.table.setHorizontalHeaderLabels(headers)
-
-        # Заполняем таблицу для каждой комбинации входов
-        logging.info("Заполняем таблицу...")
-        for row, input_combo in enumerate(input_combinations):
-            logging.info(f"Комбинация {row + 1}/{len(input_combinations)}: {input_combo}")
-
-            # Используем новый метод simulate_with_inputs для получения значений
-            gate_values = self.main_window.simulate_with_inputs(input_combo)
-
-            # Заполняем строку таблицы
-            for col, gate_item in enumerate(self.gate_order):
-                gate = gate_item.gate
-                value = gate_values.get(id(gate), "?")
-
-                item = QTableWidgetItem(str(value))
-                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-
-                # Подсветка значений
-                if value == 1:
-                    item.setBackground(QColor(144, 238, 144))  # Светло-зеленый
-                    item.setForeground(QColor(0, 100, 0))  # Темно-зеленый текст
-                elif value == 0:
-                    item.setBackground(QColor(255, 182, 193))  # Светло-красный
-                    item.setForeground(QColor(139, 0, 0))  # Темно-красный текст
-                else:
-                    item.setBackground(QColor(255, 255, 150))  # Светло-желтый
-                    item.setForeground(QColor(102, 102, 0))  # Темно-желтый текст
-
-                # Устанавливаем жирный шрифт для значений
-                font = item.font()
-                font.setBold(True)
-                font.setPointSize(11)
-                item.setFont(font)
-
-                self.table.setItem(row, col, item)
+        netlist = self.main_window.get_netlist()
+        input_ids = [netlist.gate_id(gate_item.gate) for gate_item in self.input_gates]
+        column_ids = [netlist.gate_id(gate_item.gate) for gate_item in self.gate_order]
+
+        # Считаем по упрощенной схеме; вентили-колонки сохраняются (keep),
+        # слитые и свернутые в константу читаются из своих заменителей
+        optimized = optimize(netlist, keep=column_ids)
+        report = optimized.report
+        title = "Таблица истинности схемы"
+        if report.after < report.before:
+            title += f" ({report.before} -> {report.after} вентилей)"
+        self.title_label.setText(title + ":")
+        netlist = optimized.netlist
+        input_ids = optimized.map_ids(input_ids)
+        column_ids = optimized.map_ids(column_ids)
+
+        self.revision = self.main_window.revision
+        self.table_gates = list(self.gate_order)
+        if len(input_ids) >= self.SYMBOLIC_MIN_INPUTS:
+            self.show_symbolic_summary(netlist, input_ids, column_ids)
+            return
+        self.table.setModel(self.model)
+
+        self.digests = column_digests(netlist, input_ids, column_ids) or []
+        self.cache_key = fingerprint(netlist, input_ids, column_ids, self.digests) if self.digests else None
+        cached = self.cache.get(self.cache_key) if self.cache_key is not None else None
+        reused = {}
+        if len(input_ids) == self.last_num_inputs:
+            reused = {col: self.last_columns[digest] for col, digest in enumerate(self.digests)
+                      if digest in self.last_columns}
+        changed = [gid for col, gid in enumerate(column_ids) if col not in reused]
+
+        if cached is not None:
+            # Та же структура уже считалась - таблица готова целиком
+            self.model.set_table(netlist, input_ids, list(range(len(column_ids))), self.build_headers(), cached)
+            self.title_label.setText(title + " - из кэша:")
+            logging.info(f"Таблица на {self.model.rowCount()} комбинаций входов взята из кэша")
+            self.remember_table(store=False)
+        elif not changed:
+            # Изменились только порядок или набор колонок
+            self.model.set_table(netlist, input_ids, column_ids, self.build_headers(), reused=reused)
+            self.remember_table()
+        elif any(netlist.ops[column_ids[col]] != OP_INPUT for col in reused):
+            # Считаем только ту часть схемы, от которой зависят изменившиеся колонки
+            part, mapping = netlist.subcircuit(changed + input_ids)
+            part_inputs = [mapping[gid] for gid in input_ids]
+            part_columns = [-1 if col in reused else mapping[gid] for col, gid in enumerate(column_ids)]
+            self.model.set_table(part, part_inputs, part_columns, self.build_headers(), reused=reused)
+            self.title_label.setText(title + f" - пересчет {len(changed)} из {len(column_ids)} колонок:")
+            logging.info(f"Пересчитываются {len(changed)} колонок из {len(column_ids)} "
+                         f"({len(part)} вентилей из {len(netlist)})")
+            self.start_worker(part, part_inputs)
+        else:
+            # Видимые строки модель считает сама, остальные приходят из фонового расчета
+            self.model.set_table(netlist, input_ids, column_ids, self.build_headers())
+            logging.info(f"Таблица на {self.model.rowCount()} комбинаций входов")
+            self.start_worker(netlist, input_ids)
 
         # Автоподгонка и стиль
         self.table.resizeColumnsToContents()
@@ -317,13 +519,113 @@ class TruthTableWidget(QWidget):
 
         logging.info("Таблица истинности обновлена!")
 
-        # Выводим первые 3 строки для проверки
-        logging.info("=" * 50)
-        logging.info("РЕЗУЛЬТАТЫ ЗАПОЛНЕНИЯ ТАБЛИЦЫ:")
-        for row in range(min(3, self.table.rowCount())):
-            row_data = []
-            for col in range(self.table.columnCount()):
-                item = self.table.item(row, col)
-                row_data.append(item.text() if item else "?")
-            logging.info(f"Строка {row}: {row_data}")
-        logging.info("=" * 50)
\ No newline at end of file
+    def show_symbolic_summary(self, netlist, input_ids, column_ids):
+        """2^n строк не перебрать - считаем выходы символьно (BDD)"""
+        headers = self.build_headers()
+        outputs = [(gid, header) for gid, header in zip(column_ids, headers) if netlist.ops[gid] == OP_OUTPUT]
+        started = time.monotonic()
+        rows = []
+        try:
+            symbolic = SymbolicCircuit(netlist, input_ids, [gid for gid, header in outputs])
+            total = 1 << len(input_ids)
+            for gid, header in outputs:
+                ones = symbolic.count_ones(gid)
+                example = symbolic.satisfy(gid)
+                example_text = "нет" if example is None else \
+                    "".join("x" if value is None else str(value) for value in example)
+                rows.append([header, str(ones), f"{ones / total:.4%}", example_text])
+        except (BddTooLarge, ValueError) as e:
+            logging.warning(f"Символьный анализ не удался: {e}")
+            self.title_label.setText(f"Схема слишком сложна для анализа ({len(input_ids)} входов): {e}")
+            self.summary_model.set_rows([])
+            self.table.setModel(self.summary_model)
+            return
+
+        self.summary_model.set_rows(rows)
+        self.table.setModel(self.summary_model)
+        self.title_label.setText(f"{len(input_ids)} входов - 2^{len(input_ids)} строк не перебрать, "
+                                 f"сводка по выходам (x - любое значение):")
+        self.table.resizeColumnsToContents()
+        logging.info(f"Символьный анализ: {len(outputs)} выходов, {len(symbolic.bdd)} узлов BDD "
+                     f"за {time.monotonic() - started:.2f} с")
+
+    def build_headers(self):
+        """Заголовки колонок: Ин1.., AND1.., Вых1.."""
+        return column_headers([gate_item.gate.name for gate_item in self.gate_order])
+
+    def start_worker(self, netlist, input_ids):
+        """Запускает фоновый расчет всей таблицы"""
+        processes = 1
+        if len(input_ids) >= self.PARALLEL_MIN_INPUTS:
+            processes = os.cpu_count() or 1
+
+        self.worker = TruthTableWorker(netlist, input_ids, self.model.result, processes)
+        self.worker.signals.chunk_ready.connect(self.on_chunk_ready)
+        self.worker.signals.progress.connect(self.on_progress)
+        self.worker.signals.finished.connect(self.on_finished)
+
+        self.started_at = time.monotonic()
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("%p%")
+        self.progress_bar.show()
+        self.cancel_button.show()
+
+        QThreadPool.globalInstance().start(self.worker)
+
+    def is_current_worker(self):
+        """Сигналы от отмененного расчета приходят с опозданием - их пропускаем"""
+        return self.worker is not None and self.sender() is self.worker.signals
+
+    def on_chunk_ready(self, index, words):
+        if self.is_current_worker():
+            self.model.add_chunk(index, words)
+
+    def on_progress(self, done_rows, total_rows):
+        if not self.is_current_worker():
+            return
+        self.progress_bar.setValue(int(done_rows * 100 / total_rows))
+
+        elapsed = time.monotonic() - self.started_at
+        remaining = elapsed * (total_rows - done_rows) / done_rows
+        self.progress_bar.setFormat(f"%p% - осталось ~{remaining:.0f} с")
+
+    def on_finished(self, completed):
+        if not self.is_current_worker():
+            return
+        if completed:
+            elapsed = time.monotonic() - self.started_at
+            logging.info(f"Таблица истинности досчитана за {elapsed:.2f} с")
+            if self.model.result.is_complete():
+                self.remember_table()
+
+        self.worker = None
+        self.progress_bar.hide()
+        self.cancel_button.hide()
+
+    def remember_table(self, store=True):
+        """Досчитанная таблица - в кэш (store) и в колонки для частичного пересчета"""
+        if self.cache_key is None:
+            return
+        columns = [self.model.column_bytes(col) for col in range(len(self.digests))]
+        if store:
+            self.cache.put(self.cache_key, len(self.model.input_ids), columns)
+        self.last_columns = dict(zip(self.digests, columns))
+        self.last_num_inputs = len(self.model.input_ids)
+
+    def cancel_analysis(self):
+        """Останавливает фоновый расчет; уже посчитанные строки остаются"""
+        if self.worker is None:
+            return
+        self.worker.cancel()
+        self.worker = None
+        self.revision = None  # недосчитанную таблицу следующий анализ строит заново
+        self.progress_bar.hide()
+        self.cancel_button.hide()
+        logging.info("Расчет таблицы истинности отменен")
+
+    def clear_table(self):
+        """Очищает таблицу"""
+        self.cancel_analysis()
+        self.revision = None
+        self.model.clear()
+        self.table.setModel(self.model)
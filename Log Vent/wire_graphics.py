@@ -21,7 +21,7 @@ class WireGraphicsItem(QGraphicsLineItem):
         self.start_pin.connected_wires.append(self)
         self.end_pin.connected_wires.append(self)
         self.setZValue(5)
-        logging.info(
+        logging.debug(
             f"Провод создан: {start_pin.parent_gate.gate.name} -> {end_pin.parent_gate.gate.name}")
         # ЗАМЕНА: print → logging.info
 
@@ -37,12 +37,9 @@ class WireGraphicsItem(QGraphicsLineItem):
             if hasattr(end_gate, 'inputs'):
                 pin_index = self.end_pin.pin_index
 
-                # Гарантируем что список inputs достаточно большой
-                while len(end_gate.inputs) <= pin_index:
-                    end_gate.inputs.append(None)  # Начальное значение None
-
-                # ВАЖНО: Устанавливаем ОБЪЕКТ, а не значение
-                end_gate.inputs[pin_index] = start_gate  # ← ЗАМЕНА: start_gate.get_output() → start_gate
+                # ВАЖНО: Подключаем ОБЪЕКТ, а не значение (connect() дополняет
+                # список inputs до нужного пина и заново связывает источники)
+                end_gate.connect(pin_index, start_gate)
 
                 logging.debug(f"Соединение: {start_gate.name} -> {end_gate.name}[{pin_index}]")
 
@@ -58,15 +55,9 @@ class WireGraphicsItem(QGraphicsLineItem):
         if hasattr(end_gate, 'inputs') and end_gate.inputs:
             pin_index = self.end_pin.pin_index
             if pin_index < len(end_gate.inputs):
-                end_gate.inputs[pin_index] = start_gate  # ← ЗАМЕНА: start_gate.get_output() → start_gate
+                end_gate.connect(pin_index, start_gate)
 
     def update_position(self):
-        """Обновляет позицию провода при движении вентилей - БЕЗ ЛОГИРОВАНИЯ"""
-        try:
-            start_pos = self.start_pin.scenePos()
-            end_pos = self.end_pin.scenePos()
-            new_line = QLineF(start_pos, end_pos)
-            self.setLine(new_line)
-            self.update()
-        except Exception:
-            pass  # Молча игнорируем ошибки при обновлении позиций
\ No newline at end of file
+        """Обновляет позицию провода при движении вентилей - БЕЗ ЛОГИРОВАНИЯ
+        (setLine сам перерисовывает провод)"""
+        self.setLine(QLineF(self.start_pin.scenePos(), self.end_pin.scenePos()))
\ No newline at end of file